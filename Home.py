@@ -1,7 +1,8 @@
 import streamlit as st
-import pandas as pd
+import debug_panel
 
 st.set_page_config(page_title="Project Samarth - EDA Dashboard", layout="wide")
+debug = debug_panel.page_start("Home")
 
 st.title("🌾 Project Samarth: Agricultural & Rainfall Data Explorer")
 
@@ -16,16 +17,16 @@ Use the sidebar or tabs above to explore:
 - 🤖 **LLM Chatbot** (New!)(prototype)
 """)
 
-# Load dataset
-@st.cache_data
-def load_data():
-    df = pd.read_csv("datasets/crop_rainfall_integrated_cleaned.csv")
-    return df
+# Load dataset (shared, read-once data layer)
+from data_loader import load_integrated_data
 
-df = load_data()
+df = load_integrated_data()
 
 st.subheader("Data Preview")
 st.dataframe(df.head())
+debug.data_shown()
 
 st.markdown("**Dataset Dimensions:**")
-st.write(f"Rows: {df.shape[0]} | Columns: {df.shape[1]}")
\ No newline at end of file
+st.write(f"Rows: {df.shape[0]} | Columns: {df.shape[1]}")
+
+debug.finish()
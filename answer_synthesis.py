@@ -0,0 +1,350 @@
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+# --- Local answer synthesis ---
+# Turns a query result into a short markdown answer without an LLM round trip. The result's
+# shape is recognised from its columns, statistics are computed over the whole result with
+# vectorised pandas/numpy operations, and the narrative comes from a template per shape:
+# - "metric_value": the UNION ALL layout (Metric, Value, optional Region/Context columns):
+#   every metric with its value per region, and the highest/lowest region;
+# - "series":  one row per year: first -> last change, growth per year, peak and low years,
+#   least-squares trend, and the correlation of every other column with rainfall;
+# - "panel":   one row per (group, year): each group's change, biggest risers and fallers;
+# - "ranking": labels with a value (and at most one year, which the answer names), in the
+#   query's order and direction: the gaps, the spread and, for additive metrics (production,
+#   area) over one kind of label, the leader's share of the total;
+# - "single":  one row of values (and its year, if any).
+# Other shapes, and results the templates fail on, return None, and the caller falls back
+# to the LLM.
+
+YEAR_COLUMNS = ("year", "yr")
+MAX_LISTED = 5
+
+# Column names that read better as another word, and unit words dropped from labels (the unit
+# is printed after each value instead).
+LABELS = {"state_canonical": "state"}
+UNIT_WORDS = {"mm", "tonnes", "ha", "t", "per"}
+
+# Column name fragment -> unit shown after values.
+UNITS = [
+    ("yield", "t/ha"),
+    ("rain", "mm"),
+    ("jjas", "mm"),
+    ("_mm", "mm"),
+    ("production", "t"),
+    ("tonnes", "t"),
+    ("area", "ha"),
+]
+
+# Column name fragments of metrics whose values add up to a meaningful total, and of
+# aggregates (averages, rates, extremes) whose totals mean nothing.
+ADDITIVE = ("production", "tonnes", "area")
+NOT_ADDITIVE = ("avg", "average", "mean", "yield", "rain", "jjas", "_mm", "max", "min")
+
+# Words in a label column that mark rows picked from different rankings, as in the District
+# Comparison template's 'Highest in X' / 'Lowest in Y': such rows share no total.
+PICK_WORDS = {"highest", "lowest", "top", "bottom", "max", "min", "maximum", "minimum", "most", "least"}
+
+
+def label(column: str) -> str:
+    """'Total_Production_tonnes' -> 'total production'."""
+    name = str(column).lower()
+    words = LABELS.get(name, name).replace("_", " ").split()
+    while len(words) > 1 and words[-1] in UNIT_WORDS:
+        words.pop()
+    return " ".join(words)
+
+
+def unit(column: str) -> str:
+    name = str(column).lower()
+    for fragment, symbol in UNITS:
+        if fragment in name:
+            return symbol
+    return ""
+
+
+def additive(column: str) -> bool:
+    """True if the column's values can be summed, e.g. total production, not average rainfall."""
+    name = str(column).lower()
+    return any(f in name for f in ADDITIVE) and not any(f in name for f in NOT_ADDITIVE)
+
+
+def fmt(value, column: str = "") -> str:
+    """A number with thousands separators and, when the column implies one, its unit."""
+    if pd.isna(value):
+        return "n/a"
+    value = float(value)
+    digits = 0 if abs(value) >= 1000 or value == int(value) else 2
+    text = f"{value:,.{digits}f}"
+    symbol = unit(column)
+    return f"{text} {symbol}" if symbol else text
+
+
+def _pct(value: float) -> str:
+    return "n/a" if not np.isfinite(value) else f"{value:+.1f}%"
+
+
+def _columns(df: pd.DataFrame):
+    """(year column or None, text columns, numeric value columns)."""
+    year = next((c for c in df.columns if str(c).lower() in YEAR_COLUMNS), None)
+    numeric = [c for c in df.columns if c != year and pd.api.types.is_numeric_dtype(df[c])]
+    text = [c for c in df.columns if c != year and c not in numeric]
+    return year, text, numeric
+
+
+def classify_result(df: pd.DataFrame) -> Optional[str]:
+    """The shape of a query result (see the list above), or None when it is not recognised."""
+    if df.empty:
+        return None
+    columns = {str(c).lower(): c for c in df.columns}
+    if "metric" in columns and "value" in columns:
+        return "metric_value"
+    year, text, numeric = _columns(df)
+    if not numeric:
+        return None
+    if year is not None:
+        varying = [c for c in text if df[c].nunique(dropna=False) > 1]
+        if df[year].nunique() == 1 and text and len(varying) <= 1:
+            return "ranking" if len(df) >= 2 else "single"
+        if not varying and df[year].is_unique and len(df) >= 2:
+            return "series"
+        if len(varying) == 1 and not df.duplicated([varying[0], year]).any():
+            return "panel"
+        return None
+    if len(df) == 1:
+        return "single"
+    if text:
+        return "ranking"
+    return None
+
+
+# --- Statistics (whole result, vectorised) ---
+
+def series_stats(df: pd.DataFrame, year: str, columns: List[str]) -> pd.DataFrame:
+    """
+    Per value column of a year series: first/last year and value, change, % change, compound
+    growth per year, peak/low year and value, and the least-squares slope per year.
+    """
+    frame = df.sort_values(year)
+    years = frame[year].to_numpy(dtype=float)
+    values = frame[columns].to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    n = len(frame)
+
+    first_i = valid.argmax(axis=0)
+    last_i = n - 1 - valid[::-1].argmax(axis=0)
+    cols = np.arange(len(columns))
+    first, last = values[first_i, cols], values[last_i, cols]
+    span_years = years[last_i] - years[first_i]
+
+    peak_i = np.where(valid, values, -np.inf).argmax(axis=0)
+    low_i = np.where(valid, values, np.inf).argmin(axis=0)
+
+    # Slope of value on year over the valid points of each column.
+    w = valid.astype(float)
+    v = np.where(valid, values, 0.0)
+    y = years[:, None]
+    count = w.sum(axis=0)
+    sy, sv = (w * y).sum(axis=0), v.sum(axis=0)
+    syy, syv = (w * y * y).sum(axis=0), (v * y).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (count * syv - sy * sv) / (count * syy - sy * sy)
+        change_pct = (last - first) / np.abs(first) * 100
+        growth = np.where((first > 0) & (last > 0) & (span_years > 0),
+                          ((last / first) ** (1 / span_years) - 1) * 100, np.nan)
+
+    return pd.DataFrame({
+        "first_year": years[first_i], "first": first,
+        "last_year": years[last_i], "last": last,
+        "change": last - first, "change_pct": change_pct, "growth_pct": growth,
+        "peak_year": years[peak_i], "peak": values[peak_i, cols],
+        "low_year": years[low_i], "low": values[low_i, cols],
+        "slope": slope, "points": count,
+    }, index=columns)
+
+
+def rainfall_correlations(df: pd.DataFrame, columns: List[str]) -> pd.Series:
+    """Pearson r of every non-rainfall column with the first rainfall column (empty if none)."""
+    rainfall = [c for c in columns if unit(c) == "mm"]
+    others = [c for c in columns if c not in rainfall]
+    if not rainfall or not others or len(df) < 3:
+        return pd.Series(dtype=float)
+    return df[others].corrwith(df[rainfall[0]]).rename(rainfall[0])
+
+
+def _strength(r: float) -> str:
+    size = abs(r)
+    word = "strong" if size >= 0.7 else "moderate" if size >= 0.4 else "weak"
+    return f"{word} {'positive' if r > 0 else 'negative'}"
+
+
+# --- Narratives ---
+
+def _metric_value(df: pd.DataFrame) -> str:
+    columns = {str(c).lower(): c for c in df.columns}
+    metric, value = columns["metric"], columns["value"]
+    region = columns.get("region") or next(
+        (c for c in df.columns if c not in (metric, value, columns.get("context"))
+         and not pd.api.types.is_numeric_dtype(df[c])), None)
+    values = pd.to_numeric(df[value], errors="coerce")
+    lines = []
+    for name, rows in df.assign(_value=values).groupby(metric, sort=False):
+        rows = rows.sort_values("_value", ascending=False)
+        if region is None or len(rows) == 1:
+            where = f" ({rows[region].iloc[0]})" if region is not None else ""
+            lines.append(f"- **{label(name)}**{where}: {fmt(rows['_value'].iloc[0], name)}")
+            continue
+        listed = ", ".join(f"{r} {fmt(v, name)}" for r, v in zip(rows[region], rows["_value"]))
+        top, bottom = rows.iloc[0], rows.iloc[-1]
+        line = f"- **{label(name)}**: {listed}"
+        if bottom["_value"] > 0:
+            line += f"; {top[region]} is {top['_value'] / bottom['_value']:.2f}x {bottom[region]}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _series(df: pd.DataFrame, year: str, numeric: List[str]) -> str:
+    stats = series_stats(df, year, numeric)
+    first_year, last_year = int(stats["first_year"].min()), int(stats["last_year"].max())
+    lines = [f"Over {first_year}–{last_year} ({len(df)} years):"]
+    for column, s in stats.iterrows():
+        trend = "rising" if s["slope"] > 0 else "falling" if s["slope"] < 0 else "flat"
+        growth = f", {_pct(s['growth_pct'])} a year" if np.isfinite(s["growth_pct"]) else ""
+        lines.append(
+            f"- **{label(column)}** went from {fmt(s['first'], column)} ({int(s['first_year'])}) to "
+            f"{fmt(s['last'], column)} ({int(s['last_year'])}), {_pct(s['change_pct'])}{growth}; "
+            f"{trend} by {fmt(abs(s['slope']), column)} per year on average, peak "
+            f"{fmt(s['peak'], column)} in {int(s['peak_year'])}, low {fmt(s['low'], column)} "
+            f"in {int(s['low_year'])}."
+        )
+    correlations = rainfall_correlations(df, numeric)
+    for column, r in correlations.dropna().items():
+        lines.append(f"- {label(column).capitalize()} and {label(correlations.name)} show a "
+                     f"{_strength(r)} correlation (r = {r:.2f}).")
+    return "\n".join(lines)
+
+
+def _panel(df: pd.DataFrame, year: str, group: str, numeric: List[str]) -> str:
+    column = numeric[0]
+    frame = df.dropna(subset=[column]).sort_values([group, year])
+    ends = frame.groupby(group, sort=False).agg(
+        first_year=(year, "first"), first=(column, "first"),
+        last_year=(year, "last"), last=(column, "last"))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ends["change_pct"] = (ends["last"] - ends["first"]) / ends["first"].abs() * 100
+    ends = ends.replace([np.inf, -np.inf], np.nan).dropna(subset=["change_pct"])
+    if ends.empty:
+        return ""
+    ranked = ends.sort_values("change_pct", ascending=False)
+    lines = [f"**{label(column).capitalize()}** by {label(group)}, "
+             f"{int(frame[year].min())}–{int(frame[year].max())} ({len(ends)} {label(group)} values):"]
+
+    def describe(name, s):
+        return (f"{name} {fmt(s['first'], column)} → {fmt(s['last'], column)} "
+                f"({_pct(s['change_pct'])}, {int(s['first_year'])}–{int(s['last_year'])})")
+
+    shown = min(MAX_LISTED // 2 + 1, len(ranked))
+    lines.append("- Largest increases: " + "; ".join(describe(n, s) for n, s in ranked.head(shown).iterrows()))
+    falls = ranked.tail(min(shown, len(ranked) - shown)).iloc[::-1]
+    if len(falls):
+        lines.append("- Largest decreases: " + "; ".join(describe(n, s) for n, s in falls.iterrows()))
+    return "\n".join(lines)
+
+
+def _picks(df: pd.DataFrame, text: List[str]) -> bool:
+    """True if the rows are picks from different rankings ('Highest in X' / 'Lowest in Y')."""
+    return any(
+        df[c].astype(str).str.lower().str.findall(r"[a-z]+").map(lambda words: bool(PICK_WORDS & set(words))).any()
+        for c in text
+    )
+
+
+def _ranking(df: pd.DataFrame, text: List[str], numeric: List[str], year: Optional[str] = None) -> str:
+    column = numeric[0]
+    names = df[text].astype(str).agg(" / ".join, axis=1) if len(text) > 1 else df[text[0]].astype(str)
+    values = df[column].astype(float)
+    if values.isna().all():
+        return None
+    # Rows are listed in the SQL's order, which also gives the direction (ORDER BY ... DESC/ASC).
+    valid = values.dropna()
+    picks = _picks(df, text)
+    direction = ""
+    if not picks and valid.nunique() > 1:
+        if valid.is_monotonic_decreasing:
+            direction = ", highest first"
+        elif valid.is_monotonic_increasing:
+            direction = ", lowest first"
+
+    listed = ", ".join(f"{i}. {n} ({fmt(v, column)})"
+                       for i, (n, v) in enumerate(zip(names.head(MAX_LISTED), values.head(MAX_LISTED)), 1))
+    more = f" and {len(values) - MAX_LISTED} more" if len(values) > MAX_LISTED else ""
+    period = f" in {int(df[year].iloc[0])}" if year is not None else ""
+    lines = [f"**{label(column).capitalize()}**{period}{direction}: {listed}{more}."]
+
+    facts = []
+    ranked = valid.sort_values(ascending=direction == ", lowest first", kind="stable")
+    ranked_names = names[ranked.index]
+    if len(ranked) >= 2 and direction == ", lowest first":
+        low, next_low, high = ranked.iloc[0], ranked.iloc[1], ranked.iloc[-1]
+        if next_low > 0:
+            facts.append(f"{ranked_names.iloc[0]} is {(next_low - low) / next_low:.1%} below {ranked_names.iloc[1]}")
+        if len(ranked) > 2 and low > 0:
+            facts.append(f"the highest, {ranked_names.iloc[-1]} ({fmt(high, column)}), "
+                         f"is {high / low:.1f}x {ranked_names.iloc[0]}")
+    elif len(ranked) >= 2:
+        top, second, bottom = ranked.iloc[0], ranked.iloc[1], ranked.iloc[-1]
+        total = ranked.sum()
+        # A share needs one total: an additive metric over one kind of label.
+        if not picks and additive(column) and total > 0 and (ranked >= 0).all():
+            facts.append(f"{ranked_names.iloc[0]} accounts for {top / total:.1%} of the total of these {len(ranked)}")
+        if second > 0:
+            lead = f"{top / second:.1f}x" if top >= 2 * second else f"{(top - second) / second:.1%} ahead of"
+            facts.append(f"{'it' if facts else ranked_names.iloc[0]} is {lead} {ranked_names.iloc[1]}")
+        if len(ranked) > 2 and bottom > 0:
+            facts.append(f"{top / bottom:.1f}x the lowest, {ranked_names.iloc[-1]} ({fmt(bottom, column)})")
+    if facts:
+        lines.append("- " + "; ".join(facts) + ".")
+    for other in numeric[1:]:
+        other_values = df[other].astype(float)
+        if other_values.isna().all():
+            continue
+        best = other_values.idxmax()
+        lines.append(f"- Highest {label(other)}: {names[best]} ({fmt(other_values[best], other)}).")
+    return "\n".join(lines)
+
+
+def _single(df: pd.DataFrame, text: List[str], numeric: List[str], year: Optional[str] = None) -> str:
+    row = df.iloc[0]
+    context = ", ".join([str(row[c]) for c in text] + ([str(int(row[year]))] if year is not None else []))
+    values = "; ".join(f"{label(c)}: {fmt(row[c], c)}" for c in numeric)
+    return f"{context} — {values}." if context else f"{values[0].upper()}{values[1:]}."
+
+
+def synthesize(df: pd.DataFrame) -> Optional[str]:
+    """A markdown answer for a recognised result shape, or None (see classify_result) or if it fails."""
+    shape = classify_result(df)
+    if shape is None:
+        return None
+    year, text, numeric = _columns(df)
+    try:
+        if shape == "metric_value":
+            answer = _metric_value(df)
+        elif shape == "series":
+            answer = _series(df, year, numeric)
+        elif shape == "panel":
+            group = next(c for c in text if df[c].nunique(dropna=False) > 1)
+            answer = _panel(df, year, group, numeric)
+        elif shape == "ranking":
+            answer = _ranking(df, text, numeric, year)
+        else:
+            answer = _single(df, text, numeric, year)
+    except (ArithmeticError, LookupError, TypeError, ValueError):
+        # Data the templates do not expect (e.g. all-NULL columns): let the LLM summarise it.
+        return None
+    if not answer:
+        return None
+    if df.attrs.get("truncated"):
+        answer += f"\n\n_Based on the first {len(df):,} rows of a larger result._"
+    return answer
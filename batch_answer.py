@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+
+from answer_synthesis import synthesize
+from chat_pipeline import DATABASE_FILE, ChatPipeline
+from qa_system import DATA_FILE, SamarthQASystem
+from sql_backends import BACKENDS
+from tracing import span
+
+# --- Headless batch question answering ---
+# Answers a JSONL or CSV file of questions in parallel, without Streamlit:
+# - engine "sql": the chatbot pipeline (translation cache -> local translator -> optional LLM
+#   for the SQL, then the result cache and the guarded SQL backend: SQLite or DuckDB, see
+#   sql_backends.py); the answer is the result rows, with a summary written locally from
+#   them (answer_synthesis.py) when their shape is recognised;
+# - engine "qa":  SamarthQASystem.answer_query; the answer is its markdown text.
+# Each worker process builds its engine once (data, indexes, caches, connections) in the
+# pool initializer and then answers every question sent to it. Results keep the input order
+# and carry per-step timings taken from the tracing spans (see tracing.py).
+#
+# Usage: python batch_answer.py questions.jsonl --output answers.jsonl --workers 4
+#        python batch_answer.py questions.csv --engine qa --output answers.csv
+
+ENGINES = ("sql", "qa")
+MAX_ROWS = 100
+
+# The engine of this worker (process), set by _init_worker.
+_engine = None
+
+
+def read_questions(path: str) -> list:
+    """
+    [{"id", "question"}, ...] from a CSV with a `question` column or a JSONL file whose
+    lines are objects with a "question" key or bare strings. Ids default to the row number.
+    """
+    if path.lower().endswith(".csv"):
+        df = pd.read_csv(path)
+        if "question" not in df.columns:
+            raise ValueError(f"{path} has no 'question' column")
+        ids = df["id"] if "id" in df.columns else range(1, len(df) + 1)
+        return [{"id": i, "question": str(q)} for i, q in zip(ids, df["question"]) if pd.notna(q)]
+
+    questions = []
+    with open(path) as f:
+        for n, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"question": record}
+            questions.append({"id": record.get("id", n), "question": record["question"]})
+    return questions
+
+
+def write_results(results: list, path: str) -> None:
+    """JSONL, or CSV (answer and timings JSON-encoded) when `path` ends with .csv."""
+    if path.lower().endswith(".csv"):
+        df = pd.DataFrame(results)
+        for col in ("answer", "timings_ms"):
+            df[col] = [json.dumps(value, default=str) for value in df[col]]
+        df.to_csv(path, index=False)
+        return
+    with open(path, "w") as f:
+        for result in results:
+            f.write(json.dumps(result, default=str) + "\n")
+
+
+def _init_worker(engine: str, database_file: str, data_file: str, use_llm: bool,
+                 backend: str = None) -> None:
+    """Builds this worker's engine; runs once per process (or once for the thread pool)."""
+    global _engine
+    if engine == "qa":
+        _engine = SamarthQASystem(data_file)
+        return
+    client = None
+    if use_llm:
+        from llm_client import LLMGateway
+        client = LLMGateway(os.environ["OPENAI_API_KEY"])
+    _engine = ChatPipeline(database_file, client, backend)
+
+
+def _answer_sql(question: str, result: dict) -> None:
+    sql_query = _engine.prompt_to_sql(question)
+    result["sql"] = sql_query
+    if not sql_query:
+        result["status"] = "untranslated"
+        return
+    rows = _engine.execute_sql(sql_query)
+    if isinstance(rows, str):
+        result.update(status="error", error=rows)
+        return
+    result.update(
+        status="ok" if len(rows) else "empty",
+        rows=len(rows),
+        answer=rows.head(MAX_ROWS).to_dict(orient="records"),
+        summary=synthesize(rows),
+    )
+
+
+def answer(item: dict) -> dict:
+    """Answers one question with this worker's engine; failures are reported, not raised."""
+    result = {"id": item["id"], "question": item["question"], "status": "ok", "worker": os.getpid()}
+    with span("batch.answer") as root:
+        try:
+            if isinstance(_engine, SamarthQASystem):
+                result["answer"] = _engine.answer_query(item["question"])
+            else:
+                _answer_sql(item["question"], result)
+        except Exception as e:
+            result.update(status="error", error=f"{type(e).__name__}: {e}")
+
+    result["total_ms"] = round(root.duration_ms, 2)
+    result["timings_ms"] = {child.name: round(child.duration_ms, 2) for child in root.children}
+    if isinstance(_engine, ChatPipeline):
+        sources = [child.attributes.get("source") for child in root.children if child.name == "chat.prompt_to_sql"]
+        result["sql_source"] = sources[0] if sources else None
+    result.setdefault("answer", None)
+    return result
+
+
+def run_batch(questions: list, engine: str = "sql", workers: int = os.cpu_count() or 1,
+              executor: str = "process", database_file: str = DATABASE_FILE,
+              data_file: str = DATA_FILE, use_llm: bool = False, backend: str = None) -> list:
+    """Answers `questions` across a pool of `workers`; results come back in input order."""
+    init_args = (engine, os.path.abspath(database_file), os.path.abspath(data_file), use_llm, backend)
+    chunksize = max(1, len(questions) // (workers * 4))
+    if executor == "thread":
+        # Threads share one engine: the pipeline and the Q&A indexes are safe to read concurrently.
+        _init_worker(*init_args)
+        with ThreadPoolExecutor(workers) as pool:
+            return list(pool.map(answer, questions))
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init_args) as pool:
+        return list(pool.map(answer, questions, chunksize=chunksize))
+
+
+def summarize(results: list, elapsed: float) -> str:
+    """One-paragraph report: status counts, throughput and latency percentiles."""
+    statuses = pd.Series([r["status"] for r in results]).value_counts()
+    latencies = sorted(r["total_ms"] for r in results)
+    lines = [
+        f"Answered {len(results)} questions in {elapsed:.1f} s ({len(results) / max(elapsed, 1e-9):.1f} per second)",
+        "  " + " · ".join(f"{status}: {count}" for status, count in statuses.items()),
+    ]
+    if latencies:
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        lines.append(f"  per question: median {statistics.median(latencies):.1f} ms · p95 {p95:.1f} ms")
+    if results and "sql_source" in results[0]:
+        sources = pd.Series([r["sql_source"] for r in results]).value_counts()
+        lines.append("  SQL from " + " · ".join(f"{source}: {count}" for source, count in sources.items()))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL or CSV file of questions without the UI.")
+    parser.add_argument("questions", help="JSONL (objects with 'question', or strings) or CSV with a 'question' column")
+    parser.add_argument("--output", default="answers.jsonl", help="results file (.jsonl or .csv)")
+    parser.add_argument("--engine", choices=ENGINES, default="sql",
+                        help="sql: chatbot pipeline over the SQLite database; qa: SamarthQASystem")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="pool size")
+    parser.add_argument("--executor", choices=("process", "thread"), default="process", help="pool type")
+    parser.add_argument("--database", default=DATABASE_FILE, help="SQLite database for the sql engine")
+    parser.add_argument("--backend", choices=BACKENDS, default=None,
+                        help="SQL backend for the sql engine (default: $SAMARTH_SQL_BACKEND, else sqlite)")
+    parser.add_argument("--data", default=DATA_FILE, help="integrated dataset for the qa engine")
+    parser.add_argument("--llm", action="store_true",
+                        help="send questions the local translator cannot handle to the LLM (needs OPENAI_API_KEY)")
+    args = parser.parse_args()
+    if args.llm and not os.getenv("OPENAI_API_KEY"):
+        parser.error("--llm needs OPENAI_API_KEY in the environment")
+
+    questions = read_questions(args.questions)
+    start = time.perf_counter()
+    results = run_batch(questions, args.engine, args.workers, args.executor,
+                        args.database, args.data, args.llm, args.backend)
+    elapsed = time.perf_counter() - start
+
+    write_results(results, args.output)
+    print(summarize(results, elapsed))
+    print(f"Wrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import etl
+import setup_db
+from chat_pipeline import DATABASE_FILE, ChatPipeline
+from chart_data import line_chart
+from data_loader import INTEGRATED_CSV, _read_full_csv, build_snapshot, read_table
+from llm_client import LLMGateway
+from prompt_builder import SYSTEM_PROMPT, estimate_tokens
+from qa_system import SamarthQASystem
+from rainfall_store import RAINFALL_CSV, MonthlyRainfall, month_window
+from rollups import load_rollups
+from stub_openai_server import serve
+
+# --- Offline performance benchmarks ---
+# Generates a synthetic crop dataset at each requested scale (1x = the size of the public
+# crop production dataset) against the bundled IMD rainfall, then times every layer on it:
+# ETL stages, SQLite ingest, the data layer and each dashboard page's query path, each
+# page's cold time to first data, SamarthQASystem.answer_query, and the chatbot's
+# prompt_to_sql / execute_sql with the LLM replaced by stub_openai_server.py. Results are
+# written as JSON; --compare flags benchmarks that got slower than a previous run.
+#
+# Usage: python benchmark.py --scales 1 5 --output bench_results.json
+#        python benchmark.py --compare bench_results.json
+
+BASE_CROP_ROWS = 246_000
+DISTRICTS_PER_STATE = 20
+YEARS = (1997, 2015)
+SEASONS = ["Kharif     ", "Rabi       ", "Whole Year ", "Summer     ", "Winter     ", "Autumn     "]
+CROPS = [
+    "Rice", "Wheat", "Maize", "Jowar", "Bajra", "Ragi", "Arhar/Tur", "Moong(Green Gram)",
+    "Urad", "Gram", "Groundnut", "Soyabean", "Sunflower", "Rapeseed &Mustard", "Sesamum",
+    "Cotton(lint)", "Sugarcane", "Jute", "Potato", "Onion", "Banana", "Coconut ", "Arecanut",
+    "Turmeric", "Dry chillies", "Tobacco", "Masoor", "Barley", "Small millets", "Castor seed",
+]
+
+# Questions for SamarthQASystem (one per intent) and for the chatbot's local translator.
+QA_QUESTIONS = [
+    "Compare the average annual rainfall in Kerala and Punjab for the last 5 available years.",
+    "Identify the district in Bihar with the highest production of Wheat in the most recent year.",
+    "Analyze the production trend of Rice in Punjab over the last 10 years and correlate with climate data.",
+]
+CHAT_QUESTIONS = [
+    "Compare average annual rainfall in Karnataka and Kerala for the last 5 years",
+    "Top 5 districts in Bihar for rice production",
+    "Which state had the lowest wheat yield?",
+    "Analyze the production trend of Wheat in Punjab over the last decade and correlate with climate data.",
+    "Compare maize production in Gujarat and Rajasthan since 2005",
+]
+# Not a template shape: always translated by the (stub) LLM.
+LLM_QUESTION = "Summarise the agricultural situation in the north east"
+
+DEFAULT_TOLERANCE = 0.25
+
+
+# ==============================================================================
+# Synthetic data
+# ==============================================================================
+
+def synthetic_crop(scale: float, seed: int = 0) -> pd.DataFrame:
+    """
+    A raw crop production table (the columns of datasets/crop.csv) with
+    BASE_CROP_ROWS * scale rows. District count grows with the scale, so the number of
+    distinct groups grows along with the rows. About 1% of rows have missing or
+    zero production, so the cleaning stage has work to do.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(BASE_CROP_ROWS * scale)
+    states = np.array(list(etl.STATE_TO_SUBDIVISION_MAP))
+    districts_per_state = max(int(DISTRICTS_PER_STATE * scale ** 0.5), 1)
+
+    state_idx = rng.integers(0, len(states), n)
+    district_idx = rng.integers(0, districts_per_state, n)
+    state_names = states[state_idx]
+    district_names = np.char.add(np.char.add(np.char.upper(np.char.replace(state_names, " ", "_")), "_D"),
+                                 district_idx.astype(str))
+    area = rng.lognormal(7, 1.5, n).round(0)
+    production = (area * rng.lognormal(0.3, 0.6, n)).round(0)
+    production[rng.random(n) < 0.005] = np.nan
+    production[rng.random(n) < 0.005] = 0
+
+    return pd.DataFrame({
+        "State_Name": state_names,
+        "District_Name": district_names,
+        "Crop_Year": rng.integers(YEARS[0], YEARS[1] + 1, n),
+        "Season": np.array(SEASONS)[rng.integers(0, len(SEASONS), n)],
+        "Crop": np.array(CROPS)[rng.integers(0, len(CROPS), n)],
+        "Area": area,
+        "Production": production,
+    })
+
+
+# ==============================================================================
+# Timing
+# ==============================================================================
+
+class Recorder:
+    """Collects timings as {name, scale, seconds, runs, ...} records."""
+
+    def __init__(self, repeat: int):
+        self.repeat = repeat
+        self.results = []
+        self.scale = None
+
+    def time(self, name: str, fn, repeat: int = None, setup=None, **attrs):
+        """Runs fn (after setup, untimed) `repeat` times; records the median; returns the last result."""
+        timings = []
+        for _ in range(repeat or self.repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            result = fn()
+            timings.append(time.perf_counter() - start)
+        if isinstance(result, pd.DataFrame):
+            attrs.setdefault("rows", len(result))
+        self.record(name, timings, **attrs)
+        return result
+
+    def record(self, name: str, timings: list, **attrs) -> None:
+        """Records timings (seconds) measured elsewhere, e.g. in a subprocess."""
+        record = {"name": name, "scale": self.scale, "seconds": statistics.median(timings),
+                  "min_seconds": min(timings), "runs": len(timings), **attrs}
+        self.results.append(record)
+        print(f"  {name:<45} {record['seconds'] * 1000:>10.1f} ms")
+
+
+@contextmanager
+def working_directory(path: str):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def clear_data_caches() -> None:
+    """Forgets every per-process data cache so the next read is cold."""
+    read_table.cache_clear()
+    _read_full_csv.cache_clear()
+    load_rollups.cache_clear()
+
+
+# ==============================================================================
+# Benchmarks
+# ==============================================================================
+
+def bench_etl(rec: Recorder, crop_raw: pd.DataFrame, rainfall_raw: pd.DataFrame):
+    """The preprocess.ipynb merge logic, stage by stage (etl.py)."""
+    crop_df = rec.time("etl.clean_crop", lambda: etl.clean_crop(crop_raw), repeat=1)
+    rainfall_df = rec.time("etl.clean_rainfall", lambda: etl.clean_rainfall(rainfall_raw), repeat=1)
+    integrated = rec.time("etl.integrate", lambda: etl.integrate(crop_df, rainfall_df), repeat=1)
+    tidy_df = rec.time("etl.tidy", lambda: etl.tidy(integrated), repeat=1)
+
+    os.makedirs("datasets", exist_ok=True)
+    integrated.to_csv("datasets/crop_rainfall_integrated.csv", index=False)
+    tidy_df.to_csv(INTEGRATED_CSV, index=False)
+    rainfall_df.to_csv(RAINFALL_CSV, index=False)
+
+
+def bench_ingest(rec: Recorder):
+    """setup_db.py: bulk load, then the post-load optimisation pass."""
+    def ingest():
+        if os.path.exists(DATABASE_FILE):
+            os.remove(DATABASE_FILE)
+        conn = sqlite3.connect(DATABASE_FILE, isolation_level=None)
+        try:
+            return setup_db.load_bulk(conn, INTEGRATED_CSV)
+        finally:
+            conn.close()
+
+    rows = rec.time("setup_db.load_bulk", ingest, repeat=1)
+    conn = sqlite3.connect(DATABASE_FILE, isolation_level=None)
+    rec.time("setup_db.optimize_for_reads", lambda: setup_db.optimize_for_reads(conn), repeat=1, rows=rows)
+    conn.close()
+
+
+def bench_pages(rec: Recorder):
+    """The shared data layer and each page's load + query path."""
+    rec.time("data.read_csv_cold", lambda: read_table(INTEGRATED_CSV), setup=clear_data_caches)
+    rec.time("data.build_snapshot", lambda: build_snapshot(INTEGRATED_CSV), repeat=1)
+    build_snapshot("datasets/crop_rainfall_integrated.csv", "State_Name", "YEAR")
+    rec.time("data.read_snapshot_cold", lambda: read_table(INTEGRATED_CSV), setup=clear_data_caches)
+    rec.time("data.read_snapshot_one_state",
+             lambda: read_table(INTEGRATED_CSV, ("year", "annual_rainfall_mm"), (("state", "==", "bihar"),)),
+             setup=clear_data_caches)
+
+    clear_data_caches()
+    rollups = rec.time("page.rollups_build_cold", lambda: load_rollups(), setup=clear_data_caches)
+    crop, state = rollups.crops[0], rollups.states[0]
+    rec.time("page.overview_load_cold", lambda: read_table(INTEGRATED_CSV), setup=clear_data_caches)
+    rec.time("page.production_by_state",
+             lambda: [rollups.production_by_state(c) for c in rollups.crops][-1], calls=len(rollups.crops))
+    rec.time("page.yield_by_crop",
+             lambda: [rollups.yield_by_crop(s) for s in rollups.states][-1], calls=len(rollups.states))
+    rec.time("page.yearly_by_place_state", lambda: rollups.yearly_by_place(crop, "State", state))
+    rec.time("page.yearly_by_place_district",
+             lambda: rollups.yearly_by_place(crop, "District", rollups.districts[0]))
+    rec.time("page.rainfall_chart",
+             lambda: line_chart(rollups.rainfall_by_year(state), x="year", y="annual_rainfall_mm"))
+
+    store = rec.time("rainfall_store.open_cold", lambda: MonthlyRainfall.open(RAINFALL_CSV), repeat=1)
+    rec.time("rainfall_store.window_all", lambda: store.window_totals(month_window("JUN", "JUL")))
+    rec.time("rainfall_store.anomalies_all", lambda: store.anomalies(month_window("JUN", "SEP")))
+
+
+# Runs one page with AppTest in a fresh interpreter and prints its page.first_data span (ms).
+FIRST_DATA_SCRIPT = """
+import sys
+from streamlit.testing.v1 import AppTest
+import tracing
+AppTest.from_file(sys.argv[1], default_timeout=300).run()
+print(next(s.duration_ms for s in tracing.RECENT if s.name == "page.first_data"))
+"""
+
+
+def page_scripts() -> list:
+    root = os.path.dirname(os.path.abspath(__file__))
+    pages = sorted(os.path.join(root, "pages", name) for name in os.listdir(os.path.join(root, "pages"))
+                   if name.endswith(".py"))
+    return [os.path.join(root, "Home.py"), os.path.join(root, "app.py")] + pages
+
+
+def bench_first_data(rec: Recorder):
+    """Each page's cold time to first data (imports and dataset parsing included), in a fresh interpreter per page."""
+    root = os.path.dirname(os.path.abspath(__file__))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [root, os.getenv("PYTHONPATH")]))}
+    env.pop("OPENAI_API_KEY", None)
+    for script in page_scripts():
+        page = os.path.splitext(os.path.basename(script))[0]
+        result = subprocess.run([sys.executable, "-c", FIRST_DATA_SCRIPT, script],
+                                capture_output=True, text=True, env=env)
+        try:
+            ms = float(result.stdout.strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            print(f"    {page}: no first data recorded\n{result.stderr[-500:]}")
+            continue
+        rec.record(f"page.first_data_cold[{page}]", [ms / 1000], page=page)
+
+
+def bench_qa_system(rec: Recorder):
+    """SamarthQASystem (app.py) load, index build and one question per intent."""
+    system = rec.time("qa.load", lambda: SamarthQASystem("datasets/crop_rainfall_integrated.csv"),
+                      setup=clear_data_caches, repeat=1)
+    for i, question in enumerate(QA_QUESTIONS):
+        rec.time(f"qa.answer_query[{i}]", lambda q=question: system.answer_query(q), question=question)
+
+
+def template_queries() -> list:
+    """The example SQL of every SYSTEM_PROMPT template."""
+    return re.findall(r'\{"sql_query": "(.*?)"\}', SYSTEM_PROMPT)
+
+
+def bench_chatbot(rec: Recorder, base_url: str):
+    """prompt_to_sql and execute_sql as the chatbot runs them, against the stub LLM."""
+    client = LLMGateway("stub", base_url=base_url)
+    pipeline = ChatPipeline(DATABASE_FILE, client, backend="sqlite")
+    rec.time("chat.local_translator_build", lambda: pipeline.local_translator, repeat=1)
+    prompt = rec.time("chat.prompt_build", lambda: pipeline.prompt_builder.build(LLM_QUESTION),
+                      question=LLM_QUESTION)
+    print(f"    LLM system prompt: ~{estimate_tokens(prompt)} tokens (all templates: ~{estimate_tokens(SYSTEM_PROMPT)})")
+    corpus = template_queries()
+    for i, question in enumerate(CHAT_QUESTIONS):
+        sql_query = rec.time(f"chat.prompt_to_sql_local[{i}]", lambda q=question: pipeline.prompt_to_sql(q),
+                             question=question)
+        corpus.append(sql_query)
+    rec.time("chat.prompt_to_sql_llm_stub", lambda: pipeline.prompt_to_sql(LLM_QUESTION),
+             setup=lambda: pipeline.translation_cache.discard(LLM_QUESTION))
+    rec.time("chat.prompt_to_sql_cached", lambda: pipeline.prompt_to_sql(LLM_QUESTION))
+
+    for i, sql_query in enumerate(corpus):
+        result = rec.time(f"chat.execute_sql_cold[{i}]", lambda q=sql_query: pipeline.execute_sql(q),
+                          setup=pipeline.result_cache.clear, sql=sql_query)
+        if not isinstance(result, pd.DataFrame):
+            print(f"    query {i} failed: {result}")
+        rec.time(f"chat.execute_sql_cached[{i}]", lambda q=sql_query: pipeline.execute_sql(q), sql=sql_query)
+    pipeline.pool.close()
+    bench_duckdb(rec, corpus)
+
+
+def bench_duckdb(rec: Recorder, corpus: list):
+    """The execute_sql corpus again on the DuckDB backend (Parquet source), if duckdb is installed."""
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        print("    duckdb not installed; skipping the DuckDB backend")
+        return
+    from sql_backends import export_parquet, parquet_export_path
+
+    pipeline = ChatPipeline(DATABASE_FILE, backend="duckdb")
+    rec.time("chat.duckdb.export_parquet", lambda: export_parquet(DATABASE_FILE), repeat=1)
+    rec.time("chat.duckdb.open", pipeline.backend._database, repeat=1)
+    for i, sql_query in enumerate(corpus):
+        result = rec.time(f"chat.duckdb.execute_sql_cold[{i}]", lambda q=sql_query: pipeline.execute_sql(q),
+                          setup=pipeline.result_cache.clear, sql=sql_query)
+        if not isinstance(result, pd.DataFrame):
+            print(f"    DuckDB query {i} failed: {result}")
+    pipeline.backend.close()
+    pipeline.pool.close()
+    shutil.rmtree(parquet_export_path(DATABASE_FILE), ignore_errors=True)
+
+
+def run_scale(rec: Recorder, scale: float, workdir: str, base_url: str, rainfall_csv: str) -> None:
+    rec.scale = scale
+    rainfall_raw = pd.read_csv(rainfall_csv)
+    with working_directory(workdir):
+        print(f"Scale {scale}x ({int(BASE_CROP_ROWS * scale):,} crop rows)")
+        crop_raw = rec.time("generate", lambda: synthetic_crop(scale), repeat=1)
+        bench_etl(rec, crop_raw, rainfall_raw)
+        bench_ingest(rec)
+        bench_pages(rec)
+        bench_first_data(rec)
+        bench_qa_system(rec)
+        bench_chatbot(rec, base_url)
+        clear_data_caches()
+
+
+# ==============================================================================
+# Reporting
+# ==============================================================================
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "sqlite": sqlite3.sqlite_version,
+    }
+
+
+def compare(current: list, baseline_path: str, tolerance: float) -> list:
+    """Prints current/baseline ratios; returns the benchmarks slower than 1 + tolerance."""
+    with open(baseline_path) as f:
+        baseline = {(r["name"], r["scale"]): r["seconds"] for r in json.load(f)["results"]}
+    regressions = []
+    print(f"\nComparison with {baseline_path} (tolerance {tolerance:.0%}):")
+    for record in current:
+        before = baseline.get((record["name"], record["scale"]))
+        if not before:
+            continue
+        ratio = record["seconds"] / before
+        flag = ""
+        # Sub-millisecond timings are too noisy to call regressions.
+        if ratio > 1 + tolerance and record["seconds"] > 5e-3:
+            regressions.append(record["name"])
+            flag = "  REGRESSION"
+        print(f"  {record['name']:<45} {record['scale']:>5}x {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ETL, ingest, page queries and the chatbot offline.")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1], help="dataset scales (1 = ~246k crop rows)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query benchmark (median is reported)")
+    parser.add_argument("--rainfall", default=RAINFALL_CSV, help="monthly IMD rainfall CSV to integrate against")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="slowdown ratio above which --compare reports a regression")
+    parser.add_argument("--keep", action="store_true", help="keep the generated working directories")
+    args = parser.parse_args()
+
+    rainfall_csv = os.path.abspath(args.rainfall)
+    stub = serve()
+    base_url = f"http://127.0.0.1:{stub.server_port}/v1"
+    rec = Recorder(args.repeat)
+    try:
+        for scale in args.scales:
+            workdir = tempfile.mkdtemp(prefix=f"samarth-bench-{scale:g}x-")
+            try:
+                run_scale(rec, scale, workdir, base_url, rainfall_csv)
+            finally:
+                if args.keep:
+                    print(f"  data kept in {workdir}")
+                else:
+                    shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        stub.shutdown()
+
+    with open(args.output, "w") as f:
+        json.dump({"environment": environment(), "results": rec.results}, f, indent=2, default=str)
+    print(f"\nWrote {len(rec.results)} results to {args.output}")
+
+    if args.compare and compare(rec.results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
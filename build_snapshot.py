@@ -0,0 +1,36 @@
+import os
+
+from chat_pipeline import DATABASE_FILE
+from data_loader import INTEGRATED_CSV, SNAPSHOT_PARTITIONS, build_snapshot
+from rainfall_store import RAINFALL_CSV, build_store
+from sql_backends import BACKEND_ENV, export_parquet
+
+# Source CSVs and the (partition, cluster) columns of each snapshot.
+# The raw (un-renamed) integration output is read by the Q&A system in app.py.
+SNAPSHOTS = [
+    (INTEGRATED_CSV, SNAPSHOT_PARTITIONS),
+    ("datasets/crop_rainfall_integrated.csv", ("State_Name", "YEAR")),
+]
+
+
+def main():
+    print("Starting Parquet snapshot build...")
+    for csv_path, partition_cols in SNAPSHOTS:
+        if not os.path.exists(csv_path):
+            print(f"Skipping '{csv_path}': file not found.")
+            continue
+        snapshot = build_snapshot(csv_path, *partition_cols)
+        print(f"Wrote '{snapshot}' keyed by {', '.join(partition_cols)}.")
+    if os.path.exists(RAINFALL_CSV):
+        print(f"Wrote monthly rainfall store '{build_store(RAINFALL_CSV)}'.")
+    else:
+        print(f"Skipping '{RAINFALL_CSV}': file not found.")
+    # The DuckDB backend's Parquet export of the chatbot database (sql_backends.py), so the
+    # first chatbot query does not pay for it.
+    if os.getenv(BACKEND_ENV) == "duckdb" and os.path.exists(DATABASE_FILE):
+        print(f"Wrote DuckDB Parquet export '{export_parquet(DATABASE_FILE)}'.")
+    print("Snapshot build complete.")
+
+
+if __name__ == "__main__":
+    main()
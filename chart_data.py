@@ -0,0 +1,102 @@
+from typing import Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+# --- Chart data preparation ---
+# Every chart is reduced on the server before it is handed to Plotly:
+# 1. to_grain(): one row per x value (and colour), so duplicated rows never reach the browser;
+# 2. downsample(): series longer than MAX_POINTS are cut to that budget with LTTB
+#    (largest-triangle-three-buckets, keeps the visual shape) or per-bucket min/max (keeps spikes);
+# 3. series that are still large after that are drawn with WebGL (scattergl) traces.
+# The payload and the browser's render time are therefore bounded by MAX_POINTS, not by row count.
+
+MAX_POINTS = 2_000
+WEBGL_THRESHOLD = 1_000
+
+# plotly.express is imported by the chart builders, not here: pages import this module before
+# their first paint, and plotly's import is the slowest part of it.
+
+
+def to_grain(df: pd.DataFrame, keys: Union[str, Sequence[str]], values: Union[str, Sequence[str]],
+             agg: str = "mean") -> pd.DataFrame:
+    """One row per distinct `keys`, aggregating `values` with `agg`, sorted by `keys`."""
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    values = [values] if isinstance(values, str) else list(values)
+    if not df.duplicated(keys).any():
+        return df[keys + values].sort_values(keys, kind="stable").reset_index(drop=True)
+    return df.groupby(keys, observed=True, sort=True)[values].agg(agg).reset_index()
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Row positions chosen by largest-triangle-three-buckets; x must be sorted."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    # Bucket i (of n_out - 2) covers [edges[i], edges[i + 1]); the first and last points are fixed.
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    bucket_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / np.diff(edges)
+    bucket_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / np.diff(edges)
+
+    chosen = np.empty(n_out, dtype=np.int64)
+    chosen[0], chosen[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point for the final bucket).
+        next_x = bucket_x[i + 1] if i + 1 < n_out - 2 else x[-1]
+        next_y = bucket_y[i + 1] if i + 1 < n_out - 2 else y[-1]
+        area = np.abs((x[a] - next_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (next_y - y[a]))
+        a = start + int(np.argmax(area))
+        chosen[i + 1] = a
+    return chosen
+
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Row positions of the min and max of each of n_out / 2 equal-count buckets (plus the ends)."""
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    buckets = pd.Series(np.asarray(y, dtype=float)).groupby(np.arange(n) * (n_out // 2) // n)
+    picked = np.concatenate([buckets.idxmin().dropna(), buckets.idxmax().dropna(), [0, n - 1]])
+    return np.unique(picked.astype(np.int64))
+
+
+def downsample(df: pd.DataFrame, x: str, y: Union[str, Sequence[str]],
+               max_points: int = MAX_POINTS, method: str = "lttb") -> pd.DataFrame:
+    """
+    At most ~`max_points` rows of a frame sorted by `x`. With several y columns each is
+    downsampled on its own budget share and the union of the chosen rows is kept.
+    """
+    if len(df) <= max_points:
+        return df
+    columns = [y] if isinstance(y, str) else list(y)
+    pick = lttb_indices if method == "lttb" else minmax_indices
+    budget = max(max_points // len(columns), 3)
+    keep = []
+    for column in columns:
+        finite = np.flatnonzero(df[column].notna().to_numpy())
+        chosen = pick(df[x].to_numpy()[finite], df[column].to_numpy()[finite], budget)
+        keep.append(finite[chosen])
+    return df.iloc[np.unique(np.concatenate(keep))]
+
+
+def line_chart(df: pd.DataFrame, x: str, y: Union[str, Sequence[str]], max_points: int = MAX_POINTS,
+               method: str = "lttb", agg: str = "mean", **px_kwargs):
+    """
+    px.line over data reduced to one row per `x`, downsampled to `max_points`,
+    and rendered with WebGL when it still has more than WEBGL_THRESHOLD points.
+    """
+    import plotly.express as px
+
+    data = downsample(to_grain(df, x, y, agg), x, y, max_points, method)
+    render_mode = "webgl" if len(data) > WEBGL_THRESHOLD else "auto"
+    return px.line(data, x=x, y=y, render_mode=render_mode, **px_kwargs)
+
+
+def bar_chart(df: pd.DataFrame, x: str, y: str, agg: str = "sum", **px_kwargs):
+    """px.bar over data reduced to one bar per `x`."""
+    import plotly.express as px
+
+    return px.bar(to_grain(df, x, y, agg), x=x, y=y, **px_kwargs)
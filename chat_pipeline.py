@@ -0,0 +1,202 @@
+import json
+import sqlite3
+from typing import Optional
+
+import pandas as pd
+
+from db_pool import ConnectionPool
+from prompt_builder import SYSTEM_PROMPT, PromptBuilder
+from query_guard import QueryRejected
+from result_cache import ResultCache, database_generation
+from sql_backends import open_backend
+from text_to_sql import STATE_RAINFALL_VIEW, EntityIndex, LocalTranslator, has_table
+from tracing import span
+from translation_cache import TranslationCache, schema_fingerprint
+
+# --- Question -> SQL -> result pipeline behind the chatbot ---
+# Kept free of Streamlit so the chatbot page, the benchmarks and headless tools share one
+# implementation: translation cache -> local translator -> LLM for the SQL, then the
+# result cache and the guarded SQL backend for execution (sql_backends.py: the pooled SQLite
+# connections by default, or an embedded DuckDB database).
+
+DATABASE_FILE = 'samarth_agri_climate.db'
+TABLE_NAME = 'integrated_data'
+
+# --- SYSTEM PROMPT ---
+# The prompt is assembled per question by prompt_builder.py (relevant templates, canonical
+# entity values, token budget). SYSTEM_PROMPT there is the full version of it.
+# Bump PROMPT_VERSION whenever the prompt or model changes: it is part of the translation cache key.
+PROMPT_VERSION = "4"
+
+# LLM SQL that does not compile is sent back once with the SQLite error before giving up.
+MAX_SQL_REPAIRS = 1
+
+
+class ChatPipeline:
+    """
+    The caches, local translator and SQL backend for one database, plus an optional LLM gateway.
+    `backend` names the backend that runs execute_sql (default: $SAMARTH_SQL_BACKEND, else sqlite);
+    the local translator always reads the SQLite pool.
+    """
+
+    def __init__(self, database_file: str = DATABASE_FILE, client=None, backend: Optional[str] = None):
+        self.database_file = database_file
+        self.client = client
+        self.pool = ConnectionPool(database_file)
+        self.backend = open_backend(backend, database_file, self.pool)
+        # The backend is part of the context: SQL that compiles on one dialect may not on the other.
+        context = "|".join([PROMPT_VERSION, SYSTEM_PROMPT, schema_fingerprint(database_file), self.backend.name])
+        self.translation_cache = TranslationCache(context)
+        self.result_cache = ResultCache(database_file)
+        self._local_translator = None
+        self._prompt_builder = None
+
+    @property
+    def local_translator(self) -> LocalTranslator:
+        """Template-based Text-to-SQL over the database's distinct entities (built on first use)."""
+        if self._local_translator is None:
+            with self.pool.connection() as conn:
+                rainfall_table = STATE_RAINFALL_VIEW if has_table(conn, STATE_RAINFALL_VIEW) else None
+                self._local_translator = LocalTranslator(EntityIndex.from_sqlite(conn, TABLE_NAME), rainfall_table)
+        return self._local_translator
+
+    @property
+    def prompt_builder(self) -> PromptBuilder:
+        """Per-question LLM prompts, with entity hints from the local translator's index when it can be built."""
+        if self._prompt_builder is None:
+            try:
+                index = self.local_translator.index
+            except sqlite3.Error:
+                index = None
+            self._prompt_builder = PromptBuilder(index, dialect=self.backend.name)
+        return self._prompt_builder
+
+    def sql_error(self, sql_query: str) -> Optional[str]:
+        """Why `sql_query` cannot run (not a single SELECT, or the backend cannot compile it), or None."""
+        try:
+            self.backend.check(sql_query)
+        except (QueryRejected,) + self.backend.errors as e:
+            return str(e)
+        return None
+
+    def prompt_to_sql(self, prompt: str) -> Optional[str]:
+        """
+        Translates a natural language prompt into an SQL query.
+        Repeat questions are answered from the translation cache, and the common question shapes
+        (compare, top-k, trend, correlation) by the local translator; only the rest reach the LLM.
+        The LLM gets a prompt built for the question (see prompt_builder.py); SQL it returns that
+        does not compile is sent back with the error, up to MAX_SQL_REPAIRS times, and only
+        compiling SQL is cached.
+        Returns None without a client; LLM and JSON errors propagate to the caller.
+        """
+        with span("chat.prompt_to_sql") as current:
+            cached_sql = self.translation_cache.get(prompt)
+            if cached_sql is not None:
+                current.set(source="cache")
+                return cached_sql
+
+            try:
+                local_sql = self.local_translator.translate(prompt)
+            except sqlite3.Error:
+                local_sql = None  # no usable entity index; the LLM still works
+            if local_sql is not None:
+                current.set(source="local")
+                return local_sql
+
+            if self.client is None:
+                current.set(source="none")
+                return None
+
+            current.set(source="llm")
+            messages = [
+                {"role": "system", "content": self.prompt_builder.build(prompt)},
+                {"role": "user", "content": prompt}
+            ]
+            for attempt in range(MAX_SQL_REPAIRS + 1):
+                json_content = self.client.run(self.client.chat(
+                    response_format={"type": "json_object"},
+                    messages=messages,
+                    temperature=0.0 # Use low temperature for deterministic SQL generation
+                ))
+                sql_query = json.loads(json_content).get("sql_query")
+                error = self.sql_error(sql_query) if sql_query else None
+                if error is None:
+                    break
+                if attempt == MAX_SQL_REPAIRS:
+                    current.set(sql_error=error)
+                    break
+                current.set(repairs=attempt + 1)
+                messages += [
+                    {"role": "assistant", "content": json_content},
+                    {"role": "user", "content": f"That query fails: {error}. "
+                                                "Reply with a corrected query in the same JSON format."},
+                ]
+            if sql_query and error is None:
+                self.translation_cache.put(prompt, sql_query)
+            return sql_query
+
+    def execute_sql(self, sql_query: str) -> Optional[pd.DataFrame | str]:
+        """
+        Executes the generated SQL query on the SQL backend (SQLite or DuckDB).
+        Results are served from the result cache while the database is unchanged.
+        The query runs under the query_guard limits (single SELECT, plan check, timeout, row cap).
+        Errors are returned as a message string.
+        """
+        with span("chat.execute_sql") as current:
+            cached_df = self.result_cache.get(sql_query)
+            if cached_df is not None:
+                current.set(cache_hit=True, rows=len(cached_df))
+                return cached_df
+
+            current.set(cache_hit=False, backend=self.backend.name)
+            # Taken before the query runs, so a result read during a rebuild is not cached as current.
+            generation = database_generation(self.database_file)
+            try:
+                result_df = self.backend.read_sql(sql_query)
+                self.result_cache.put(sql_query, result_df, generation)
+                current.set(rows=len(result_df), truncated=bool(result_df.attrs.get("truncated")))
+                return result_df
+            except QueryRejected as e:
+                current.set(rejected=True)
+                return f"Query rejected: {e}"
+            except self.backend.errors as e:
+                return str(e)
+            except Exception as e:
+                return f"Unexpected execution error: {str(e)}"
+
+
+def build_synthesis_messages(df: pd.DataFrame, prompt: str) -> list:
+    """The chat messages asking the LLM to summarise a query result (used when answer_synthesis cannot)."""
+    # Create a concise string representation of the data frame
+    data_summary = df.head(5).to_markdown(index=False)
+    # Statistics of the whole result, so larger results are not summarised from 5 rows.
+    numeric = df.select_dtypes("number")
+    column_summary = numeric.describe().T.to_markdown() if not numeric.empty else "(no numeric columns)"
+
+    synthesis_prompt = f"""
+    You are an agricultural data analyst. Summarize the key findings from the provided 
+    data result in a concise, human-readable sentence. 
+    
+    Original Question: "{prompt}"
+    
+    Data Result (Top 5 of {len(df)} Rows):
+    {data_summary}
+
+    Column Statistics (All {len(df)} Rows):
+    {column_summary}
+    """
+    return [{"role": "user", "content": synthesis_prompt}]
+
+
+def build_polish_messages(answer: str, prompt: str) -> list:
+    """The chat messages asking the LLM to reword a locally synthesised answer, keeping its numbers."""
+    polish_prompt = f"""
+    You are an agricultural data analyst. Rewrite the draft answer below as a short, fluent
+    answer to the question. Keep every number exactly as written and do not add facts.
+
+    Original Question: "{prompt}"
+
+    Draft Answer:
+    {answer}
+    """
+    return [{"role": "user", "content": polish_prompt}]
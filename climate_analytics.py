@@ -0,0 +1,155 @@
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+# --- Vectorised climate-sensitivity engine ---
+# Crop rows are first reduced to one row per (group..., year). The integrated data repeats
+# every crop record once per rainfall subdivision of its state (Maharashtra x4,
+# Karnataka x3), so production and area are summed over the distinct crop records
+# (yield = production / area) and rainfall is averaged over the distinct subdivisions. The result is sorted by group
+# and year, so every group is a contiguous run and each statistic below is a handful of
+# np.bincount reductions over the whole frame, never a Python loop over groups:
+# - Pearson r of yield and production with annual and JJAS rainfall,
+# - least-squares trend slopes (units per year) of yield and production,
+# - rainfall lagged by `lag` years and averaged over a trailing `window` of years, using
+#   prefix sums looked up by (group, year) with searchsorted, so gaps in the years are respected.
+
+# Logical column -> column name in the cleaned integrated dataset.
+CLEAN_COLUMNS = {
+    "state": "state", "district": "district", "crop": "crop", "season": "season", "year": "year",
+    "subdivision": "subdivision", "production": "production_tonnes", "area": "area_ha",
+    "annual": "annual_rainfall_mm", "jjas": "jjas",
+}
+# The same for the raw integrated CSV (as loaded by app.py).
+RAW_COLUMNS = {
+    "state": "State_Name", "district": "District_Name", "crop": "Crop", "season": "Season", "year": "YEAR",
+    "subdivision": "SUBDIVISION", "production": "Production", "area": "Area", "annual": "ANNUAL", "jjas": "JJAS",
+}
+
+MIN_YEARS = 5
+
+# One crop record: the integrated rows repeat it for each subdivision of its state. Distinct
+# records that share the key are summed, as in the database (setup_db.stage_facts).
+CROP_KEY = ["state", "district", "crop", "season", "year"]
+
+
+def crop_records(frame: pd.DataFrame) -> pd.DataFrame:
+    """The rows of one subdivision (the first by name) per crop key, identical lines once."""
+    frame = frame.drop_duplicates()
+    # Codes in name order; a missing subdivision is -1 and comes first, as NULL does in SQLite.
+    codes = pd.Series(pd.factorize(np.asarray(frame["subdivision"], dtype=object), sort=True)[0], index=frame.index)
+    first = codes.groupby([frame[c] for c in CROP_KEY], observed=True, dropna=False).transform("min")
+    return frame[codes == first]
+
+
+def yearly_series(df: pd.DataFrame, by: Sequence[str], columns: dict = CLEAN_COLUMNS) -> pd.DataFrame:
+    """
+    One row per (by..., year), sorted, with columns production, area, yield, annual, jjas.
+    `by` uses logical names (e.g. ("state", "crop")); `columns` maps them to `df`.
+    """
+    by = list(by)
+    keys = by + ["year"]
+    wanted = list(dict.fromkeys(keys + CROP_KEY + ["subdivision", "production", "area", "annual", "jjas"]))
+    frame = df[[columns[c] for c in wanted]].set_axis(wanted, axis=1)
+    crops = crop_records(frame).groupby(keys, observed=True, sort=True).agg(
+        production=("production", "sum"),
+        area=("area", "sum"),
+    )
+    rainfall = frame.drop_duplicates(by + ["subdivision", "year"]).groupby(keys, observed=True, sort=True).agg(
+        annual=("annual", "mean"),
+        jjas=("jjas", "mean"),
+    )
+    yearly = crops.join(rainfall).reset_index()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        yearly["yield"] = np.where(yearly["area"] > 0, yearly["production"] / yearly["area"], np.nan)
+    return yearly
+
+
+def _group_keys(codes: np.ndarray, years: np.ndarray, pad: int):
+    """Sortable (group, year) keys with `pad` spare years below each group's range."""
+    years = years.astype(np.int64)
+    offset = years.min() - pad
+    stride = years.max() - offset + 1
+    return codes.astype(np.int64) * stride + (years - offset)
+
+
+def window_mean(codes: np.ndarray, years: np.ndarray, values: np.ndarray,
+                lag: int = 0, window: int = 1) -> np.ndarray:
+    """
+    For each row, the mean of its group's values over the years [y - lag - window + 1, y - lag].
+    Years with no row or a NaN value are skipped; NaN when none remain.
+    """
+    values = values.astype(float)
+    if lag == 0 and window <= 1:
+        return values
+    keys = _group_keys(codes, years, lag + window)
+    finite = np.isfinite(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(finite, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(finite)))
+    lo = np.searchsorted(keys, keys - lag - window + 1, side="left")
+    hi = np.searchsorted(keys, keys - lag, side="right")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (sums[hi] - sums[lo]) / (counts[hi] - counts[lo])
+
+
+def grouped_corr(codes: np.ndarray, x: np.ndarray, y: np.ndarray, n_groups: int):
+    """Per-group Pearson r of x and y over pairs where both are finite; returns (r, n)."""
+    ok = np.isfinite(x) & np.isfinite(y)
+    c, x, y = codes[ok], x[ok], y[ok]
+    n = np.bincount(c, minlength=n_groups).astype(float)
+    sx, sy = np.bincount(c, x, n_groups), np.bincount(c, y, n_groups)
+    sxx, syy = np.bincount(c, x * x, n_groups), np.bincount(c, y * y, n_groups)
+    sxy = np.bincount(c, x * y, n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = n * sxy - sx * sy
+        r = cov / np.sqrt((n * sxx - sx * sx) * (n * syy - sy * sy))
+    return np.clip(r, -1.0, 1.0), n
+
+
+def grouped_slope(codes: np.ndarray, t: np.ndarray, y: np.ndarray, n_groups: int) -> np.ndarray:
+    """Per-group least-squares slope of y on t."""
+    ok = np.isfinite(y)
+    c, t, y = codes[ok], t[ok].astype(float), y[ok]
+    n = np.bincount(c, minlength=n_groups).astype(float)
+    st, sy = np.bincount(c, t, n_groups), np.bincount(c, y, n_groups)
+    stt, sty = np.bincount(c, t * t, n_groups), np.bincount(c, t * y, n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (n * sty - st * sy) / (n * stt - st * st)
+
+
+def climate_sensitivity(df: pd.DataFrame, by: Sequence[str] = ("state", "crop"),
+                        columns: dict = CLEAN_COLUMNS, lag: int = 0, window: int = 1,
+                        min_years: int = MIN_YEARS) -> pd.DataFrame:
+    """
+    Ranks every group of `by` by how strongly its yield and production track rainfall.
+
+    Rainfall is optionally lagged by `lag` years and averaged over a trailing `window` of
+    years before correlating. Returns one row per group with at least `min_years` years:
+    n_years, r_{yield,production}_{annual,jjas}, {yield,production}_trend (per year) and
+    sensitivity = the largest |r|, sorted by sensitivity (most climate-sensitive first).
+    """
+    yearly = yearly_series(df, by, columns)
+    codes = yearly.groupby(list(by), observed=True, sort=False).ngroup().to_numpy()
+    years = yearly["year"].to_numpy()
+    groups = yearly.drop_duplicates(list(by))[list(by)].reset_index(drop=True)
+    n_groups = len(groups)
+
+    result = groups.assign(first_year=yearly.groupby(codes)["year"].min().to_numpy(),
+                           last_year=yearly.groupby(codes)["year"].max().to_numpy())
+    n_years = None
+    r_columns = []
+    for rain in ("annual", "jjas"):
+        x = window_mean(codes, years, yearly[rain].to_numpy(), lag, window)
+        for outcome in ("yield", "production"):
+            r, n = grouped_corr(codes, x, yearly[outcome].to_numpy(dtype=float), n_groups)
+            result[f"r_{outcome}_{rain}"] = r
+            r_columns.append(f"r_{outcome}_{rain}")
+            n_years = n if n_years is None else np.maximum(n_years, n)
+    result.insert(len(by), "n_years", n_years.astype(int))
+    for outcome in ("yield", "production"):
+        result[f"{outcome}_trend"] = grouped_slope(codes, years, yearly[outcome].to_numpy(dtype=float), n_groups)
+
+    result["sensitivity"] = result[r_columns].abs().max(axis=1)
+    result = result[result["n_years"] >= min_years]
+    return result.sort_values("sensitivity", ascending=False, na_position="last").reset_index(drop=True)
@@ -0,0 +1,244 @@
+import functools
+import os
+import shutil
+import threading
+from typing import Optional, Sequence, Tuple
+
+import pandas as pd
+
+from tracing import span
+
+# --- Shared data layer for the dashboard pages ---
+# Every page imports load_integrated_data() from here instead of parsing the CSV itself.
+# The frame is read once per process and shared between all pages and sessions,
+# so callers must treat it as read-only (filter/group it, never assign into it).
+#
+# When a Parquet snapshot of a CSV exists (see build_snapshot.py) it is read instead,
+# so a view only pulls the columns and state/year partitions it actually uses.
+
+INTEGRATED_CSV = "datasets/crop_rainfall_integrated_cleaned.csv"
+
+# Snapshot keys: a directory per state, a row group per year inside it.
+SNAPSHOT_PARTITIONS = ("state", "year")
+
+# Low-cardinality text columns stored as pandas categoricals.
+CATEGORICAL_COLUMNS = ["state", "district", "crop", "season", "subdivision", "state_canonical"]
+
+# Columns the pages rely on, with the kind of data they must hold.
+REQUIRED_COLUMNS = {
+    "state": "text",
+    "district": "text",
+    "year": "integer",
+    "season": "text",
+    "crop": "text",
+    "area_ha": "number",
+    "production_tonnes": "number",
+    "annual_rainfall_mm": "number",
+    "yield_t_per_ha": "number",
+}
+
+# A filter is (column, op, value) with op in ==, !=, <, <=, >, >=, in  (pyarrow's DNF form).
+Filters = Tuple[Tuple[str, str, object], ...]
+
+
+class SchemaError(ValueError):
+    """Raised when the integrated dataset does not have the expected columns/types."""
+
+
+def validate_schema(df: pd.DataFrame, columns: Optional[Sequence[str]] = None) -> None:
+    """
+    Checks that every required column is present and numeric where it should be.
+    With `columns`, only the required columns in that projection are checked.
+    """
+    required = {col: kind for col, kind in REQUIRED_COLUMNS.items() if columns is None or col in columns}
+
+    missing_cols = [col for col in required if col not in df.columns]
+    if missing_cols:
+        raise SchemaError(f"Missing columns in dataset: {', '.join(missing_cols)}")
+
+    wrong_types = [
+        col for col, kind in required.items()
+        if kind != "text" and not pd.api.types.is_numeric_dtype(df[col])
+    ]
+    if wrong_types:
+        raise SchemaError(f"Non-numeric values in numeric columns: {', '.join(wrong_types)}")
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Shrinks the frame in place: categoricals for the text keys and the smallest
+    numeric dtype that holds each column without losing precision.
+    """
+    for col in df.columns:
+        is_categorical = isinstance(df[col].dtype, pd.CategoricalDtype)
+        if col in CATEGORICAL_COLUMNS and not is_categorical:
+            df[col] = df[col].astype("category")
+        elif col not in CATEGORICAL_COLUMNS and is_categorical:
+            # Parquet partition keys (e.g. year) come back dictionary-encoded.
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+
+    for col in df.select_dtypes(include="integer").columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+    for col in df.select_dtypes(include="floating").columns:
+        df[col] = pd.to_numeric(df[col], downcast="float")
+    return df
+
+
+# --- Columnar snapshot ---
+
+def snapshot_path(csv_path: str) -> str:
+    """The Parquet dataset directory that sits next to a CSV (foo.csv -> foo.parquet/)."""
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def has_fresh_snapshot(csv_path: str) -> bool:
+    """True if a snapshot exists and is not older than its source CSV."""
+    snapshot = snapshot_path(csv_path)
+    if not os.path.isdir(snapshot):
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    return os.path.getmtime(snapshot) >= os.path.getmtime(csv_path)
+
+
+def _cluster_file(path: str, cluster_col: str) -> None:
+    """Rewrites one Parquet file sorted by `cluster_col`, one row group per distinct value."""
+    import numpy as np
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path).sort_by(cluster_col)
+    keys = table[cluster_col].to_numpy()
+    bounds = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    starts, ends = np.r_[0, bounds], np.r_[bounds, len(keys)]
+
+    with pq.ParquetWriter(path + ".sorted", table.schema) as writer:
+        for start, end in zip(starts, ends):
+            writer.write_table(table.slice(start, end - start))
+    os.replace(path + ".sorted", path)
+
+
+def build_snapshot(csv_path: str, partition_col: str = SNAPSHOT_PARTITIONS[0],
+                   cluster_col: str = SNAPSHOT_PARTITIONS[1]) -> str:
+    """
+    Converts a CSV into a Parquet dataset keyed by state and year: one hive directory
+    per `partition_col` value (state=bihar/) whose file holds one row group per
+    `cluster_col` value, so year filters are pruned from row-group statistics.
+    (A directory per year as well would mean thousands of tiny files, which costs
+    more to open than the rows they hold.)
+
+    The CSV is streamed in record batches, so at most one state is ever held in
+    memory, and the new snapshot is swapped in only once it is complete.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    snapshot = snapshot_path(csv_path)
+    staging = snapshot + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+
+    source = ds.dataset(csv_path, format="csv")
+    ds.write_dataset(
+        source,
+        staging,
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([source.schema.field(partition_col)]), flavor="hive"),
+        min_rows_per_group=1 << 16,
+        max_rows_per_group=1 << 20,
+        max_partitions=100_000,
+    )
+    for dirpath, _, filenames in os.walk(staging):
+        for filename in filenames:
+            _cluster_file(os.path.join(dirpath, filename), cluster_col)
+
+    shutil.rmtree(snapshot, ignore_errors=True)
+    os.replace(staging, snapshot)
+    return snapshot
+
+
+def _apply_filters(df: pd.DataFrame, filters: Optional[Filters]) -> pd.DataFrame:
+    """Pandas equivalent of the pyarrow row filters, used when reading the CSV."""
+    if not filters:
+        return df
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in filters:
+        if op == "in":
+            mask &= df[col].isin(value)
+        elif op == "==":
+            mask &= df[col] == value
+        elif op == "!=":
+            mask &= df[col] != value
+        elif op == "<":
+            mask &= df[col] < value
+        elif op == "<=":
+            mask &= df[col] <= value
+        elif op == ">":
+            mask &= df[col] > value
+        elif op == ">=":
+            mask &= df[col] >= value
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+    return df[mask]
+
+
+# Serialises CSV parses, so a page and the warmup thread (warmup.py) never parse one twice.
+_csv_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _read_full_csv(path: str) -> pd.DataFrame:
+    """Parses a whole CSV once. Text keys go straight into categoricals."""
+    header = pd.read_csv(path, nrows=0).columns
+    dtypes = {col: "category" for col in CATEGORICAL_COLUMNS if col in header}
+    return compact_dtypes(pd.read_csv(path, dtype=dtypes))
+
+
+@functools.lru_cache(maxsize=32)
+def read_table(path: str, columns: Optional[Tuple[str, ...]] = None,
+               filters: Optional[Filters] = None) -> pd.DataFrame:
+    """
+    Reads a projection/selection of a dataset, preferring its Parquet snapshot.
+    From the snapshot only the requested columns are decoded and partitions that
+    cannot match `filters` are skipped. Without a snapshot the CSV is parsed once
+    and the view is cut from that shared frame.
+    """
+    with span("data.read_table", path=os.path.basename(path)) as current:
+        if has_fresh_snapshot(path):
+            import pyarrow.parquet as pq
+
+            table = pq.read_table(
+                snapshot_path(path),
+                columns=list(columns) if columns else None,
+                filters=list(filters) if filters else None,
+            )
+            df = compact_dtypes(table.to_pandas())
+            current.set(source="parquet", rows=len(df), columns=len(df.columns))
+            return df
+
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Data file not found at {path}")
+
+        with _csv_lock:
+            misses = _read_full_csv.cache_info().misses
+            full = _read_full_csv(path)
+            csv_cached = _read_full_csv.cache_info().misses == misses
+        df = _apply_filters(full, filters)
+        if columns:
+            df = df[list(columns)]
+        current.set(source="csv", csv_cached=csv_cached, rows=len(df), columns=len(df.columns))
+        return df
+
+
+def load_integrated_data(columns: Optional[Tuple[str, ...]] = None,
+                         filters: Optional[Filters] = None,
+                         path: str = INTEGRATED_CSV) -> pd.DataFrame:
+    """
+    Loads the integrated crop + rainfall dataset (cached per process).
+    Pass `columns` and `filters` as tuples to load only what a view needs,
+    e.g. load_integrated_data(("year", "annual_rainfall_mm"), (("state", "==", "bihar"),)).
+    """
+    with span("data.load_integrated_data") as current:
+        misses = read_table.cache_info().misses
+        df = read_table(path, columns, filters)
+        validate_schema(df, columns)
+        current.set(cache_hit=read_table.cache_info().misses == misses, rows=len(df))
+    return df
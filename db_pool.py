@@ -0,0 +1,110 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import sqlite3
+
+# --- Pooled read-only SQLite connections ---
+# Connections are opened lazily (up to POOL_SIZE) with mode=ro and query_only, configured
+# once, and then re-used across queries and sessions. A connection is handed to one thread
+# at a time, so concurrent sessions never share one mid-query.
+# (Streamlit runs every rerun in a fresh thread, so per-thread connections would be
+# reopened on each rerun; a shared pool keeps the warm page cache across reruns.)
+
+POOL_SIZE = 4
+ACQUIRE_TIMEOUT_SECONDS = 30
+
+# Per-connection tuning: memory-map up to 256 MiB of the file, ~64 MiB page cache.
+CONNECTION_PRAGMAS = (
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA query_only=ON',
+    'PRAGMA temp_store=MEMORY',
+)
+
+
+class ConnectionPool:
+    """A bounded pool of read-only connections to one SQLite file, with wait/query metrics."""
+
+    def __init__(self, database_file: str, size: int = POOL_SIZE,
+                 timeout: float = ACQUIRE_TIMEOUT_SECONDS):
+        self.database_file = database_file
+        self.size = size
+        self.timeout = timeout
+        self.stats = {
+            'connections': 0, 'acquires': 0, 'wait_ms_total': 0.0, 'wait_ms_max': 0.0,
+            'queries': 0, 'query_ms_total': 0.0, 'query_ms_max': 0.0,
+        }
+        self._idle = queue.LifoQueue()  # most recently used first: its pages are warmest
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f'file:{self.database_file}?mode=ro', uri=True, check_same_thread=False
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _record(self, kind: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self.stats[f'{kind}_ms_total'] += elapsed_ms
+            self.stats[f'{kind}_ms_max'] = max(self.stats[f'{kind}_ms_max'], elapsed_ms)
+
+    @contextmanager
+    def connection(self):
+        """Borrows a connection, opening a new one only while the pool is below its size."""
+        start = time.perf_counter()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self.stats['connections'] < self.size
+                if can_open:
+                    self.stats['connections'] += 1
+            if can_open:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._lock:
+                        self.stats['connections'] -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No database connection free after {self.timeout}s") from None
+
+        with self._lock:
+            self.stats['acquires'] += 1
+        self._record('wait', (time.perf_counter() - start) * 1000)
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def read_sql(self, sql_query: str, reader=pd.read_sql_query) -> pd.DataFrame:
+        """
+        Runs a query on a pooled connection and returns the result as a DataFrame.
+        `reader(sql_query, conn)` does the actual execution (e.g. query_guard.run_guarded).
+        """
+        with self.connection() as conn:
+            start = time.perf_counter()
+            try:
+                return reader(sql_query, conn)
+            finally:
+                with self._lock:
+                    self.stats['queries'] += 1
+                self._record('query', (time.perf_counter() - start) * 1000)
+
+    def close(self) -> None:
+        """Closes every idle connection."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._lock:
+                self.stats['connections'] -= 1
@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+from typing import Optional
+
+import streamlit as st
+
+import tracing
+import warmup
+
+# --- Optional per-session debug panel ---
+# Each page calls page_start() right after set_page_config (before its title) and finish()
+# at the end. Two sidebar toggles, remembered for the session, decide what finish() shows
+# under the page:
+# - "Show timings": the spans (see tracing.py) recorded during this run, with their attributes;
+# - "Profile this run": a cProfile/pyinstrument report of the script thread for this run.
+# Both are off by default, and the spans are recorded (and logged) either way.
+#
+# Pages draw their title first and import anything heavy (pandas, numpy, plotly) after
+# page_start(), then call DebugRun.data_shown() once their first data element (table, chart,
+# metric) is on the page. That records the page's time to first data, from page_start(): the
+# "page.first_data" span, with cold=True for a page's first run in this process (imports
+# and dataset parsing included); FIRST_DATA_MS keeps the cold and latest values per page.
+
+TIMINGS_KEY = "_debug_show_timings"
+PROFILE_KEY = "_debug_profile"
+
+# page -> {"cold_ms", "last_ms", "runs"} for this process.
+FIRST_DATA_MS = {}
+_first_data_lock = threading.Lock()
+
+
+def _session_toggle(label: str, key: str) -> bool:
+    # Not a widget key: widget state is dropped when switching pages, this survives it.
+    st.session_state[key] = st.sidebar.toggle(label, value=st.session_state.get(key, False))
+    return st.session_state[key]
+
+
+class DebugRun:
+    """The traces (and optional profile) of one script run."""
+
+    def __init__(self, page: str, show_timings: bool, profiler=None, started: Optional[float] = None):
+        self.page = page
+        self.show_timings = show_timings
+        self.profiler = profiler
+        self.started = started
+        self.traces = tracing.start_collecting()
+        self.first_data_ms = None
+
+    def data_shown(self) -> None:
+        """Records the time to first data; call it once the first table/chart/metric is drawn."""
+        if self.started is not None and self.first_data_ms is None:
+            self.first_data_ms = record_first_data(self.page, self.started)
+
+    def finish(self) -> None:
+        """Stops the profiler and renders the panel when it was asked for."""
+        if self.profiler is not None:
+            self.profiler.stop()
+        if not self.show_timings and self.profiler is None:
+            return
+
+        with st.expander(f"🛠️ Debug: {self.page}", expanded=True):
+            if self.show_timings and self.first_data_ms is not None:
+                first = FIRST_DATA_MS[self.page]
+                st.caption(f"First data: {self.first_data_ms:,.0f} ms this run · "
+                           f"{first['cold_ms']:,.0f} ms on the process's first run of this page")
+            if self.show_timings:
+                import pandas as pd
+
+                rows = [
+                    {
+                        "span": "· " * depth + span.name,
+                        "ms": round(span.duration_ms or 0.0, 2),
+                        "attributes": json.dumps(span.attributes, default=str),
+                        "error": span.error or "",
+                    }
+                    for trace in self.traces
+                    for depth, span in trace.walk()
+                ]
+                if rows:
+                    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+                else:
+                    st.caption("No spans were recorded in this run.")
+            if self.profiler is not None:
+                st.caption(f"{self.profiler.kind} report for this run")
+                st.code(self.profiler.report(), language="text")
+
+
+def record_first_data(page: str, started: float) -> float:
+    """Records the milliseconds from `started` (perf_counter) to now as the page's time to first data."""
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    with _first_data_lock:
+        cold = page not in FIRST_DATA_MS
+        entry = FIRST_DATA_MS.setdefault(page, {"cold_ms": elapsed_ms, "last_ms": elapsed_ms, "runs": 0})
+        entry["last_ms"] = elapsed_ms
+        entry["runs"] += 1
+    tracing.record("page.first_data", elapsed_ms, page=page, cold=cold)
+    return elapsed_ms
+
+
+def start(page: str, started: Optional[float] = None) -> DebugRun:
+    """
+    Adds the debug toggles to the sidebar and starts recording this run; `started`
+    (perf_counter()) is the origin DebugRun.data_shown() measures from.
+    """
+    st.sidebar.divider()
+    show_timings = _session_toggle("Show timings", TIMINGS_KEY)
+    profiler = None
+    if _session_toggle("Profile this run", PROFILE_KEY):
+        profiler = tracing.Profiler()
+        profiler.start()
+    return DebugRun(page, show_timings, profiler, started)
+
+
+def page_start(page: str) -> DebugRun:
+    """
+    The start of every page script: starts the first-data clock and the debug run, and the
+    once-per-process background warmup (warmup.py).
+    """
+    started = time.perf_counter()
+    run = start(page, started)
+    warmup.start_background()
+    return run
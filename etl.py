@@ -0,0 +1,242 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# --- Crop -> rainfall integration pipeline (headless version of preprocess.ipynb) ---
+# Stages: clean crop data, clean rainfall data, integrate the two, tidy column names.
+# The CSV outputs go to OUTPUT_DIR, not datasets/: the inputs (and the bundled
+# rainfall_cleaned.csv the app reads) are never overwritten. setup_db.py derives the star
+# schema from the tidy CSV itself.
+# Every stage's output is cached under CACHE_DIR keyed by a hash of its inputs, so a
+# re-run only recomputes the stages whose inputs actually changed.
+#
+# Usage: python etl.py [--crop datasets/crop.csv] [--rainfall datasets/Sub_Division_IMD_2017.csv] [--out-dir build]
+
+CROP_CSV = os.path.join("datasets", "crop.csv")
+RAINFALL_CSV = os.path.join("datasets", "Sub_Division_IMD_2017.csv")
+OUTPUT_DIR = "build"
+CACHE_DIR = ".etl_cache"
+
+# Bump when a stage's logic changes so its cached outputs are invalidated.
+PIPELINE_VERSION = "2"
+
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+
+# Maps a State/UT name (from crop data) to the meteorological sub-divisions it covers.
+STATE_TO_SUBDIVISION_MAP = {
+    'Andaman and Nicobar Islands': ['Andaman & Nicobar Islands'],
+    'Andhra Pradesh': ['Coastal Andhra Pradesh', 'Rayalseema'],
+    'Arunachal Pradesh': ['Arunachal Pradesh'],
+    'Assam': ['Assam & Meghalaya'],
+    'Bihar': ['Bihar'],
+    'Chandigarh': ['Haryana Delhi & Chandigarh'],
+    'Chhattisgarh': ['Chhattisgarh'],
+    'Dadra and Nagar Haveli': ['Gujarat Region', 'Saurashtra & Kutch'],
+    'Goa': ['Konkan & Goa'],
+    'Gujarat': ['Gujarat Region', 'Saurashtra & Kutch'],
+    'Haryana': ['Haryana Delhi & Chandigarh'],
+    'Himachal Pradesh': ['Himachal Pradesh'],
+    'Jammu and Kashmir': ['Jammu & Kashmir'],
+    'Jharkhand': ['Jharkhand'],
+    'Karnataka': ['Coastal Karnataka', 'North Interior Karnataka', 'South Interior Karnataka'],
+    'Kerala': ['Kerala'],
+    'Madhya Pradesh': ['East Madhya Pradesh', 'West Madhya Pradesh'],
+    'Maharashtra': ['Konkan & Goa', 'Madhya Maharashtra', 'Matathwada', 'Vidarbha'],
+    'Manipur': ['Naga Mani Mizo Tripura'],
+    'Meghalaya': ['Assam & Meghalaya'],
+    'Mizoram': ['Naga Mani Mizo Tripura'],
+    'Nagaland': ['Naga Mani Mizo Tripura'],
+    'Odisha': ['Orissa'],
+    'Puducherry': ['Tamil Nadu'],
+    'Punjab': ['Punjab'],
+    'Rajasthan': ['East Rajasthan', 'West Rajasthan'],
+    'Sikkim': ['Sub Himalayan West Bengal & Sikkim'],
+    'Tamil Nadu': ['Tamil Nadu'],
+    'Telangana': ['Telangana'],
+    'Tripura': ['Naga Mani Mizo Tripura'],
+    'Uttar Pradesh': ['East Uttar Pradesh', 'West Uttar Pradesh'],
+    'Uttarakhand': ['Uttarakhand'],
+    'West Bengal': ['Gangetic West Bengal', 'Sub Himalayan West Bengal & Sikkim']
+}
+
+# Column names of the tidy integrated dataset (what the dashboard and setup_db.py read).
+TIDY_RENAMES = {
+    'State_Name': 'state', 'District_Name': 'district', 'YEAR': 'year', 'Season': 'season',
+    'Crop': 'crop', 'Area': 'area_ha', 'Production': 'production_tonnes', 'SUBDIVISION': 'subdivision',
+    **{month: month.lower() for month in MONTHS},
+    'ANNUAL': 'annual_rainfall_mm', 'JF': 'jf', 'MAM': 'mam', 'JJAS': 'jjas', 'OND': 'ond',
+    'Yield (Production/Area)': 'yield_t_per_ha',
+}
+
+
+# ==============================================================================
+# Stages (pure functions: DataFrame(s) in, DataFrame out)
+# ==============================================================================
+
+def clean_crop(crop_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Drops rows with missing/non-numeric Production and the logically inconsistent
+    rows with Area > 0 but Production == 0 (crop failures or entry errors).
+    """
+    production = pd.to_numeric(crop_df['Production'], errors='coerce')
+    keep = production.notna() & ~((crop_df['Area'] > 0) & (production == 0))
+    return crop_df.assign(Production=production)[keep].reset_index(drop=True)
+
+
+def clean_rainfall(imd_df: pd.DataFrame) -> pd.DataFrame:
+    """Imputes missing rainfall (every column after SUBDIVISION/YEAR) with the column median."""
+    rain_cols = imd_df.columns[2:]
+    return imd_df.fillna(imd_df[rain_cols].median())
+
+
+def subdivision_bridge() -> pd.DataFrame:
+    """The state -> subdivision map as a two-column frame, one row per pair."""
+    return pd.DataFrame(
+        [(state, sub) for state, subs in STATE_TO_SUBDIVISION_MAP.items() for sub in subs],
+        columns=['State_Name', 'SUBDIVISION'],
+    )
+
+
+def integrate(crop_df: pd.DataFrame, rainfall_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Joins every crop row to the rainfall of each subdivision its state spans
+    (one output row per subdivision, as the notebook's explode did) on YEAR/SUBDIVISION,
+    then computes yield. Both joins are hash merges, with no per-row Python.
+    """
+    crop_df = crop_df.assign(State_Name=crop_df['State_Name'].str.strip())
+    expanded = crop_df.merge(subdivision_bridge(), on='State_Name', how='inner')
+    expanded = expanded.rename(columns={'Crop_Year': 'YEAR'})
+
+    integrated_df = expanded.merge(rainfall_df, on=['YEAR', 'SUBDIVISION'], how='inner')
+    integrated_df['Yield (Production/Area)'] = integrated_df['Production'] / integrated_df['Area']
+    return integrated_df
+
+
+def normalize_subdivision(names: pd.Series) -> pd.Series:
+    """Subdivision names as the cleaned dataset spells them: 'Andaman & Nicobar Islands' -> 'andaman and nicobar islands'."""
+    return names.str.strip().str.lower().str.replace(r'\s*&\s*', ' and ', regex=True)
+
+
+def tidy(integrated_df: pd.DataFrame) -> pd.DataFrame:
+    """Renames to the snake_case schema, lowercases state, normalises subdivision and adds state_canonical."""
+    df = integrated_df.rename(columns=TIDY_RENAMES)[list(TIDY_RENAMES.values())]
+    df['state'] = df['state'].str.strip().str.lower()
+    df['subdivision'] = normalize_subdivision(df['subdivision'])
+    df['yield_t_per_ha'] = df['yield_t_per_ha'].replace([np.inf, -np.inf], np.nan)
+    df['state_canonical'] = df['state']
+    return df
+
+
+# ==============================================================================
+# Content-hash stage cache
+# ==============================================================================
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a file's bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stage_key(stage: str, *input_keys: str) -> str:
+    """Cache key of a stage: its name, the pipeline version and the keys of its inputs."""
+    return hashlib.sha256('|'.join((stage, PIPELINE_VERSION) + input_keys).encode()).hexdigest()[:16]
+
+
+class StageCache:
+    """Parquet files of stage outputs in `cache_dir`, named <stage>-<key>.parquet."""
+
+    def __init__(self, cache_dir: str = CACHE_DIR, force: bool = False):
+        self.cache_dir = cache_dir
+        self.force = force
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, stage: str, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{stage}-{key}.parquet")
+
+    def run(self, stage: str, key: str, compute):
+        """Returns the cached output of `stage` for `key`, computing and storing it on a miss."""
+        path = self.path(stage, key)
+        start = time.perf_counter()
+        if not self.force and os.path.exists(path):
+            df = pd.read_parquet(path)
+            print(f"  [{stage}] cached ({len(df):,} rows, {time.perf_counter() - start:.1f}s)")
+            return df
+
+        df = compute()
+        df.to_parquet(path, index=False)
+        print(f"  [{stage}] computed ({len(df):,} rows, {time.perf_counter() - start:.1f}s)")
+        return df
+
+
+def write_output(df: pd.DataFrame, path: str, key: str, manifest: dict) -> None:
+    """Writes a CSV output unless the manifest shows it already holds this key's data."""
+    if manifest.get(path) == key and os.path.exists(path):
+        print(f"  '{path}' is up to date.")
+        return
+    df.to_csv(path, index=False)
+    manifest[path] = key
+    print(f"  Wrote '{path}'.")
+
+
+# ==============================================================================
+# Pipeline
+# ==============================================================================
+
+def run_pipeline(crop_csv: str = CROP_CSV, rainfall_csv: str = RAINFALL_CSV,
+                 output_dir: str = OUTPUT_DIR, cache_dir: str = CACHE_DIR,
+                 force: bool = False) -> pd.DataFrame:
+    """Runs every stage (re-using cached ones) and writes the CSV outputs. Returns the tidy frame."""
+    cache = StageCache(cache_dir, force=force)
+    crop_key = stage_key('clean_crop', file_hash(crop_csv))
+    rain_key = stage_key('clean_rainfall', file_hash(rainfall_csv))
+    bridge_key = hashlib.sha256(json.dumps(STATE_TO_SUBDIVISION_MAP, sort_keys=True).encode()).hexdigest()
+    integrated_key = stage_key('integrate', crop_key, rain_key, bridge_key)
+    tidy_key = stage_key('tidy', integrated_key)
+
+    print("Running ETL pipeline...")
+    crop_df = cache.run('clean_crop', crop_key, lambda: clean_crop(pd.read_csv(crop_csv)))
+    rainfall_df = cache.run('clean_rainfall', rain_key, lambda: clean_rainfall(pd.read_csv(rainfall_csv)))
+    integrated_df = cache.run('integrate', integrated_key, lambda: integrate(crop_df, rainfall_df))
+    tidy_df = cache.run('tidy', tidy_key, lambda: tidy(integrated_df))
+
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    manifest = {}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    os.makedirs(output_dir, exist_ok=True)
+    write_output(crop_df, os.path.join(output_dir, 'crop_cleaned.csv'), crop_key, manifest)
+    write_output(rainfall_df, os.path.join(output_dir, 'rainfall_cleaned.csv'), rain_key, manifest)
+    write_output(integrated_df, os.path.join(output_dir, 'crop_rainfall_integrated.csv'), integrated_key, manifest)
+    write_output(tidy_df, os.path.join(output_dir, 'crop_rainfall_integrated_cleaned.csv'), tidy_key, manifest)
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return tidy_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean and integrate the crop and IMD rainfall datasets.")
+    parser.add_argument('--crop', default=CROP_CSV, help="raw crop production CSV")
+    parser.add_argument('--rainfall', default=RAINFALL_CSV, help="raw IMD sub-division rainfall CSV")
+    parser.add_argument('--out-dir', default=OUTPUT_DIR, help="directory for the cleaned/integrated CSVs (kept apart from the inputs)")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="directory for cached stage outputs")
+    parser.add_argument('--force', action='store_true', help="ignore cached stages and recompute everything")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = run_pipeline(args.crop, args.rainfall, args.out_dir, args.cache_dir, args.force)
+    print(f"ETL complete: {len(df):,} integrated rows in {time.perf_counter() - start:.1f}s.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+import asyncio
+import os
+import queue
+import random
+import threading
+import time
+from typing import Iterator, Optional
+
+from tracing import span
+
+# --- Shared async OpenAI gateway ---
+# One AsyncOpenAI client lives on a dedicated background event loop. Streamlit threads
+# submit work to that loop, so every session shares one HTTP connection pool and one
+# concurrency limit. Transient failures are retried with exponential backoff and jitter.
+#
+# The endpoint follows OPENAI_BASE_URL, so the whole pipeline can be pointed at
+# stub_openai_server.py (or any OpenAI-compatible server) for tests and benchmarks.
+#
+# run_coroutine_threadsafe() carries the caller's contextvars over to the loop, so the
+# llm.* spans below nest under whatever span the calling script thread has open.
+#
+# The openai package takes about half a second to import, so it is only imported when
+# the first gateway is built (after the page's first paint).
+
+MODEL = "gpt-4o-mini"
+CONCURRENCY = int(os.getenv("SAMARTH_LLM_CONCURRENCY", "4"))
+MAX_RETRIES = int(os.getenv("SAMARTH_LLM_MAX_RETRIES", "3"))
+BACKOFF_BASE_SECONDS = 0.5
+REQUEST_TIMEOUT_SECONDS = 60.0
+
+
+def retryable_errors() -> tuple:
+    """The openai exceptions worth retrying."""
+    import openai
+
+    return (
+        openai.APIConnectionError,  # includes APITimeoutError
+        openai.RateLimitError,
+        openai.InternalServerError,
+    )
+
+
+# Marks the end of a bridged stream.
+_DONE = object()
+
+
+class LLMGateway:
+    """Concurrency-limited, retrying access to the chat completions API."""
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None,
+                 concurrency: int = CONCURRENCY, max_retries: int = MAX_RETRIES):
+        from openai import AsyncOpenAI
+
+        self.max_retries = max_retries
+        self.retryable_errors = retryable_errors()
+        self.stats = {"requests": 0, "retries": 0, "failures": 0}
+
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="llm-gateway", daemon=True).start()
+        self._client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url or os.getenv("OPENAI_BASE_URL"),
+            max_retries=0,  # retries are done here, with our own backoff
+            timeout=REQUEST_TIMEOUT_SECONDS,
+        )
+        self._semaphore = self.run(self._make_semaphore(concurrency))
+
+    @staticmethod
+    async def _make_semaphore(concurrency: int) -> asyncio.Semaphore:
+        return asyncio.Semaphore(concurrency)
+
+    async def _backoff(self, attempt: int) -> None:
+        self.stats["retries"] += 1
+        await asyncio.sleep(BACKOFF_BASE_SECONDS * 2 ** attempt * (1 + random.random()))
+
+    # --- coroutines (run on the gateway loop) ---
+
+    async def chat(self, messages, model: str = MODEL, **kwargs) -> str:
+        """One chat completion; returns the message content."""
+        with span("llm.chat", model=model) as current:
+            async with self._semaphore:
+                for attempt in range(self.max_retries + 1):
+                    self.stats["requests"] += 1
+                    current.set(attempts=attempt + 1)
+                    try:
+                        response = await self._client.chat.completions.create(
+                            model=model, messages=messages, **kwargs
+                        )
+                        if response.usage is not None:
+                            current.set(prompt_tokens=response.usage.prompt_tokens,
+                                        completion_tokens=response.usage.completion_tokens)
+                        return response.choices[0].message.content
+                    except self.retryable_errors:
+                        if attempt == self.max_retries:
+                            self.stats["failures"] += 1
+                            raise
+                    await self._backoff(attempt)
+
+    async def stream_chat(self, messages, model: str = MODEL, **kwargs):
+        """
+        Streams a chat completion, yielding content deltas as they arrive.
+        Only failures before the first token are retried (a partial answer is never repeated).
+        """
+        with span("llm.stream", model=model) as current:
+            requested = time.perf_counter()
+            tokens = 0
+            async with self._semaphore:
+                for attempt in range(self.max_retries + 1):
+                    self.stats["requests"] += 1
+                    current.set(attempts=attempt + 1)
+                    try:
+                        stream = await self._client.chat.completions.create(
+                            model=model, messages=messages, stream=True, **kwargs
+                        )
+                        async for chunk in stream:
+                            delta = chunk.choices[0].delta.content if chunk.choices else None
+                            if delta:
+                                if not tokens:
+                                    current.set(first_token_ms=round((time.perf_counter() - requested) * 1000, 1))
+                                tokens += 1
+                                current.set(tokens=tokens)
+                                yield delta
+                        return
+                    except self.retryable_errors:
+                        if tokens or attempt == self.max_retries:
+                            self.stats["failures"] += 1
+                            raise
+                    await self._backoff(attempt)
+
+    # --- blocking bridges for synchronous callers (Streamlit script threads) ---
+
+    def run(self, coro):
+        """Runs a coroutine on the gateway loop and waits for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def submit(self, coro):
+        """Schedules a coroutine on the gateway loop; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def iter_stream(self, messages, **kwargs) -> Iterator[str]:
+        """
+        Starts streaming immediately and returns a generator over the deltas.
+        The request is in flight before the caller begins iterating, so other work
+        (e.g. rendering a table) overlaps with the model's time to first token.
+        Errors are re-raised from the generator.
+        """
+        deltas = queue.Queue()
+
+        async def pump():
+            try:
+                async for delta in self.stream_chat(messages, **kwargs):
+                    deltas.put(delta)
+            except Exception as e:
+                deltas.put(e)
+            finally:
+                deltas.put(_DONE)
+
+        self.submit(pump())
+
+        def consume():
+            while True:
+                item = deltas.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+
+        return consume()
@@ -1,10 +1,12 @@
 import streamlit as st
-import pandas as pd
+import debug_panel
+from tracing import span
 
 # -------------------------------
 # Page Configuration
 # -------------------------------
 st.set_page_config(page_title="Dataset Overview", layout="wide")
+debug = debug_panel.page_start("Overview")
 
 # -------------------------------
 # Title
@@ -17,18 +19,17 @@ This page provides an overview of the integrated dataset, including the number o
 # -------------------------------
 # Load Dataset
 # -------------------------------
-@st.cache_data
-def load_data():
-    df = pd.read_csv("datasets/crop_rainfall_integrated_cleaned.csv")
-    return df
+from data_loader import load_integrated_data
 
-df = load_data()
+with span("page.load", page="Overview"):
+    df = load_integrated_data()
 
 # -------------------------------
 # Display Basic Info
 # -------------------------------
 st.subheader("🧾 Basic Dataset Information")
 st.write(f"**Total Records:** {len(df):,}")
+debug.data_shown()
 
 # -------------------------------
 # Summary Statistics (Distinct Counts)
@@ -64,7 +65,7 @@ st.dataframe(df.head(10))
 # Optional: Column Information
 # -------------------------------
 with st.expander("📋 View Column Details"):
-    st.write(df.dtypes)
+    st.write(df.dtypes.astype(str))
 
 # -------------------------------
 # Insights Section
@@ -75,3 +76,5 @@ st.markdown("""
 - Use this overview to understand data coverage before analyzing trends.  
 - You can explore deeper insights in the subsequent pages like *Rainfall vs Yield*, *Yearly Trends*, and *Correlation Analysis*.
 """)
+
+debug.finish()
@@ -1,15 +1,24 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+import debug_panel
+from tracing import span
 
+debug = debug_panel.page_start("Production Analysis")
 st.title("🌾 Crop Production Analysis")
 
-df = pd.read_csv("datasets/crop_rainfall_integrated_cleaned.csv")
+from chart_data import bar_chart
+from rollups import load_rollups
 
-crop = st.selectbox("Select Crop", df['crop'].unique())
-subset = df[df['crop'] == crop]
+with span("page.load", page="Production Analysis"):
+    rollups = load_rollups()
 
-fig = px.bar(subset.groupby('state')['production_tonnes'].sum().reset_index(),
-             x='state', y='production_tonnes',
-             title=f"Total Production by State for {crop}")
-st.plotly_chart(fig, use_container_width=True)
+crop = st.selectbox("Select Crop", rollups.crops)
+
+with span("page.chart", page="Production Analysis", crop=crop) as current:
+    data = rollups.production_by_state(crop)
+    current.set(rows=len(data))
+    fig = bar_chart(data, x='state', y='production_tonnes',
+                    title=f"Total Production by State for {crop}")
+    st.plotly_chart(fig, use_container_width=True)
+debug.data_shown()
+
+debug.finish()
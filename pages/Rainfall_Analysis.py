@@ -1,13 +1,46 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+import debug_panel
+from tracing import span
 
+debug = debug_panel.page_start("Rainfall Analysis")
 st.title("🌦️ Rainfall Trend Analysis")
 
-df = pd.read_csv("datasets/crop_rainfall_integrated_cleaned.csv")
+from chart_data import bar_chart, line_chart
+from rollups import load_rollups
+from rainfall_store import MONTHS, load_monthly_rainfall, month_window
 
-state = st.selectbox("Select State", df['state'].unique())
-subset = df[df['state'] == state]
+with span("page.load", page="Rainfall Analysis"):
+    rollups = load_rollups()
+state = st.selectbox("Select State", rollups.states)
 
-fig = px.line(subset, x='year', y='annual_rainfall_mm', title=f"Annual Rainfall Trend - {state}")
-st.plotly_chart(fig, use_container_width=True)
+# One point per year (the raw rows repeat each year's rainfall for every crop/district/season).
+with span("page.chart", page="Rainfall Analysis", state=state) as current:
+    data = rollups.rainfall_by_year(state)
+    current.set(rows=len(data))
+    fig = line_chart(data, x='year', y='annual_rainfall_mm',
+                     title=f"Annual Rainfall Trend - {state}")
+    st.plotly_chart(fig, use_container_width=True)
+debug.data_shown()
+
+# --- Seasonal window vs. the 1961-1990 normal (monthly IMD subdivision data) ---
+st.subheader("Seasonal Rainfall Anomaly")
+try:
+    with span("page.load", page="Rainfall Analysis", store="monthly"):
+        rainfall = load_monthly_rainfall()
+except FileNotFoundError:
+    st.info("Monthly rainfall data (datasets/rainfall_cleaned.csv) not found.")
+    debug.finish()
+    st.stop()
+
+col1, col2 = st.columns(2)
+subdivision = col1.selectbox("Subdivision", rainfall.subdivisions)
+first_month, last_month = col2.select_slider("Months", options=MONTHS, value=("JUN", "SEP"))
+
+with span("page.chart", page="Rainfall Analysis", subdivision=subdivision) as current:
+    anomalies = rainfall.anomalies(month_window(first_month, last_month), [subdivision])
+    current.set(rows=len(anomalies))
+    fig = bar_chart(anomalies, x='year', y='anomaly_pct',
+                    title=f"{first_month}-{last_month} Rainfall Anomaly (% of 1961-1990 normal) - {subdivision}")
+    st.plotly_chart(fig, use_container_width=True)
+
+debug.finish()
@@ -1,15 +1,24 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+import debug_panel
+from tracing import span
 
+debug = debug_panel.page_start("Statewise Insights")
 st.title("🗺️ Statewise Insights")
 
-df = pd.read_csv("datasets/crop_rainfall_integrated_cleaned.csv")
+from chart_data import bar_chart
+from rollups import load_rollups
 
-state = st.selectbox("Select State", df['state'].unique())
-state_df = df[df['state'] == state]
+with span("page.load", page="Statewise Insights"):
+    rollups = load_rollups()
 
-fig = px.bar(state_df.groupby('crop')['yield_t_per_ha'].mean().reset_index(),
-             x='crop', y='yield_t_per_ha',
-             title=f"Average Yield by Crop in {state}")
-st.plotly_chart(fig, use_container_width=True)
+state = st.selectbox("Select State", rollups.states)
+
+with span("page.chart", page="Statewise Insights", state=state) as current:
+    data = rollups.yield_by_crop(state)
+    current.set(rows=len(data))
+    fig = bar_chart(data, x='crop', y='yield_t_per_ha', agg='mean',
+                    title=f"Average Yield by Crop in {state}")
+    st.plotly_chart(fig, use_container_width=True)
+debug.data_shown()
+
+debug.finish()
@@ -1,11 +1,12 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+import debug_panel
+from tracing import span
 
 # -------------------------------
 # Page Configuration
 # -------------------------------
 st.set_page_config(page_title="Rainfall vs Yield by Place", layout="wide")
+debug = debug_panel.page_start("Rainfall vs Yield")
 
 # -------------------------------
 # Title and Description
@@ -16,23 +17,21 @@ Explore how **rainfall** and **crop yield** have changed over the years
 for any selected **crop** and **location (state/district)**.
 """)
 
-# -------------------------------
-# Load Dataset
-# -------------------------------
-@st.cache_data
-def load_data():
-    df = pd.read_csv("datasets/crop_rainfall_integrated_cleaned.csv")
-    return df
-
-df = load_data()
+from chart_data import line_chart
+from data_loader import SchemaError
+from rollups import load_rollups
 
 # -------------------------------
-# Check necessary columns
+# Load Dataset
 # -------------------------------
-required_columns = ["crop", "state", "district", "year", "annual_rainfall_mm", "yield_t_per_ha"]
-missing_cols = [col for col in required_columns if col not in df.columns]
-if missing_cols:
-    st.error(f"❌ Missing columns in dataset: {', '.join(missing_cols)}")
+# Yearly rainfall/yield per crop and place is pre-aggregated once per process;
+# the shared loader validates the required columns while building it.
+try:
+    with span("page.load", page="Rainfall vs Yield"):
+        rollups = load_rollups()
+except SchemaError as e:
+    st.error(f"❌ {e}")
+    debug.finish()
     st.stop()
 
 # -------------------------------
@@ -41,68 +40,56 @@ if missing_cols:
 col1, col2 = st.columns(2)
 
 with col1:
-    crop_options = sorted(df["crop"].dropna().unique())
-    selected_crop = st.selectbox("🌱 Select Crop:", crop_options)
+    selected_crop = st.selectbox("🌱 Select Crop:", rollups.crops)
 
 with col2:
     place_type = st.radio("Select Place Type:", ["State", "District"], horizontal=True)
 
-if place_type == "State":
-    place_options = sorted(df["state"].dropna().unique())
-else:
-    place_options = sorted(df["district"].dropna().unique())
+place_options = rollups.states if place_type == "State" else rollups.districts
 
 selected_place = st.selectbox(f"📍 Select {place_type}:", place_options)
 
 # -------------------------------
-# Filter Data
+# Prepare Data for Chart (yearly means, sorted by year)
 # -------------------------------
-if place_type == "State":
-    filtered_df = df[(df["crop"] == selected_crop) & (df["state"] == selected_place)]
-else:
-    filtered_df = df[(df["crop"] == selected_crop) & (df["district"] == selected_place)]
+with span("page.query", page="Rainfall vs Yield", crop=selected_crop, place=selected_place) as current:
+    chart_df = rollups.yearly_by_place(selected_crop, place_type, selected_place)
+    current.set(rows=len(chart_df))
 
-if filtered_df.empty:
+if chart_df.empty:
     st.warning("⚠️ No data found for the selected crop and place.")
+    debug.finish()
     st.stop()
 
-# -------------------------------
-# Prepare Data for Chart
-# -------------------------------
-chart_df = (
-    filtered_df.groupby("year")[["annual_rainfall_mm", "yield_t_per_ha"]]
-    .mean()
-    .reset_index()
-    .sort_values("year")
-)
-
 # -------------------------------
 # Plot: Rainfall vs Yield Over Time
 # -------------------------------
 st.subheader(f"📊 Yearly Rainfall vs Yield Trend for {selected_crop} in {selected_place}")
 
-fig = px.line(
-    chart_df,
-    x="year",
-    y=["annual_rainfall_mm", "yield_t_per_ha"],
-    markers=True,
-    title=f"Rainfall and Yield Trend ({selected_crop} - {selected_place})",
-    labels={
-        "value": "Value",
-        "variable": "Parameter",
-        "year": "Year",
-    },
-)
-
-fig.update_traces(line=dict(width=3))
-fig.update_layout(
-    legend_title_text="Parameter",
-    xaxis_title="Year",
-    yaxis_title="Value",
-    template="plotly_dark",
-)
-
-st.plotly_chart(fig, use_container_width=True)
+with span("page.chart", page="Rainfall vs Yield"):
+    fig = line_chart(
+        chart_df,
+        x="year",
+        y=["annual_rainfall_mm", "yield_t_per_ha"],
+        markers=True,
+        title=f"Rainfall and Yield Trend ({selected_crop} - {selected_place})",
+        labels={
+            "value": "Value",
+            "variable": "Parameter",
+            "year": "Year",
+        },
+    )
+
+    fig.update_traces(line=dict(width=3))
+    fig.update_layout(
+        legend_title_text="Parameter",
+        xaxis_title="Year",
+        yaxis_title="Value",
+        template="plotly_dark",
+    )
+
+    st.plotly_chart(fig, use_container_width=True)
+debug.data_shown()
 
 # -------------------------------
 # Insights
@@ -113,3 +100,5 @@ st.markdown(f"""
 - Increasing rainfall with flat or dropping yield might indicate inefficiencies or crop stress.  
 - Consistent upward trends in both indicate favorable climate and good agricultural performance.  
 """)
+
+debug.finish()
@@ -1,116 +1,67 @@
 import streamlit as st
-import sqlite3
-import pandas as pd
 import os
-from typing import Optional, Dict
-from pydantic import BaseModel, Field
+from typing import Optional
+import debug_panel
+from tracing import span
+
+debug = debug_panel.page_start("Chatbot")
+st.title("🌾 Samarth Agri-Climate Chatbot")
+st.markdown("Ask natural language questions about crop production, rainfall, and trends.")
+
+import pandas as pd
 from dotenv import load_dotenv
-# NEW IMPORTS
-from openai import OpenAI
-import json
-load_dotenv() # <--- MUST BE THE FIRST CALL to load variables
-DATABASE_FILE = 'samarth_agri_climate.db'
-TABLE_NAME = 'integrated_data'
+from llm_client import LLMGateway
+from chat_pipeline import DATABASE_FILE, ChatPipeline, build_polish_messages, build_synthesis_messages
+from answer_synthesis import classify_result, synthesize
 
 
 # --- 1. OpenAI Configuration ---
 
-# 1. Explicitly fetch the key after load_dotenv() runs
-API_KEY = os.getenv("OPENAI_API_KEY")
+@st.cache_resource
+def load_llm_gateway(api_key: str):
+    """
+    One async OpenAI client per process, shared by every session, with a concurrency
+    limit and retry/backoff (see llm_client.py; OPENAI_BASE_URL selects the endpoint).
+    """
+    return LLMGateway(api_key)
 
-# Initialize the OpenAI client.
-try:
-    # 2. Check if the key was successfully loaded
-    if not API_KEY:
-        # Raise a clear error if the key is missing from the .env file
-        raise ValueError("OPENAI_API_KEY not found in environment. Check your .env file.")
 
-    # 3. Explicitly pass the key to the OpenAI client
-    client = OpenAI(api_key=API_KEY)
-    
-except Exception as e:
-    # This error handling now catches both the ValueError and API client errors
-    st.error(f"Failed to initialize OpenAI client. Check your API key. Error: {e}")
-    client = None
+def init_client() -> Optional[LLMGateway]:
+    """
+    The shared gateway, or None when there is no key (main() says what still works) or the
+    client cannot be built (with the error shown).
+    Called after the first paint: the .env lookup and the openai import are not free.
+    """
+    load_dotenv() # <--- MUST RUN BEFORE the key is read
+    # 1. Explicitly fetch the key after load_dotenv() runs
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    try:
+        # 2. Explicitly pass the key to the OpenAI client
+        return load_llm_gateway(api_key)
 
-# Pydantic schema for reliable JSON output from the LLM
-class SQLQuery(BaseModel):
-    """A Pydantic model to ensure the LLM output is a valid SQL query."""
-    sql_query: str = Field(description="The executable SQLite SQL query.")
+    except Exception as e:
+        st.error(f"Failed to initialize OpenAI client. Check your API key. Error: {e}")
+        return None
+
+@st.cache_resource
+def load_pipeline(_client):
+    """
+    The question -> SQL -> result pipeline (chat_pipeline.py), built once per process:
+    translation cache, local translator, result cache, read-only connection pool and the
+    SQL backend chosen by SAMARTH_SQL_BACKEND (sql_backends.py).
+    """
+    return ChatPipeline(DATABASE_FILE, _client)
 
 
 def prompt_to_sql(prompt: str) -> Optional[str]:
     """
-    Translates a natural language prompt into an SQL query using the OpenAI API.
-    """
-    if client is None:
-        return None
-    
-    # --- UPDATED SYSTEM PROMPT ---
-    SYSTEM_PROMPT = f"""
-    You are an expert SQLite SQL translator, specializing in agricultural and climate data analysis. Your task is to convert complex natural language questions into a single, correct, and executable SQLite SQL query.
-    
-    The database has one table named '{TABLE_NAME}'.
-    The schema is as follows:
-    - state_canonical (TEXT) - Primary column for state names (must be lowercase).
-    - district (TEXT) - The district name.
-    - area_ha (REAL) - Area under cultivation in hectares.
-    - season (TEXT) - The agricultural season (e.g., Kharif, Rabi).
-    - crop (TEXT) - The name of the crop (must use LIKE for flexible matching).
-    - year (INTEGER) - The year of the record.
-    - production_tonnes (REAL) - Total crop production in tonnes.
-    - annual_rainfall_mm (REAL) - Total annual rainfall.
-    - jjas_rainfall_mm (REAL) - Rainfall during June-September (Monsoon Season).
-    - yield_t_per_ha (REAL) - Crop yield (tonnes per hectare).
-
-    RULES (STRICTLY FOLLOWED):
-    1. SINGLE STATEMENT ONLY: ALWAYS generate exactly ONE executable SQL statement. DO NOT use semicolons (;) to separate multiple statements.
-    2. PARALLEL DATA (UNION ALL): If the user asks for two UNRELATED metrics (e.g., Rainfall AND Production), use UNION ALL to combine the results into a single table. The column headers must be consistent across both SELECT statements.
-    3. TIME FILTERING: For time periods (e.g., 'last 10 years'), use the format: `year >= (SELECT MAX(year) - N FROM {TABLE_NAME})`. DO NOT use date functions like strftime() on the 'year' column.
-    4. RANKING/COMPARISON: For 'highest,' 'lowest,' or 'compare' questions, use GROUP BY, SUM/AVG, ORDER BY, and LIMIT.
-    5. STRING MATCHING: Use `LOWER(state_canonical) = '...'` for states and `crop LIKE '%...%'` for crops to handle casing and slight variations.
-    6. ALWAYS generate exactly ONE executable SQL statement. Your entire response MUST be a **valid JSON object** containing a single key, 'sql_query'.
-    7. REGION MATCHING: For multi-word regions (e.g., 'andaman and nicobar islands'), use the full, exact name. Alternatively, use the LIKE operator for robustness: `WHERE state_canonical LIKE '%andaman and nicobar%'`.
-    # --- ADVANCED TEMPLATE EXAMPLES ---
-
-    # 1. TEMPLATE: Parallel Comparison (Rainfall & Production)
-    # The query must return two separate data blocks using UNION ALL.
-    # The final columns must be generic (e.g., 'Metric', 'Value', 'Context').
-    
-    Example for 'Compare average annual rainfall in Karnataka and Kerala for the last 5 years. In parallel, list the highest rice production in each of those states during the same period.':
-    {{"sql_query": "SELECT state_canonical AS Region, 'Avg_Rainfall_mm' AS Metric, ROUND(AVG(annual_rainfall_mm), 2) AS Value, 'N/A' AS Context FROM integrated_data WHERE (state_canonical = 'karnataka' OR state_canonical = 'kerala') AND year >= (SELECT MAX(year) - 5 FROM integrated_data) GROUP BY state_canonical UNION ALL SELECT state_canonical AS Region, 'Max_Rice_Production' AS Metric, SUM(CASE WHEN crop LIKE '%Rice%' THEN production_tonnes ELSE 0 END) AS Value, 'Total Rice Production' AS Context FROM integrated_data WHERE (state_canonical = 'karnataka' OR state_canonical = 'kerala') AND year >= (SELECT MAX(year) - 5 FROM integrated_data) GROUP BY state_canonical;"}}
-
-    # 2. TEMPLATE: District Comparison (Ranking with Subqueries)
-    # This requires nested queries to find MAX/MIN in different states using a subquery for each part.
-    
-    Example for 'Identify the district in State_X with the highest production of Crop_Z in the most recent year available and compare that with the district with the lowest production of Crop_Z in State_Y.':
-    {{"sql_query": "SELECT 'Highest in West Bengal' AS Comparison, district, production_tonnes FROM (SELECT district, production_tonnes FROM integrated_data WHERE state_canonical = 'west bengal' AND crop LIKE '%Wheat%' AND year = (SELECT MAX(year) FROM integrated_data) ORDER BY production_tonnes DESC LIMIT 1) UNION ALL SELECT 'Lowest in Bihar' AS Comparison, district, production_tonnes FROM (SELECT district, production_tonnes FROM integrated_data WHERE state_canonical = 'bihar' AND crop LIKE '%Wheat%' AND year = (SELECT MAX(year) - 1 FROM integrated_data) ORDER BY production_tonnes ASC LIMIT 1);"}}
-    # 3. TEMPLATE: Correlation/Trend Analysis (Time Series)
-    # Focuses on selecting time-series data for synthesis.
-
-    Example for 'Analyze the production trend of Wheat in Punjab over the last decade and correlate with climate data.':
-    {{"sql_query": "SELECT year, SUM(production_tonnes) AS Production, AVG(annual_rainfall_mm) AS Annual_Rainfall, AVG(yield_t_per_ha) AS Average_Yield FROM integrated_data WHERE state_canonical = 'punjab' AND crop LIKE '%Wheat%' AND year >= (SELECT MAX(year) - 10 FROM integrated_data) GROUP BY year ORDER BY year;"}}
+    Translates a natural language prompt into an SQL query (cache, then local translator,
+    then the OpenAI API); API errors are shown on the page.
     """
-    
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            # FIX: Use response_format for JSON mode
-            response_format={"type": "json_object"}, 
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.0 # Use low temperature for deterministic SQL generation
-        )
-        
-        # FIX: Manually parse the JSON string from the response
-        json_content = response.choices[0].message.content
-        parsed_json = json.loads(json_content)
-        
-        # Extract the query from the parsed JSON object
-        return parsed_json.get("sql_query")
-        
+        return load_pipeline(client).prompt_to_sql(prompt)
     except Exception as e:
         # If the JSON parsing fails or the API call errors
         st.error(f"OpenAI API Error: {e}")
@@ -121,64 +72,98 @@ def prompt_to_sql(prompt: str) -> Optional[str]:
 
 def execute_sql(sql_query: str) -> Optional[pd.DataFrame | str]:
     """
-    Executes the generated SQL query against the SQLite database.
+    Executes the generated SQL query on the SQL backend (cached and guarded;
+    see ChatPipeline.execute_sql). Errors come back as a message string.
     """
-    try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        result_df = pd.read_sql_query(sql_query, conn)
-        conn.close()
-        return result_df
-    except sqlite3.Error as e:
-        return str(e)
-    except Exception as e:
-        return f"Unexpected execution error: {str(e)}"
+    return load_pipeline(client).execute_sql(sql_query)
 
 # --- 3. Answer Synthesis (Simplified for this example) ---
 
-def synthesize_answer(df: pd.DataFrame, prompt: str) -> str:
+def local_answer(df: pd.DataFrame) -> Optional[str]:
     """
-    Uses the LLM to summarize the data query result.
+    The answer built locally from statistics of the whole result (answer_synthesis.py),
+    or None for result shapes it does not recognise.
     """
-    if client is None:
-        return "Synthesis skipped: OpenAI client not initialized."
-        
-    # Create a concise string representation of the data frame
-    data_summary = df.head(5).to_markdown(index=False)
-    
-    synthesis_prompt = f"""
-    You are an agricultural data analyst. Summarize the key findings from the provided 
-    data result in a concise, human-readable sentence. 
-    
-    Original Question: "{prompt}"
-    
-    Data Result (Top 5 Rows):
-    {data_summary}
+    with span("chat.synthesize_local", shape=classify_result(df)) as current:
+        answer = synthesize(df)
+        current.set(answered=answer is not None)
+        return answer
+
+
+def stream_answer(df: pd.DataFrame, prompt: str):
     """
-    
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "user", "content": synthesis_prompt}
-            ],
-            temperature=0.2
-        )
-        return response.choices[0].message.content
-        
-    except Exception as e:
-        return f"Failed to synthesize answer: {e}"
+    Streaming LLM summary: the request is sent immediately and the
+    returned generator yields the summary token by token as it arrives.
+    """
+    return _stream(build_synthesis_messages(df, prompt))
+
+
+def stream_polish(answer: str, prompt: str):
+    """Streams the LLM's rewording of a locally synthesised answer."""
+    return _stream(build_polish_messages(answer, prompt))
+
+
+def _stream(messages: list):
+    if client is None:
+        return iter(["Synthesis skipped: OpenAI client not initialized."])
+
+    tokens = client.iter_stream(messages=messages, temperature=0.2)
+
+    def guarded():
+        try:
+            yield from tokens
+        except Exception as e:
+            yield f"Failed to synthesize answer: {e}"
+
+    return guarded()
 
 
 # --- 4. Streamlit UI (Main Application Flow) ---
 
 def main():
     # Removed st.set_page_config() to allow Home.py to manage config
-    st.title("🌾 Samarth Agri-Climate Chatbot")
-    st.markdown("Ask natural language questions about crop production, rainfall, and trends.")
-    
+    # (the title is drawn at the top of the script, before the heavy imports)
+    pipeline = load_pipeline(client)
+    cache_stats = pipeline.translation_cache.stats
+    st.sidebar.caption(
+        f"SQL translation cache: {cache_stats['memory_hits']} memory hits · "
+        f"{cache_stats['disk_hits']} disk hits · {cache_stats['misses']} misses"
+    )
+    result_stats = pipeline.result_cache.stats
+    st.sidebar.caption(
+        f"Result cache: {result_stats['hits']} hits · {result_stats['misses']} misses · "
+        f"{result_stats['bytes'] / 1e6:.1f} MB"
+    )
+    if os.path.exists(DATABASE_FILE):
+        local_stats = pipeline.local_translator.stats
+        st.sidebar.caption(
+            f"Local translator: {local_stats['hits']} answered · {local_stats['misses']} sent to the LLM"
+        )
+    pool_stats = pipeline.pool.stats
+    st.sidebar.caption(
+        f"DB pool: {pool_stats['connections']} connections · "
+        f"avg wait {pool_stats['wait_ms_total'] / max(pool_stats['acquires'], 1):.1f} ms · "
+        f"avg query {pool_stats['query_ms_total'] / max(pool_stats['queries'], 1):.1f} ms"
+    )
+    if pipeline.backend.name == "duckdb":
+        duck_stats = pipeline.backend.stats
+        st.sidebar.caption(
+            f"DuckDB ({pipeline.backend.source}, {pipeline.backend.threads or 'all'} threads): "
+            f"{duck_stats['queries']} queries · "
+            f"avg query {duck_stats['query_ms_total'] / max(duck_stats['queries'], 1):.1f} ms · "
+            f"max {duck_stats['query_ms_max']:.1f} ms"
+        )
+    debug.data_shown()
+
+    polish = st.sidebar.toggle(
+        "Polish answers with the LLM", value=False, key="polish_answers", disabled=client is None,
+        help="Answers are written locally from the query result; this rewords them with the LLM."
+    ) and client is not None
+
+    # Without a key the local translator and local synthesis still answer the common questions;
+    # only the LLM fallbacks (translation, summaries of unrecognised results, polish) are off.
     if client is None:
-        st.warning("Please set the OPENAI_API_KEY environment variable to start.")
-        return
+        st.info("OPENAI_API_KEY is not set: only questions the local translator recognises can be answered.")
 
     # Check for the database file
     if not os.path.exists(DATABASE_FILE):
@@ -192,37 +177,60 @@ def main():
     )
 
     if st.button("Ask Samarth", key="ask_button") and user_prompt:
-        
-        # --- LLM Parsing Step ---
-        st.info("Parsing query using LLM...")
-        sql_query = prompt_to_sql(user_prompt)
-
-        if sql_query:
-            st.success("Query Parsed! Executing SQL...")
-            st.code(sql_query, language="sql")
+        with span("chat.ask"):
+
+            # --- LLM Parsing Step ---
+            st.info("Parsing query...")
+            sql_query = prompt_to_sql(user_prompt)
+
+            if sql_query:
+                st.success("Query Parsed! Executing SQL...")
+                st.code(sql_query, language="sql")
             
-            # --- Database Execution Step ---
-            result = execute_sql(sql_query)
+                # --- Database Execution Step ---
+                result = execute_sql(sql_query)
             
-            if isinstance(result, pd.DataFrame):
-                if not result.empty:
-                    
-                    # --- LLM Synthesis Step ---
-                    s_answer = synthesize_answer(result, user_prompt)
-                    st.header("Answer")
-                    st.success(s_answer)
-                    
-                    # --- Data Display ---
-                    st.subheader("Raw Data Query Output")
-                    st.dataframe(result, use_container_width=True)
-                    
+                if isinstance(result, pd.DataFrame):
+                    if not result.empty:
+
+                        # --- Synthesis Step: local, with the LLM (streaming in the background)
+                        # only for unrecognised result shapes or when polishing is on ---
+                        answer = local_answer(result)
+                        answer_tokens = None
+                        if answer is None and client is not None:
+                            answer_tokens = stream_answer(result, user_prompt)
+                        elif answer is None:
+                            answer = "No local summary for this result shape; set OPENAI_API_KEY for an LLM summary."
+                        elif polish:
+                            answer_tokens = stream_polish(answer, user_prompt)
+                        st.header("Answer")
+                        answer_slot = st.empty()
+
+                        # --- Data Display (rendered while the model is still answering) ---
+                        with span("chat.render_table", rows=len(result)):
+                            st.subheader("Raw Data Query Output")
+                            if result.attrs.get("truncated"):
+                                st.warning(f"Showing the first {len(result):,} rows; the full result was larger.")
+                            st.dataframe(result, use_container_width=True)
+
+                        with answer_slot.container(), span("chat.synthesize", llm=answer_tokens is not None):
+                            if answer_tokens is None:
+                                st.markdown(answer)
+                            else:
+                                st.write_stream(answer_tokens)
+
+                    else:
+                        st.warning("No data found for the specified criteria. Check your spelling or criteria.")
                 else:
-                    st.warning("No data found for the specified criteria. Check your spelling or criteria.")
+                    # If result is a string, it's an error message; don't serve this SQL again
+                    pipeline.translation_cache.discard(user_prompt)
+                    st.error(f"An error occurred during execution: {result}")
+            elif client is None:
+                st.warning("The local translator does not recognise this question, and the LLM needs OPENAI_API_KEY.")
             else:
-                # If result is a string, it's an error message
-                st.error(f"An error occurred during execution: {result}")
-        else:
-            st.warning("Sorry, the LLM could not generate a valid SQL query or the API call failed.")
+                st.warning("Sorry, the LLM could not generate a valid SQL query or the API call failed.")
 
 # Call the main function to run the app
-main()
\ No newline at end of file
+client = init_client()
+main()
+debug.finish()
\ No newline at end of file
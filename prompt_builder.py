@@ -0,0 +1,247 @@
+import math
+from collections import Counter
+from typing import Dict, List, Optional
+
+from text_to_sql import STATE_RAINFALL_VIEW, TABLE_NAME, EntityIndex, normalize_name
+from tracing import set_attributes
+
+# --- Question-specific system prompt for prompt_to_sql ---
+# The LLM prompt is assembled per question from fixed parts (role, schema, rules) plus:
+# - the few-shot templates most relevant to the question, ranked with BM25 over each
+#   template's title, tags and example question (a few hundred tokens each, so at most
+#   MAX_TEMPLATES are sent);
+# - the canonical spellings of the states, crops, districts and seasons the question
+#   mentions, looked up in the EntityIndex built from the database, so the model never
+#   has to guess 'Orissa' vs 'odisha' or 'Rice' vs 'rice';
+# The best-ranked template and the hints are always sent; further templates only while the
+# prompt stays within TOKEN_BUDGET (estimated at CHARS_PER_TOKEN characters per token).
+# A backend whose dialect differs from SQLite in ways the model must know adds its rule
+# from DIALECT_RULES (see sql_backends.py for the differences handled without the model).
+# SYSTEM_PROMPT is the full prompt with every template, for callers without an entity index.
+
+TOKEN_BUDGET = 900
+CHARS_PER_TOKEN = 4
+MAX_TEMPLATES = 2
+MAX_VALUES_PER_KIND = 8
+
+# BM25 parameters (the usual defaults).
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Words that carry no signal for choosing a template.
+STOPWORDS = {
+    'a', 'an', 'the', 'of', 'in', 'on', 'for', 'and', 'or', 'to', 'by', 'with', 'is', 'are', 'was',
+    'were', 'what', 'which', 'how', 'me', 'show', 'give', 'tell', 'that', 'this', 'each', 'their',
+}
+
+PREAMBLE = (
+    "You are an expert SQLite SQL translator, specializing in agricultural and climate data analysis. "
+    "Your task is to convert complex natural language questions into a single, correct, and executable "
+    "SQLite SQL query."
+)
+
+SCHEMA = f"""Query the view named '{TABLE_NAME}' (one row per crop record, with its state's rainfall for that year).
+Its schema is as follows:
+- state_canonical (TEXT) - Primary column for state names (must be lowercase).
+- district (TEXT) - The district name.
+- area_ha (REAL) - Area under cultivation in hectares.
+- season (TEXT) - The agricultural season (e.g., Kharif, Rabi).
+- crop (TEXT) - The name of the crop (see rule 5 for matching).
+- year (INTEGER) - The year of the record.
+- production_tonnes (REAL) - Total crop production in tonnes.
+- annual_rainfall_mm (REAL) - Total annual rainfall.
+- jjas_rainfall_mm (REAL) - Rainfall during June-September (Monsoon Season).
+- yield_t_per_ha (REAL) - Crop yield (tonnes per hectare).
+
+For questions about rainfall alone (no crop, district or season), query the view '{STATE_RAINFALL_VIEW}' instead:
+one row per state and year with state_canonical, year, annual_rainfall_mm and jjas_rainfall_mm. It is far smaller."""
+
+RULES = f"""RULES (STRICTLY FOLLOWED):
+1. SINGLE STATEMENT ONLY: ALWAYS generate exactly ONE executable SQL statement. DO NOT use semicolons (;) to separate multiple statements.
+2. PARALLEL DATA (UNION ALL): If the user asks for two UNRELATED metrics (e.g., Rainfall AND Production), use UNION ALL to combine the results into a single table. The column headers must be consistent across both SELECT statements.
+3. TIME FILTERING: For the last N years (e.g., 'last 10 years', N years including the latest), use the format: `year > (SELECT MAX(year) - N FROM {TABLE_NAME})`. DO NOT use date functions like strftime() on the 'year' column.
+4. RANKING/COMPARISON: For 'highest,' 'lowest,' or 'compare' questions, use GROUP BY, SUM/AVG, ORDER BY, and LIMIT.
+5. STRING MATCHING: When a 'VALUES IN THE DATABASE' section lists a value, match it with = and exactly that spelling. Otherwise use `LOWER(state_canonical) = '...'` for states and `crop LIKE '%...%'` for crops to handle casing and slight variations.
+6. ALWAYS generate exactly ONE executable SQL statement. Your entire response MUST be a **valid JSON object** containing a single key, 'sql_query'.
+7. REGION MATCHING: For multi-word regions (e.g., 'andaman and nicobar islands'), use the full, exact name. Alternatively, use the LIKE operator for robustness: `WHERE state_canonical LIKE '%andaman and nicobar%'`."""
+
+# Extra rules per SQL backend (sql_backends.BACKENDS); SQLite needs none.
+DIALECT_RULES = {
+    "duckdb": "8. DUCKDB: The query runs on DuckDB. Every selected column that is not inside an aggregate "
+              "(SUM, AVG, MAX, ...) MUST be listed in GROUP BY. To get the row with the highest value "
+              "(e.g., the district with the highest production), use ORDER BY ... DESC LIMIT 1 or "
+              "arg_max(district, production_tonnes), never a bare column next to MAX().",
+}
+
+# (title, tags, guidance, example question, example SQL). Tags only feed the ranking.
+TEMPLATES = [
+    (
+        "Parallel Comparison (Rainfall & Production)",
+        "compare versus parallel both rainfall production average states",
+        "The query must return two separate data blocks using UNION ALL.\n"
+        "The final columns must be generic (e.g., 'Metric', 'Value', 'Context').",
+        "Compare average annual rainfall in Karnataka and Kerala for the last 5 years. In parallel, "
+        "list the highest rice production in each of those states during the same period.",
+        "SELECT state_canonical AS Region, 'Avg_Rainfall_mm' AS Metric, ROUND(AVG(annual_rainfall_mm), 2) AS Value, "
+        "'N/A' AS Context FROM integrated_data WHERE (state_canonical = 'karnataka' OR state_canonical = 'kerala') "
+        "AND year > (SELECT MAX(year) - 5 FROM integrated_data) GROUP BY state_canonical UNION ALL "
+        "SELECT state_canonical AS Region, 'Max_Rice_Production' AS Metric, "
+        "SUM(CASE WHEN crop LIKE '%Rice%' THEN production_tonnes ELSE 0 END) AS Value, 'Total Rice Production' AS Context "
+        "FROM integrated_data WHERE (state_canonical = 'karnataka' OR state_canonical = 'kerala') "
+        "AND year > (SELECT MAX(year) - 5 FROM integrated_data) GROUP BY state_canonical;",
+    ),
+    (
+        "District Comparison (Ranking with Subqueries)",
+        "district highest lowest maximum minimum compare most recent year",
+        "This requires nested queries to find MAX/MIN in different states using a subquery for each part.",
+        "Identify the district in State_X with the highest production of Crop_Z in the most recent year "
+        "available and compare that with the district with the lowest production of Crop_Z in State_Y.",
+        "SELECT 'Highest in West Bengal' AS Comparison, district, production_tonnes FROM (SELECT district, "
+        "production_tonnes FROM integrated_data WHERE state_canonical = 'west bengal' AND crop LIKE '%Wheat%' "
+        "AND year = (SELECT MAX(year) FROM integrated_data) ORDER BY production_tonnes DESC LIMIT 1) UNION ALL "
+        "SELECT 'Lowest in Bihar' AS Comparison, district, production_tonnes FROM (SELECT district, production_tonnes "
+        "FROM integrated_data WHERE state_canonical = 'bihar' AND crop LIKE '%Wheat%' "
+        "AND year = (SELECT MAX(year) FROM integrated_data) ORDER BY production_tonnes ASC LIMIT 1);",
+    ),
+    (
+        "Correlation/Trend Analysis (Time Series)",
+        "trend correlate correlation relationship climate impact over time yearly decade series",
+        "Focuses on selecting time-series data for synthesis.",
+        "Analyze the production trend of Wheat in Punjab over the last decade and correlate with climate data.",
+        "SELECT year, SUM(production_tonnes) AS Production, AVG(annual_rainfall_mm) AS Annual_Rainfall, "
+        "AVG(yield_t_per_ha) AS Average_Yield FROM integrated_data WHERE state_canonical = 'punjab' "
+        "AND crop LIKE '%Wheat%' AND year > (SELECT MAX(year) - 10 FROM integrated_data) GROUP BY year ORDER BY year;",
+    ),
+    (
+        "Ranking (Top-K)",
+        "top best largest biggest most least rank ranking districts crops list",
+        "One GROUP BY over the ranked entity, ordered by the aggregate, with LIMIT k.",
+        "Which 5 districts of Uttar Pradesh produced the most wheat in the last 3 years?",
+        "SELECT district, ROUND(SUM(production_tonnes), 2) AS Total_Production FROM integrated_data "
+        "WHERE state_canonical = 'uttar pradesh' AND crop LIKE '%Wheat%' "
+        "AND year > (SELECT MAX(year) - 3 FROM integrated_data) GROUP BY district "
+        "ORDER BY Total_Production DESC LIMIT 5;",
+    ),
+    (
+        "State Rainfall",
+        "rainfall rain monsoon wettest driest dry wet annual jjas",
+        f"Rainfall-only questions read the small {STATE_RAINFALL_VIEW} view.",
+        "Which states had the lowest monsoon rainfall in 2010?",
+        f"SELECT state_canonical, ROUND(jjas_rainfall_mm, 2) AS Monsoon_Rainfall_mm FROM {STATE_RAINFALL_VIEW} "
+        "WHERE year = 2010 ORDER BY Monsoon_Rainfall_mm ASC LIMIT 5;",
+    ),
+]
+
+# Columns the entity hints name, per EntityIndex kind.
+HINT_COLUMNS = {
+    'state': 'state_canonical',
+    'crop': 'crop',
+    'district': 'district',
+    'season': 'TRIM(season)',
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (no tokenizer dependency); good enough for a budget."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _terms(text: str) -> List[str]:
+    return [word for word in normalize_name(text).split() if word not in STOPWORDS]
+
+
+def render_template(number: int, template: tuple) -> str:
+    title, _, guidance, question, sql = template
+    comments = '\n'.join(f'# {line}' for line in guidance.split('\n'))
+    return (f"# {number}. TEMPLATE: {title}\n{comments}\n\n"
+            f"Example for '{question}':\n" + '{"sql_query": "' + sql + '"}')
+
+
+def render_prompt(templates: List[tuple], hints: str = '', dialect: str = "sqlite") -> str:
+    """The system prompt with the given templates (in order) and entity hints, for a SQL backend."""
+    parts = [PREAMBLE, SCHEMA, RULES]
+    if dialect in DIALECT_RULES:
+        parts[-1] += '\n' + DIALECT_RULES[dialect]
+    if hints:
+        parts.append(hints)
+    if templates:
+        parts.append("# --- ADVANCED TEMPLATE EXAMPLES ---\n\n" + '\n\n'.join(
+            render_template(i, template) for i, template in enumerate(templates, start=1)
+        ))
+    return '\n\n'.join(parts) + '\n'
+
+
+SYSTEM_PROMPT = render_prompt(TEMPLATES)
+
+
+class TemplateRanker:
+    """BM25 over the templates' title, tags and example question."""
+
+    def __init__(self, templates: List[tuple] = TEMPLATES):
+        self.templates = templates
+        self.documents = [Counter(_terms(' '.join((title, tags, question))))
+                          for title, tags, _, question, _ in templates]
+        self.lengths = [sum(doc.values()) for doc in self.documents]
+        self.average_length = sum(self.lengths) / len(self.lengths)
+        document_frequency = Counter(term for doc in self.documents for term in doc)
+        n = len(self.documents)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+
+    def scores(self, question: str) -> List[float]:
+        terms = set(_terms(question))
+        scores = []
+        for doc, length in zip(self.documents, self.lengths):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self.average_length)
+            scores.append(sum(
+                self.idf[term] * doc[term] * (BM25_K1 + 1) / (doc[term] + norm)
+                for term in terms if term in doc
+            ))
+        return scores
+
+    def rank(self, question: str, limit: int = MAX_TEMPLATES) -> List[tuple]:
+        """The best-matching templates (score > 0), best first."""
+        scored = sorted(zip(self.scores(question), range(len(self.templates))), key=lambda p: (-p[0], p[1]))
+        return [self.templates[i] for score, i in scored[:limit] if score > 0]
+
+
+class PromptBuilder:
+    """Builds the prompt_to_sql system prompt for one question."""
+
+    def __init__(self, index: Optional[EntityIndex] = None, token_budget: int = TOKEN_BUDGET,
+                 max_templates: int = MAX_TEMPLATES, dialect: str = "sqlite"):
+        self.index = index
+        self.dialect = dialect
+        self.token_budget = token_budget
+        self.max_templates = max_templates
+        self.ranker = TemplateRanker()
+
+    def entity_hints(self, question: str) -> str:
+        """The canonical values of the entities the question mentions, as a prompt section."""
+        if self.index is None:
+            return ''
+        found: Dict[str, List[str]] = self.index.resolve(question)
+        lines = [
+            f"- {HINT_COLUMNS[kind]}: " + ', '.join(f"'{value}'" for value in values[:MAX_VALUES_PER_KIND])
+            for kind, values in found.items() if values
+        ]
+        if not lines:
+            return ''
+        return "VALUES IN THE DATABASE (the question mentions these; see rule 5):\n" + '\n'.join(lines)
+
+    def build(self, question: str) -> str:
+        """
+        Role, schema and rules (with the backend's dialect rule), then entity hints, the best-matching template and any further
+        templates that fit the token budget. The best match is never dropped for the budget:
+        it is the example closest to the question, and the larger ones alone come near it.
+        """
+        hints = self.entity_hints(question)
+        ranked = self.ranker.rank(question, self.max_templates)
+        templates = ranked[:1]
+        for template in ranked[1:]:
+            if estimate_tokens(render_prompt(templates + [template], hints, self.dialect)) > self.token_budget:
+                continue
+            templates.append(template)
+        prompt = render_prompt(templates, hints, self.dialect)
+        set_attributes(prompt_tokens_est=estimate_tokens(prompt), templates=[t[0] for t in templates],
+                       entity_hints=bool(hints))
+        return prompt
@@ -0,0 +1,197 @@
+import os
+
+import pandas as pd
+
+from data_loader import read_table
+from text_to_sql import EntityIndex, classify, parse_years
+from climate_analytics import MIN_YEARS, RAW_COLUMNS, climate_sensitivity
+from tracing import span
+
+# The raw (un-renamed) integration output the Q&A system answers from.
+DATA_FILE = "datasets/crop_rainfall_integrated.csv"
+
+# --- CORE LOGIC: SamarthQASystem Class (Required to run the analysis) ---
+
+class SamarthQASystem:
+    """
+    An intelligent Q&A system prototype over integrated agriculture and climate data.
+    """
+    # The only columns the intents below touch; everything else is never decoded.
+    COLUMNS = ("State_Name", "District_Name", "Crop", "Season", "YEAR", "SUBDIVISION",
+               "ANNUAL", "JJAS", "Area", "Production")
+    # Districts kept per (state, crop, year) in the precomputed production ranking.
+    TOP_K = 5
+
+    def __init__(self, data_file_path):
+        """Loads the integrated dataset (from its Parquet snapshot when one is built)."""
+        try:
+            self.df = read_table(data_file_path, columns=self.COLUMNS)
+            self.df_source = os.path.basename(data_file_path) # Use filename for citation
+            self.max_year = self.df['YEAR'].max()
+            self.entities = EntityIndex(
+                self.df['State_Name'].unique(), self.df['District_Name'].unique(),
+                self.df['Crop'].unique(), seasons=(),
+            )
+            self._build_indexes()
+        except FileNotFoundError:
+            self.df = None
+            raise FileNotFoundError(f"Data file not found at {data_file_path}")
+        except Exception as e:
+            self.df = None
+            raise Exception(f"Error loading data: {e}")
+
+    def _build_indexes(self):
+        """
+        Precomputes the per-entity tables the intents read, each with a sorted MultiIndex,
+        so a query is a binary-searched .loc slice instead of a mask over every row:
+        - state_year_rainfall: (State_Name, YEAR) -> sum and count of ANNUAL
+        - top_districts: (State_Name, Crop, YEAR) -> the TOP_K districts by total production
+        """
+        self.states = set(self.df['State_Name'].dropna().unique())
+
+        self.state_year_rainfall = self.df.groupby(['State_Name', 'YEAR'], observed=True)['ANNUAL'].agg(
+            ['sum', 'count']
+        ).sort_index()
+
+        keys = ['State_Name', 'Crop', 'YEAR']
+        district_prod = self.df.groupby(keys + ['District_Name'], observed=True)['Production'].sum().reset_index()
+        district_prod = district_prod.sort_values(
+            keys + ['Production'], ascending=[True, True, True, False], kind='stable'
+        )
+        self.top_districts = district_prod.groupby(keys, observed=True).head(self.TOP_K).set_index(keys).sort_index()
+
+        # climate_sensitivity() rankings, computed once per look-back window.
+        self._sensitivity = {}
+
+    def _parse_query(self, query):
+        """
+        Natural Language Processing (NLP) / Intent Recognition.
+        The question shape comes from text_to_sql.classify(); states, crops and the year
+        window are resolved against the dataset's own values (exact, then fuzzy matches).
+        Parameters the question does not name fall back to the demo defaults.
+        """
+        shape = classify(query)
+        entities = self.entities.resolve(query)
+        years = parse_years(query)
+        query = query.lower()
+        intent = None
+        params = {}
+        
+        # --- Intent 1: Compare Rainfall ---
+        if shape == "COMPARE" and "rainfall" in query:
+            intent = "COMPARE_RAINFALL"
+            states = entities['state'] + [s for s in ('Bihar', 'Uttar Pradesh') if s not in entities['state']]
+            params['state_x'] = states[0]
+            params['state_y'] = states[1]
+            params['n_years'] = years.get('last_n', 5)
+            
+        # --- Intent 2: Find Extremum (Highest Production) ---
+        elif shape == "TOP_K" and "produc" in query:
+            intent = "FIND_HIGHEST_PRODUCTION"
+            params['state'] = entities['state'][0] if entities['state'] else 'Maharashtra'
+            params['crop'] = entities['crop'][0] if entities['crop'] else 'Rice'
+            
+        # --- Intent 3: Correlation/Trend Analysis (Complex) ---
+        elif shape in ("TREND", "CORRELATION"):
+            intent = "ANALYZE_CORRELATION_TREND"
+            params['state'] = entities['state'][0] if entities['state'] else 'Andhra Pradesh'
+            params['crop'] = entities['crop'][0] if entities['crop'] else 'Rice'
+            params['n_years'] = years.get('last_n', 10)
+            
+        return intent, params
+
+    def _execute_compare_rainfall(self, state_x, state_y, n_years):
+        min_year_filter = self.max_year - n_years + 1
+        rainfall_comparison = []
+        for state in dict.fromkeys([state_x, state_y]):
+            if state not in self.states:
+                continue
+            window = self.state_year_rainfall.loc[state].loc[min_year_filter:]
+            if window['count'].sum() > 0:
+                rainfall_comparison.append(
+                    {'State_Name': state, 'ANNUAL': window['sum'].sum() / window['count'].sum()}
+                )
+
+        if not rainfall_comparison:
+             return f"❌ Error: No data found for {state_x} or {state_y} in the last {n_years} years."
+        rainfall_comparison = pd.DataFrame(rainfall_comparison).sort_values('State_Name')
+
+        # Synthesis
+        summary = "### 🌧️ Rainfall Comparison Analysis\n"
+        summary += f"**Time Period:** {min_year_filter} - {self.max_year} ({n_years} Years)\n\n"
+        
+        for _, row in rainfall_comparison.iterrows():
+            summary += f"- **{row['State_Name']}:** {row['ANNUAL']:.2f} mm\n"
+        
+        summary += f"\n***Source: {self.df_source}***"
+        return summary
+        
+    def _execute_highest_production_district(self, state, crop):
+        if state not in self.states:
+            return f"❌ Error: No data available for State: {state}."
+
+        if (state, crop, self.max_year) not in self.top_districts.index:
+            return f"❌ Error: No production data for {crop} in {state} in {self.max_year}."
+
+        highest_district_row = self.top_districts.loc[(state, crop, self.max_year)].iloc[0]
+        max_production = highest_district_row['Production']
+        
+        summary = f"### 🌾 Highest Production District Analysis\n"
+        summary += f"**State:** {state}, **Crop:** {crop}, **Year:** {self.max_year}\n"
+        summary += f"The district with the **Highest Production** was **{highest_district_row['District_Name']}**,\n"
+        summary += f"with a total production of **{max_production:,.0f} units**.\n"
+        summary += f"\n***Source: {self.df_source}***"
+        return summary
+        
+    def _execute_correlation_trend(self, state, crop, n_years):
+        min_year_filter = self.max_year - n_years + 1
+        # Every (state, crop) group is scored in one vectorised pass, so the answer can
+        # also say where this state ranks among all states growing the crop.
+        with span("qa.climate_sensitivity", cache_hit=n_years in self._sensitivity):
+            if n_years not in self._sensitivity:
+                self._sensitivity[n_years] = climate_sensitivity(
+                    self.df[self.df['YEAR'] >= min_year_filter], by=("state", "crop"),
+                    columns=RAW_COLUMNS, min_years=min(MIN_YEARS, n_years),
+                )
+        ranking = self._sensitivity[n_years]
+        crop_ranking = ranking[ranking['crop'] == crop].reset_index(drop=True)
+        match = crop_ranking.index[crop_ranking['state'] == state]
+        if match.empty:
+            return f"❌ Error: Not enough yearly data for {crop} in {state} between {min_year_filter} and {self.max_year}."
+        row = crop_ranking.loc[match[0]]
+
+        def strength(r):
+            size = abs(r)
+            label = "strong" if size >= 0.7 else "moderate" if size >= 0.4 else "weak"
+            return f"{label} {'positive' if r >= 0 else 'negative'}"
+
+        summary = f"### 📈 Correlation and Trend Analysis\n"
+        summary += f"**State:** {state}, **Crop:** {crop}, **Years:** {row['first_year']} - {row['last_year']} ({row['n_years']} years)\n\n"
+        summary += f"- **Production trend:** {row['production_trend']:+,.0f} tonnes/year\n"
+        summary += f"- **Yield trend:** {row['yield_trend']:+.3f} t/ha per year\n"
+        summary += f"- **Yield vs annual rainfall:** $r = {row['r_yield_annual']:.4f}$ ({strength(row['r_yield_annual'])})\n"
+        summary += f"- **Yield vs monsoon (JJAS) rainfall:** $r = {row['r_yield_jjas']:.4f}$ ({strength(row['r_yield_jjas'])})\n"
+        summary += f"- **Production vs annual rainfall:** $r = {row['r_production_annual']:.4f}$\n"
+        summary += f"- **Production vs monsoon (JJAS) rainfall:** $r = {row['r_production_jjas']:.4f}$\n\n"
+        summary += f"{state} ranks **#{match[0] + 1} of {len(crop_ranking)}** states for climate sensitivity of {crop}"
+        summary += f" (most sensitive: {', '.join(crop_ranking['state'].head(3).astype(str))}).\n"
+        summary += f"\n***Source: {self.df_source}***"
+        return summary
+        
+    def answer_query(self, query):
+        if self.df is None:
+            return "System Error: Data not loaded."
+
+        with span("qa.parse") as current:
+            intent, params = self._parse_query(query)
+            current.set(intent=intent)
+        
+        with span("qa.execute", intent=intent):
+            if intent == "COMPARE_RAINFALL":
+                return self._execute_compare_rainfall(**params)
+            elif intent == "FIND_HIGHEST_PRODUCTION":
+                return self._execute_highest_production_district(**params)
+            elif intent == "ANALYZE_CORRELATION_TREND":
+                return self._execute_correlation_trend(**params)
+            else:
+                return "🤷 I do not have a defined data analysis strategy for that specific query type yet. Try a comparison (e.g., 'compare rainfall in State X and Y') or extremum query (e.g., 'highest production district')."
@@ -0,0 +1,87 @@
+import re
+import time
+from collections import Counter
+
+import pandas as pd
+import sqlite3
+
+# --- Execution governor for LLM-generated SQL ---
+# Every generated query goes through four checks before/while it runs:
+# 1. it must be exactly one SELECT (or WITH ... SELECT) statement;
+# 2. its EXPLAIN QUERY PLAN must not contain a join of two full table scans;
+# 3. it is interrupted once it runs longer than TIMEOUT_SECONDS (progress handler);
+# 4. at most MAX_ROWS rows are fetched; the rest is dropped and the result marked truncated.
+
+TIMEOUT_SECONDS = 10.0
+MAX_ROWS = 10_000
+FETCH_BATCH = 1_000
+
+# The progress handler runs every N SQLite VM instructions.
+PROGRESS_INTERVAL = 10_000
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)(\S+)")
+
+
+class QueryRejected(ValueError):
+    """Raised when a query fails a guardrail; the message says which one."""
+
+
+def check_single_select(sql_query: str) -> str:
+    """Returns the query without a trailing semicolon, or raises if it is not one read-only SELECT."""
+    sql_query = sql_query.strip().rstrip(';').strip()
+    code = _COMMENT.sub(' ', _LITERAL.sub("''", sql_query))
+    if ';' in code:
+        raise QueryRejected("Only a single SQL statement is allowed.")
+    if not re.match(r'^\s*(SELECT|WITH)\b', code, re.I):
+        raise QueryRejected("Only SELECT queries are allowed.")
+    if re.search(r'\b(INSERT|UPDATE|DELETE|DROP|ALTER|CREATE|ATTACH|DETACH|PRAGMA|VACUUM)\b', code, re.I):
+        raise QueryRejected("Only read-only SELECT queries are allowed.")
+    return sql_query
+
+
+def check_plan(conn: sqlite3.Connection, sql_query: str) -> None:
+    """
+    Rejects plans that nest one full table scan inside another (a cross join or a join
+    without any usable key). Separate scans in UNION ALL branches or subqueries sit under
+    different parents in the plan and are allowed.
+    """
+    plan = conn.execute(f'EXPLAIN QUERY PLAN {sql_query}').fetchall()
+    scans_per_parent = Counter(
+        parent for _, parent, _, detail in plan if _SCAN.match(detail)
+    )
+    if any(count > 1 for count in scans_per_parent.values()):
+        raise QueryRejected("The query joins full table scans; add a join condition or filter.")
+
+
+def run_guarded(sql_query: str, conn: sqlite3.Connection,
+                timeout: float = TIMEOUT_SECONDS, max_rows: int = MAX_ROWS) -> pd.DataFrame:
+    """
+    Runs a query under all four guardrails (same call shape as pd.read_sql_query).
+    The result has attrs['truncated'] = True when rows beyond `max_rows` were dropped.
+    """
+    sql_query = check_single_select(sql_query)
+    check_plan(conn, sql_query)
+
+    deadline = time.monotonic() + timeout
+    conn.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_INTERVAL)
+    try:
+        cursor = conn.execute(sql_query)
+        rows = []
+        while len(rows) <= max_rows:
+            batch = cursor.fetchmany(FETCH_BATCH)
+            if not batch:
+                break
+            rows.extend(batch)
+        cursor.close()
+    except sqlite3.OperationalError as e:
+        if 'interrupted' in str(e):
+            raise QueryRejected(f"The query exceeded the {timeout:g}s time limit.") from None
+        raise
+    finally:
+        conn.set_progress_handler(None, 0)
+
+    result_df = pd.DataFrame(rows[:max_rows], columns=[col[0] for col in cursor.description])
+    result_df.attrs['truncated'] = len(rows) > max_rows
+    return result_df
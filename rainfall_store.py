@@ -0,0 +1,139 @@
+import functools
+import json
+import os
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# --- Monthly rainfall store ---
+# The IMD subdivision rainfall (datasets/rainfall_cleaned.csv, monthly since 1901) as one
+# float32 array of shape (subdivision, year, month), saved as .npy and memory-mapped on
+# load, plus a small JSON file naming the axes. Years are contiguous (gaps are NaN), so a
+# (subdivision, year) lookup is plain index arithmetic and every month-window or anomaly
+# query is a slice and a reduction over that array; the CSV is only parsed to (re)build it.
+
+RAINFALL_CSV = "datasets/rainfall_cleaned.csv"
+
+MONTHS = ("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC")
+
+# Standard climatological reference period used for anomalies.
+BASELINE_YEARS = (1961, 1990)
+
+
+def store_paths(csv_path: str) -> Tuple[str, str]:
+    """The array and axes files that sit next to the CSV (foo.csv -> foo.monthly.npy, foo.monthly.json)."""
+    base = os.path.splitext(csv_path)[0] + ".monthly"
+    return base + ".npy", base + ".json"
+
+
+def has_fresh_store(csv_path: str) -> bool:
+    """True if a store exists and is not older than its source CSV."""
+    array_path, axes_path = store_paths(csv_path)
+    if not (os.path.exists(array_path) and os.path.exists(axes_path)):
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    return os.path.getmtime(array_path) >= os.path.getmtime(csv_path)
+
+
+def build_store(csv_path: str = RAINFALL_CSV) -> str:
+    """Converts the monthly rainfall CSV into the (subdivision, year, month) array store."""
+    df = pd.read_csv(csv_path, usecols=["SUBDIVISION", "YEAR", *MONTHS])
+    subdivisions = sorted(df["SUBDIVISION"].unique())
+    first_year, last_year = int(df["YEAR"].min()), int(df["YEAR"].max())
+
+    values = np.full((len(subdivisions), last_year - first_year + 1, len(MONTHS)), np.nan, dtype=np.float32)
+    sub_idx = pd.Categorical(df["SUBDIVISION"], categories=subdivisions).codes
+    values[sub_idx, df["YEAR"].to_numpy() - first_year] = df[list(MONTHS)].to_numpy(dtype=np.float32)
+
+    array_path, axes_path = store_paths(csv_path)
+    np.save(array_path + ".tmp.npy", values)
+    with open(axes_path, "w") as f:
+        json.dump({"subdivisions": subdivisions, "first_year": first_year}, f)
+    os.replace(array_path + ".tmp.npy", array_path)
+    return array_path
+
+
+def month_window(start: str, end: str) -> Tuple[int, ...]:
+    """
+    Month positions from `start` to `end` inclusive, e.g. ('JUN', 'JUL') -> (5, 6).
+    A window that wraps the new year starts in the previous year: ('NOV', 'FEB') -> (-2, -1, 0, 1).
+    """
+    first, last = MONTHS.index(start.upper()[:3]), MONTHS.index(end.upper()[:3])
+    if last < first:
+        first -= len(MONTHS)
+    return tuple(range(first, last + 1))
+
+
+class MonthlyRainfall:
+    """Month-window totals and anomalies over the (subdivision, year, month) array."""
+
+    def __init__(self, values: np.ndarray, subdivisions: Sequence[str], first_year: int):
+        self.values = values
+        self.subdivisions = list(subdivisions)
+        self.years = np.arange(first_year, first_year + values.shape[1])
+        self._by_name = {name.lower(): i for i, name in enumerate(self.subdivisions)}
+
+    @classmethod
+    def open(cls, csv_path: str = RAINFALL_CSV) -> "MonthlyRainfall":
+        """Memory-maps the store for `csv_path`, building it first if missing or stale."""
+        if not has_fresh_store(csv_path):
+            build_store(csv_path)
+        array_path, axes_path = store_paths(csv_path)
+        with open(axes_path) as f:
+            axes = json.load(f)
+        return cls(np.load(array_path, mmap_mode="r"), axes["subdivisions"], axes["first_year"])
+
+    def _subdivision_rows(self, subdivisions: Optional[Sequence[str]]) -> list:
+        if subdivisions is None:
+            return list(range(len(self.subdivisions)))
+        missing = [s for s in subdivisions if s.lower() not in self._by_name]
+        if missing:
+            raise KeyError(f"Unknown subdivision(s): {', '.join(missing)}")
+        return [self._by_name[s.lower()] for s in subdivisions]
+
+    def window_totals(self, months: Sequence[int], subdivisions: Optional[Sequence[str]] = None,
+                      start_year: Optional[int] = None, end_year: Optional[int] = None) -> pd.DataFrame:
+        """
+        Rainfall summed over `months` (see month_window) per year, one column per subdivision.
+        A year is NaN if any month in its window is missing.
+        """
+        rows = self._subdivision_rows(subdivisions)
+        data = np.asarray(self.values[rows], dtype=np.float64)
+        months = np.asarray(months)
+        if (months < 0).any():
+            # Months before January come from the previous year.
+            previous = np.concatenate([np.full_like(data[:, :1], np.nan), data[:, :-1]], axis=1)
+            data = np.concatenate([previous, data], axis=2)
+            months = months + len(MONTHS)
+        totals = data[:, :, months].sum(axis=2)
+
+        frame = pd.DataFrame(totals.T, index=pd.Index(self.years, name="year"),
+                             columns=[self.subdivisions[i] for i in rows])
+        return frame.loc[start_year:end_year]
+
+    def anomalies(self, months: Sequence[int], subdivisions: Optional[Sequence[str]] = None,
+                  start_year: Optional[int] = None, end_year: Optional[int] = None,
+                  baseline: Tuple[int, int] = BASELINE_YEARS) -> pd.DataFrame:
+        """
+        Window totals against each subdivision's climatology over `baseline` (inclusive), in long
+        form: subdivision, year, rainfall_mm, normal_mm, anomaly_mm, anomaly_pct, z_score.
+        """
+        totals = self.window_totals(months, subdivisions)
+        reference = totals.loc[baseline[0]:baseline[1]]
+        normal, spread = reference.mean(), reference.std()
+        window = totals.loc[start_year:end_year]
+
+        result = window.melt(ignore_index=False, var_name="subdivision", value_name="rainfall_mm").reset_index()
+        result["normal_mm"] = result["subdivision"].map(normal)
+        result["anomaly_mm"] = result["rainfall_mm"] - result["normal_mm"]
+        result["anomaly_pct"] = 100 * result["anomaly_mm"] / result["normal_mm"]
+        result["z_score"] = result["anomaly_mm"] / result["subdivision"].map(spread)
+        return result[["subdivision", "year", "rainfall_mm", "normal_mm", "anomaly_mm", "anomaly_pct", "z_score"]]
+
+
+@functools.lru_cache(maxsize=None)
+def load_monthly_rainfall(csv_path: str = RAINFALL_CSV) -> MonthlyRainfall:
+    """The monthly rainfall store, opened once per process."""
+    return MonthlyRainfall.open(csv_path)
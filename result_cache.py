@@ -0,0 +1,104 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import pandas as pd
+
+# --- Result-set cache for executed SQL ---
+# The database only changes when setup_db.py runs, so a query's result can be reused
+# until then. Entries are keyed on the canonicalised SQL text and the database
+# "generation" (size/mtime of the DB file and its WAL); any rebuild or incremental
+# refresh changes the generation and drops every cached result.
+# Cached frames are shared between callers and must not be modified in place.
+
+MAX_BYTES = 64 * 1024 * 1024
+
+# Single-quoted SQL string literals (with '' escapes) are left untouched by canonicalisation.
+_LITERAL = re.compile(r"('(?:[^']|'')*')")
+
+
+def canonicalize_sql(sql_query: str) -> str:
+    """Collapses whitespace outside string literals and drops a trailing semicolon."""
+    parts = _LITERAL.split(sql_query.strip().rstrip(';').strip())
+    return ''.join(
+        part if i % 2 else re.sub(r'\s+', ' ', part)
+        for i, part in enumerate(parts)
+    )
+
+
+def database_generation(database_file: str) -> Tuple[int, ...]:
+    """Changes whenever the database (or its write-ahead log) is written."""
+    stamp = []
+    for path in (database_file, database_file + '-wal'):
+        try:
+            st = os.stat(path)
+            stamp += [st.st_mtime_ns, st.st_size]
+        except FileNotFoundError:
+            stamp += [0, 0]
+    return tuple(stamp)
+
+
+class ResultCache:
+    """LRU of query results bounded by their total in-memory size, thread-safe."""
+
+    def __init__(self, database_file: str, max_bytes: int = MAX_BYTES):
+        self.database_file = database_file
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0, 'bytes': 0}
+
+        self._entries = OrderedDict()  # sql -> (DataFrame, size)
+        self._generation = database_generation(database_file)
+        self._lock = threading.Lock()
+
+    def _check_generation(self) -> None:
+        """Drops everything if the database changed since the entries were cached."""
+        generation = database_generation(self.database_file)
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+            self.stats['bytes'] = 0
+            self.stats['invalidations'] += 1
+
+    def get(self, sql_query: str) -> Optional[pd.DataFrame]:
+        key = canonicalize_sql(sql_query)
+        with self._lock:
+            self._check_generation()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[0]
+
+    def put(self, sql_query: str, result_df: pd.DataFrame, generation: Optional[Tuple[int, ...]] = None) -> None:
+        """
+        Caches a result unless it alone would exceed the budget; evicts LRU entries to fit.
+        `generation` is database_generation() from before the query ran: if the database
+        has changed since, the result may predate the change and is not cached.
+        """
+        size = int(result_df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        key = canonicalize_sql(sql_query)
+        with self._lock:
+            self._check_generation()
+            if generation is not None and generation != self._generation:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.stats['bytes'] -= previous[1]
+            self._entries[key] = (result_df, size)
+            self.stats['bytes'] += size
+            while self.stats['bytes'] > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.stats['bytes'] -= evicted_size
+                self.stats['evictions'] += 1
+
+    def clear(self) -> None:
+        """Drops every cached result."""
+        with self._lock:
+            self._entries.clear()
+            self.stats['bytes'] = 0
@@ -0,0 +1,85 @@
+import functools
+
+import pandas as pd
+
+from data_loader import load_integrated_data
+from tracing import span
+
+# --- Pre-aggregated rollups for the dashboard pages ---
+# Each view's groupby is materialised once per process at its natural grain and stored
+# with a sorted MultiIndex. A widget change is then a binary-searched .loc slice of a
+# few rows instead of a filter + groupby over the full frame.
+
+ROLLUP_COLUMNS = (
+    "crop", "state", "district", "year",
+    "production_tonnes", "yield_t_per_ha", "annual_rainfall_mm",
+)
+
+
+def _rollup(df: pd.DataFrame, keys, agg) -> pd.DataFrame:
+    """Groups `df` by `keys` and returns the aggregate with a sorted index."""
+    return df.groupby(list(keys), observed=True).agg(**agg).sort_index()
+
+
+def _slice(rollup: pd.DataFrame, key) -> pd.DataFrame:
+    """Rows of a rollup under the leading index value(s) `key`; empty if absent."""
+    if key in rollup.index:
+        return rollup.loc[key]
+    depth = len(key) if isinstance(key, tuple) else 1
+    return rollup.iloc[:0].droplevel(list(range(depth)))
+
+
+class Rollups:
+    """
+    Aggregates behind the dashboard pages:
+    - (crop, state): total production and mean yield
+    - (crop, state, year) and (crop, district, year): mean rainfall and yield
+    - (state, year): mean annual rainfall
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.crops = sorted(df["crop"].dropna().unique())
+        self.states = sorted(df["state"].dropna().unique())
+        self.districts = sorted(df["district"].dropna().unique())
+
+        self.crop_state = _rollup(df, ("crop", "state"), {
+            "production_tonnes": ("production_tonnes", "sum"),
+            "yield_t_per_ha": ("yield_t_per_ha", "mean"),
+        })
+        self.state_crop = self.crop_state.swaplevel().sort_index()
+        yearly = {
+            "annual_rainfall_mm": ("annual_rainfall_mm", "mean"),
+            "yield_t_per_ha": ("yield_t_per_ha", "mean"),
+        }
+        self.crop_state_year = _rollup(df, ("crop", "state", "year"), yearly)
+        self.crop_district_year = _rollup(df, ("crop", "district", "year"), yearly)
+        self.state_year = _rollup(df, ("state", "year"), {
+            "annual_rainfall_mm": ("annual_rainfall_mm", "mean"),
+        })
+
+    def production_by_state(self, crop: str) -> pd.DataFrame:
+        """Total production of `crop` per state (columns: state, production_tonnes)."""
+        return _slice(self.crop_state, crop)[["production_tonnes"]].reset_index()
+
+    def yield_by_crop(self, state: str) -> pd.DataFrame:
+        """Mean yield of every crop grown in `state` (columns: crop, yield_t_per_ha)."""
+        return _slice(self.state_crop, state)[["yield_t_per_ha"]].reset_index()
+
+    def yearly_by_place(self, crop: str, place_type: str, place: str) -> pd.DataFrame:
+        """Yearly mean rainfall and yield of `crop` in a state or district (columns: year, ...)."""
+        rollup = self.crop_state_year if place_type == "State" else self.crop_district_year
+        return _slice(rollup, (crop, place)).reset_index()
+
+    def rainfall_by_year(self, state: str) -> pd.DataFrame:
+        """Mean annual rainfall of `state` per year (columns: year, annual_rainfall_mm)."""
+        return _slice(self.state_year, state).reset_index()
+
+
+@functools.lru_cache(maxsize=None)
+def load_rollups() -> Rollups:
+    """Builds the rollups once per process from the shared data layer."""
+    with span("rollups.build") as current:
+        df = load_integrated_data(columns=ROLLUP_COLUMNS)
+        rollups = Rollups(df)
+        current.set(rows=len(df))
+    return rollups
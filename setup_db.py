@@ -1,23 +1,451 @@
+import argparse
+import os
+import time
+
 import pandas as pd
 import sqlite3
 
 DATABASE_FILE = 'samarth_agri_climate.db'
 CSV_FILE = 'datasets/crop_rainfall_integrated_cleaned.csv'
+WATERMARK_TABLE = 'ingest_watermark'
+
+# --- Star schema ---
+# The integrated CSV repeats a subdivision-year's rainfall on every crop row, and again for
+# every subdivision of a multi-subdivision state (Maharashtra x4, Karnataka x3). It is
+# stored normalised instead:
+#   crop_fact          one row per crop record (state, district, crop, season, year; distinct
+#                      records sharing that key are summed, see stage_facts)
+#   rainfall_dim       one row per (subdivision, year)
+#   state_subdivision  the state -> subdivision bridge, with a weight per subdivision
+# plus two views: state_rainfall (weighted state x year rainfall, a few thousand rows)
+# and integrated_data, which keeps the column names the chatbot's SQL was written against
+# (one row per crop record, now without the per-subdivision duplicates).
+FACT_TABLE = 'crop_fact'
+RAINFALL_TABLE = 'rainfall_dim'
+BRIDGE_TABLE = 'state_subdivision'
+STATE_RAINFALL_VIEW = 'state_rainfall'
 TABLE_NAME = 'integrated_data'
 
-print("Starting database setup...")
+# Rows per read_csv chunk / executemany batch in streaming mode.
+CHUNK_SIZE = 50_000
+
+# Page size the database is VACUUMed into. Larger pages mean fewer reads per range scan.
+PAGE_SIZE = 8192
+
+RAINFALL_COLUMNS = [
+    'jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec',
+    'annual_rainfall_mm', 'jf', 'mam', 'jjas_rainfall_mm', 'ond',
+]
+
+# Explicit, typed schema of the integrated CSV (column name -> SQLite declaration).
+# Names match the ones used in the chatbot's SYSTEM_PROMPT.
+SCHEMA = {
+    'state': 'TEXT NOT NULL',
+    'district': 'TEXT NOT NULL',
+    'year': 'INTEGER NOT NULL',
+    'season': "TEXT NOT NULL DEFAULT ''",  # part of the fact key: SQLite's UNIQUE treats NULLs as distinct
+    'crop': 'TEXT NOT NULL',
+    'area_ha': 'REAL',
+    'production_tonnes': 'REAL',
+    'subdivision': 'TEXT',
+    **{col: 'REAL' for col in RAINFALL_COLUMNS},
+    'yield_t_per_ha': 'REAL',
+    'state_canonical': 'TEXT NOT NULL',
+}
+
+FACT_SCHEMA = {col: SCHEMA[col] for col in (
+    'state', 'district', 'year', 'season', 'crop', 'area_ha', 'production_tonnes',
+    'yield_t_per_ha', 'state_canonical',
+)}
+RAINFALL_SCHEMA = {'subdivision': 'TEXT NOT NULL', 'year': 'INTEGER NOT NULL',
+                   **{col: 'REAL' for col in RAINFALL_COLUMNS}}
+BRIDGE_SCHEMA = {'state': 'TEXT NOT NULL', 'subdivision': 'TEXT NOT NULL', 'weight': 'REAL NOT NULL'}
+
+# CSV columns (after cleaning) that are stored under a different name.
+COLUMN_RENAMES = {'jjas': 'jjas_rainfall_mm'}
+
+# Natural keys: one crop record per district/season/year; one rainfall row per subdivision/year.
+# Loads stage the cleaned CSV rows first and derive the facts from them (see stage_facts).
+FACT_KEY = ('state', 'district', 'crop', 'season', 'year')
+RAINFALL_KEY = ('subdivision', 'year')
+BRIDGE_KEY = ('state', 'subdivision')
+
+# Indexes on the fact table matching the query shapes the chatbot templates generate:
+# the integrated_data view's join to state_rainfall (one index search per state-year, instead
+# of re-reading the state's facts for every year), state + crop + time window / ranking,
+# MAX(year) lookups and per-district filters.
+# (The unique natural key is created with the table: loads and upserts rely on it.)
+INDEXES = {
+    'idx_state_year': ('state_canonical', 'year'),
+    'idx_state_crop_year': ('state_canonical', 'crop', 'year'),
+    'idx_year': ('year',),
+    'idx_district': ('district',),
+}
+
+
+def clean_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Cleans column names to match the names used in the LLM system prompt, and fills missing seasons with ''."""
+    df.columns = df.columns.str.lower().str.replace(' ', '_').str.replace('[^a-z0-9_]', '', regex=True)
+    df = df.rename(columns=COLUMN_RENAMES)
+
+    missing_cols = [col for col in SCHEMA if col not in df.columns]
+    if missing_cols:
+        raise ValueError(f"Missing columns in the CSV: {', '.join(missing_cols)}")
+    # A missing season is stored as '' so the crop's natural key never contains NULL.
+    df['season'] = df['season'].fillna('')
+    return df[list(SCHEMA)]
+
+
+def _object_type(conn: sqlite3.Connection, name: str):
+    """'table', 'view', ... or None if nothing called `name` exists."""
+    row = conn.execute('SELECT type FROM sqlite_master WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else None
+
+
+def _create_table(conn: sqlite3.Connection, table: str, schema: dict, key=None) -> None:
+    columns = ',\n    '.join(f'{name} {decl}' for name, decl in schema.items())
+    if key:
+        # Small dimensions are clustered on their key.
+        conn.execute(f'CREATE TABLE IF NOT EXISTS {table} (\n    {columns},\n'
+                     f'    PRIMARY KEY ({", ".join(key)})\n) WITHOUT ROWID')
+    else:
+        conn.execute(f'CREATE TABLE IF NOT EXISTS {table} (\n    id INTEGER PRIMARY KEY,\n    {columns}\n)')
+
+
+def create_schema(conn: sqlite3.Connection, replace: bool = True) -> None:
+    """
+    Creates the fact, rainfall and bridge tables, the compatibility views and the
+    watermark table. With replace=True the existing ones (and a flat integrated_data
+    table from older builds) are dropped first.
+    """
+    if replace:
+        for name in (TABLE_NAME, STATE_RAINFALL_VIEW, FACT_TABLE, RAINFALL_TABLE, BRIDGE_TABLE):
+            kind = _object_type(conn, name)
+            if kind in ('table', 'view'):
+                conn.execute(f'DROP {kind.upper()} {name}')
+
+    _create_table(conn, FACT_TABLE, FACT_SCHEMA)
+    conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS idx_fact_key ON {FACT_TABLE} ({", ".join(FACT_KEY)})')
+    _create_table(conn, RAINFALL_TABLE, RAINFALL_SCHEMA, RAINFALL_KEY)
+    _create_table(conn, BRIDGE_TABLE, BRIDGE_SCHEMA, BRIDGE_KEY)
+
+    weighted = ',\n    '.join(f'SUM(b.weight * r.{col}) / SUM(b.weight) AS {col}' for col in RAINFALL_COLUMNS)
+    conn.execute(
+        f'CREATE VIEW IF NOT EXISTS {STATE_RAINFALL_VIEW} AS\n'
+        f'SELECT b.state AS state_canonical, r.year,\n    {weighted}\n'
+        f'FROM {BRIDGE_TABLE} AS b JOIN {RAINFALL_TABLE} AS r ON r.subdivision = b.subdivision\n'
+        f'GROUP BY b.state, r.year'
+    )
+    # Same column order as the old flat table, minus the subdivision.
+    crop_columns = [f'f.{col}' for col in FACT_SCHEMA if col not in ('yield_t_per_ha', 'state_canonical')]
+    conn.execute(
+        f'CREATE VIEW IF NOT EXISTS {TABLE_NAME} AS\n'
+        f'SELECT f.id, {", ".join(crop_columns)},\n    '
+        f'{", ".join(f"r.{col}" for col in RAINFALL_COLUMNS)},\n    f.yield_t_per_ha, f.state_canonical\n'
+        f'FROM {FACT_TABLE} AS f JOIN {STATE_RAINFALL_VIEW} AS r\n'
+        f'    ON r.state_canonical = f.state_canonical AND r.year = f.year'
+    )
+    conn.execute(
+        f'CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} ('
+        'source TEXT PRIMARY KEY, last_year INTEGER NOT NULL, ingested_at TEXT NOT NULL)'
+    )
+
+
+def _insert(conn: sqlite3.Connection, table: str, df: pd.DataFrame, verb: str = 'INSERT') -> None:
+    placeholders = ', '.join('?' for _ in df.columns)
+    conn.executemany(
+        f'{verb} INTO {table} ({", ".join(df.columns)}) VALUES ({placeholders})',
+        df.astype(object).where(df.notna(), None).itertuples(index=False, name=None),
+    )
+
+
+def create_staging(conn: sqlite3.Connection) -> None:
+    """A TEMP table for the cleaned CSV rows of one load (private to this connection)."""
+    conn.execute('DROP TABLE IF EXISTS temp.staging')
+    conn.execute(f'CREATE TEMP TABLE staging ({", ".join(f"{name} {decl}" for name, decl in SCHEMA.items())})')
+
+
+def stage_facts(conn: sqlite3.Connection) -> int:
+    """
+    Derives the crop facts of the staged rows into temp.staged_facts, one row per FACT_KEY.
+    The integrated CSV repeats each record for every subdivision of its state: only the copies
+    of one subdivision (the first by name) are kept. Distinct records that still share a key
+    are not dropped: their area and production are summed and the yield recomputed.
+    Returns the number of keys that had more than one record.
+    """
+    key = ', '.join(FACT_KEY)
+    conn.execute('DROP TABLE IF EXISTS temp.staged_facts')
+    conn.execute(
+        f'CREATE TEMP TABLE staged_facts AS\n'
+        f'SELECT {key}, SUM(area_ha) AS area_ha, SUM(production_tonnes) AS production_tonnes,\n'
+        f'    CASE WHEN COUNT(*) = 1 THEN MAX(yield_t_per_ha)\n'
+        f'         ELSE SUM(production_tonnes) / NULLIF(SUM(area_ha), 0) END AS yield_t_per_ha,\n'
+        f'    MAX(state_canonical) AS state_canonical, COUNT(*) AS records\n'
+        f'FROM (SELECT *, DENSE_RANK() OVER (PARTITION BY {key} ORDER BY subdivision) AS copy\n'
+        f'      FROM (SELECT DISTINCT * FROM temp.staging))\n'
+        f'WHERE copy = 1\n'
+        f'GROUP BY {key}'
+    )
+    return conn.execute('SELECT COUNT(*) FROM temp.staged_facts WHERE records > 1').fetchone()[0]
+
+
+def insert_staged(conn: sqlite3.Connection) -> int:
+    """
+    Writes the staged rows into the (empty) fact, rainfall and bridge tables; the caller owns
+    the transaction. Returns the number of crop keys whose records were summed (see stage_facts).
+    """
+    collisions = stage_facts(conn)
+    columns = ', '.join(FACT_SCHEMA)
+    conn.execute(f'INSERT INTO {FACT_TABLE} ({columns}) SELECT {columns} FROM temp.staged_facts')
+    columns = ', '.join(RAINFALL_SCHEMA)
+    conn.execute(f'INSERT OR IGNORE INTO {RAINFALL_TABLE} ({columns}) SELECT DISTINCT {columns} FROM temp.staging')
+    conn.execute(
+        f'INSERT OR IGNORE INTO {BRIDGE_TABLE} (state, subdivision, weight) '
+        'SELECT DISTINCT state_canonical, subdivision, 1.0 FROM temp.staging WHERE subdivision IS NOT NULL'
+    )
+    return collisions
+
+
+def report_collisions(collisions: int) -> None:
+    if collisions:
+        print(f"  {collisions:,} crop keys (state, district, crop, season, year) had several distinct records; "
+              "their area and production were summed.")
+
+
+def assign_weights(conn: sqlite3.Connection) -> None:
+    """
+    Splits each state's weight equally between its subdivisions. The weights live in the
+    bridge table, so area-based shares can replace them without touching the views.
+    """
+    conn.execute(
+        f'UPDATE {BRIDGE_TABLE} SET weight = 1.0 / '
+        f'(SELECT COUNT(*) FROM {BRIDGE_TABLE} AS b WHERE b.state = {BRIDGE_TABLE}.state)'
+    )
+
+
+def create_indexes(conn: sqlite3.Connection) -> None:
+    """Builds the secondary indexes. Done after the bulk load, which is much faster than maintaining them row by row."""
+    for name, columns in INDEXES.items():
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {FACT_TABLE} ({", ".join(columns)})')
+
+
+def optimize_for_reads(conn: sqlite3.Connection) -> None:
+    """
+    Collects planner statistics and rewrites the file compactly:
+    ANALYZE for index selection, VACUUM at PAGE_SIZE, then WAL so readers never block on a writer.
+    Files created by use_wal already have PAGE_SIZE, so this runs with readers connected.
+    """
+    conn.execute('ANALYZE')
+    if conn.execute('PRAGMA page_size').fetchone()[0] != PAGE_SIZE:
+        # Older files only: page_size can only change outside WAL, which needs exclusive access.
+        conn.execute('PRAGMA journal_mode=DELETE')
+        conn.execute(f'PRAGMA page_size={PAGE_SIZE}')
+    conn.execute('VACUUM')
+    conn.execute('PRAGMA journal_mode=WAL')
+
+
+def get_watermark(conn: sqlite3.Connection, source: str):
+    """Last year ingested from `source`, or None if it has never been loaded."""
+    row = conn.execute(f'SELECT last_year FROM {WATERMARK_TABLE} WHERE source = ?', (source,)).fetchone()
+    return row[0] if row else None
+
+
+def set_watermark(conn: sqlite3.Connection, source: str, last_year) -> None:
+    """Records the last year ingested from `source` (the caller owns the transaction)."""
+    conn.execute(
+        f'INSERT INTO {WATERMARK_TABLE} (source, last_year, ingested_at) VALUES (?, ?, datetime(\'now\')) '
+        'ON CONFLICT(source) DO UPDATE SET last_year = excluded.last_year, ingested_at = excluded.ingested_at',
+        (source, int(last_year)),
+    )
+
+
+def use_wal(conn: sqlite3.Connection) -> None:
+    """Switches to WAL, giving a new file PAGE_SIZE pages first (page_size is ignored on existing files)."""
+    conn.execute(f'PRAGMA page_size={PAGE_SIZE}')
+    conn.execute('PRAGMA journal_mode=WAL')
+
+
+def rebuild_from_staging(conn: sqlite3.Connection, source: str, last_year) -> int:
+    """
+    Replaces the tables with the rows in temp.staging in a single write transaction. Under WAL,
+    readers (and the result cache) keep seeing the previous database until COMMIT, and a crash
+    rolls the whole rebuild back instead of leaving half-filled tables. Returns the crop facts stored.
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    create_schema(conn)
+    report_collisions(insert_staged(conn))
+    assign_weights(conn)
+    create_indexes(conn)
+    if last_year is not None:
+        set_watermark(conn, source, last_year)
+    conn.execute('COMMIT')
+    conn.execute('DROP TABLE temp.staging')
+    conn.execute('DROP TABLE temp.staged_facts')
+    return conn.execute(f'SELECT COUNT(*) FROM {FACT_TABLE}').fetchone()[0]
+
+
+def load_bulk(conn: sqlite3.Connection, csv_file: str) -> int:
+    """Reads the whole CSV into memory, stages it and rebuilds the tables in one transaction."""
+    df = clean_columns(pd.read_csv(csv_file))
+
+    use_wal(conn)
+    create_staging(conn)
+    conn.execute('BEGIN')
+    _insert(conn, 'temp.staging', df)
+    conn.execute('COMMIT')
+    return rebuild_from_staging(conn, os.path.basename(csv_file), df['year'].max())
+
+
+def load_streaming(conn: sqlite3.Connection, csv_file: str, chunksize: int = CHUNK_SIZE) -> int:
+    """
+    Streams the CSV in chunks of `chunksize` rows into the TEMP staging table, so peak
+    memory is bounded by the chunk size rather than the file size. Staging only writes
+    the connection's temp database; the tables themselves are replaced at the end, in
+    one transaction (see rebuild_from_staging).
+    """
+    use_wal(conn)
+    create_staging(conn)
+
+    total_rows = 0
+    last_year = None
+    start = time.perf_counter()
+    for chunk in pd.read_csv(csv_file, chunksize=chunksize):
+        chunk = clean_columns(chunk)
+        conn.execute('BEGIN')
+        _insert(conn, 'temp.staging', chunk)
+        conn.execute('COMMIT')
+
+        total_rows += len(chunk)
+        last_year = max(last_year or chunk['year'].max(), chunk['year'].max())
+        elapsed = time.perf_counter() - start
+        print(f"  {total_rows:,} rows staged ({total_rows / elapsed:,.0f} rows/s)")
+
+    print("Building tables and indexes...")
+    return rebuild_from_staging(conn, os.path.basename(csv_file), last_year)
+
+
+def _migrate_null_seasons(conn: sqlite3.Connection) -> int:
+    """
+    Rewrites NULL seasons left by older builds as ''. Rows that would then collide with
+    another copy of the same crop record are the duplicates NULL let in, and are deleted.
+    """
+    conn.execute(f"UPDATE OR IGNORE {FACT_TABLE} SET season = '' WHERE season IS NULL")
+    return conn.execute(f'DELETE FROM {FACT_TABLE} WHERE season IS NULL').rowcount
+
+
+def _upsert(conn: sqlite3.Connection, table: str, columns, key, source: str = 'temp.staging') -> int:
+    """Inserts the distinct rows of `table`'s columns in `source`, updating rows whose values changed."""
+    column_list = ', '.join(columns)
+    values = [col for col in columns if col not in key]
+    return conn.execute(
+        f'INSERT INTO {table} ({column_list}) SELECT DISTINCT {column_list} FROM {source} WHERE true '
+        f'ON CONFLICT ({", ".join(key)}) DO UPDATE SET '
+        + ', '.join(f'{col} = excluded.{col}' for col in values)
+        + f' WHERE ({", ".join(f"{table}.{col}" for col in values)}) '
+          f'IS NOT ({", ".join(f"excluded.{col}" for col in values)})'
+    ).rowcount
+
+
+def load_incremental(conn: sqlite3.Connection, csv_file: str, chunksize: int = CHUNK_SIZE):
+    """
+    Upserts only new or changed rows into the live tables; nothing is dropped.
+
+    Rows older than the source's watermark year are skipped. The rest are streamed
+    into a TEMP staging table (outside any lock the readers care about), then merged
+    in one short write transaction: new crop facts and rainfall rows are inserted, changed
+    ones updated, and new state/subdivision pairs added to the bridge. Under WAL, readers
+    keep seeing the previous snapshot until that transaction commits, so they never
+    observe a half-applied refresh.
+    Returns (rows_staged, rows_written).
+    """
+    if _object_type(conn, TABLE_NAME) == 'table':
+        raise ValueError(f"'{TABLE_NAME}' is a flat table from an older build; rebuild the database first.")
+
+    source = os.path.basename(csv_file)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('BEGIN')
+    create_schema(conn, replace=False)
+    create_indexes(conn)
+    conn.execute('COMMIT')
+    watermark = get_watermark(conn, source)
+
+    create_staging(conn)
+
+    staged = 0
+    last_year = watermark
+    for chunk in pd.read_csv(csv_file, chunksize=chunksize):
+        chunk = clean_columns(chunk)
+        if watermark is not None:
+            # The watermark year itself is re-checked: it may have been loaded partially.
+            chunk = chunk[chunk['year'] >= watermark]
+        if chunk.empty:
+            continue
+        conn.execute('BEGIN')
+        _insert(conn, 'temp.staging', chunk)
+        conn.execute('COMMIT')
+        staged += len(chunk)
+        last_year = max(last_year or chunk['year'].max(), chunk['year'].max())
+    print(f"  {staged:,} rows staged from '{source}' (watermark: {watermark}).")
+
+    conn.execute('BEGIN IMMEDIATE')
+    duplicates = _migrate_null_seasons(conn)
+    if duplicates:
+        print(f"  Removed {duplicates:,} duplicate crop facts with a NULL season.")
+    report_collisions(stage_facts(conn))
+    written = _upsert(conn, FACT_TABLE, list(FACT_SCHEMA), FACT_KEY, 'temp.staged_facts')
+    written += _upsert(conn, RAINFALL_TABLE, list(RAINFALL_SCHEMA), RAINFALL_KEY)
+    added_pairs = conn.execute(
+        f'INSERT OR IGNORE INTO {BRIDGE_TABLE} (state, subdivision, weight) '
+        'SELECT DISTINCT state_canonical, subdivision, 1.0 FROM temp.staging'
+    ).rowcount
+    if added_pairs:
+        assign_weights(conn)
+    if last_year is not None:
+        set_watermark(conn, source, last_year)
+    conn.execute('COMMIT')
+
+    conn.execute('DROP TABLE temp.staging')
+    conn.execute('DROP TABLE temp.staged_facts')
+    conn.execute('PRAGMA optimize')
+    return staged, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the integrated CSV into the Samarth SQLite database.")
+    parser.add_argument('--csv', default=CSV_FILE, help="integrated CSV to load")
+    parser.add_argument('--db', default=DATABASE_FILE, help="SQLite database file to (re)build")
+    parser.add_argument('--stream', action='store_true',
+                        help="stream the CSV in chunks instead of reading it into memory at once")
+    parser.add_argument('--incremental', action='store_true',
+                        help="upsert new/changed rows into the existing table instead of rebuilding it")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE,
+                        help="rows per chunk in --stream/--incremental mode")
+    args = parser.parse_args()
+
+    # Connect to SQLite (autocommit; transactions are opened explicitly)
+    conn = sqlite3.connect(args.db, isolation_level=None)
 
-# Load the CSV
-df = pd.read_csv(CSV_FILE)
+    start = time.perf_counter()
+    if args.incremental:
+        print("Starting incremental update...")
+        staged, written = load_incremental(conn, args.csv, args.chunksize)
+        conn.close()
+        print(f"Upserted {written:,} new or changed crop facts and rainfall rows "
+              f"({staged:,} checked in {time.perf_counter() - start:.1f}s).")
+        return
 
-# Clean column names to match the names used in the LLM system prompt
-df.columns = df.columns.str.lower().str.replace(' ', '_').str.replace('[^a-z0-9_]', '', regex=True)
+    print("Starting database setup...")
+    if args.stream:
+        rows = load_streaming(conn, args.csv, args.chunksize)
+    else:
+        rows = load_bulk(conn, args.csv)
 
-# Connect to SQLite
-conn = sqlite3.connect(DATABASE_FILE)
+    optimize_for_reads(conn)
+    conn.close()
+    elapsed = time.perf_counter() - start
+    print(f"Successfully created and populated '{args.db}': {rows:,} crop facts in '{FACT_TABLE}', "
+          f"rainfall in '{RAINFALL_TABLE}' / '{BRIDGE_TABLE}', queryable as '{TABLE_NAME}' ({elapsed:.1f}s).")
 
-# Write DataFrame to the required table
-df.to_sql(TABLE_NAME, conn, if_exists='replace', index=False)
 
-conn.close()
-print(f"Successfully created and populated '{DATABASE_FILE}' with table '{TABLE_NAME}'.")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
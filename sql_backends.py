@@ -0,0 +1,303 @@
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional
+
+import pandas as pd
+
+from db_pool import ConnectionPool
+from query_guard import FETCH_BATCH, MAX_ROWS, TIMEOUT_SECONDS, QueryRejected, check_single_select, run_guarded
+from result_cache import database_generation
+from text_to_sql import sql_literal
+
+# --- Analytical backends behind ChatPipeline.execute_sql ---
+# Each backend runs one read-only SELECT under the query_guard limits (single SELECT, no
+# joins of two unkeyed full inputs, TIMEOUT_SECONDS, MAX_ROWS) and returns a DataFrame
+# with attrs['truncated']:
+# - "sqlite" (default): the pooled read-only SQLite connections (db_pool.py + run_guarded);
+# - "duckdb": an embedded, in-process DuckDB database: vectorised and multi-threaded
+#   aggregation with no server. It reads the tables of the same SQLite database either
+#     source "parquet": from a Parquet export of every table (export_parquet(), written
+#                       next to the database and re-exported whenever the database changes), or
+#     source "sqlite":  straight from the SQLite file through DuckDB's sqlite extension
+#                       (which DuckDB must be able to install/load);
+#   the views (integrated_data, state_rainfall) are recreated from their SQLite definitions.
+#   Results are fetched as Arrow record batches and handed to pandas as ArrowDtype columns,
+#   without copying; only DECIMAL columns (e.g. SUM of integers) are cast to double, as
+#   SQLite would return them.
+# A deployment picks one with SAMARTH_SQL_BACKEND=sqlite|duckdb; SAMARTH_DUCKDB_SOURCE and
+# SAMARTH_DUCKDB_THREADS (default: all cores) tune the DuckDB one.
+#
+# The SQL is written for SQLite (by the local translator and the LLM prompt). Where DuckDB's
+# dialect differs:
+# - LIKE is case-sensitive: it is sent as ILIKE (sqlite_compatible) to keep SQLite's match;
+# - integer / integer is a decimal: the database sets integer_division, so it truncates
+#   as in SQLite (COUNT(*) / 7 -> 1717, not 1717.14);
+# - a column that is neither aggregated nor in GROUP BY ("bare column") is a Binder Error
+#   rather than a value from an arbitrary row. This one is not rewritten: the LLM prompt
+#   states it for DuckDB (prompt_builder.DIALECT_RULES), and the error goes back to the LLM
+#   for repair like any other. The local translator and the prompt templates use none.
+
+BACKENDS = ("sqlite", "duckdb")
+DEFAULT_BACKEND = "sqlite"
+BACKEND_ENV = "SAMARTH_SQL_BACKEND"
+
+DUCKDB_SOURCES = ("parquet", "sqlite")
+DUCKDB_SOURCE_ENV = "SAMARTH_DUCKDB_SOURCE"
+DUCKDB_THREADS_ENV = "SAMARTH_DUCKDB_THREADS"
+
+# The database generation (result_cache.database_generation) a Parquet export was taken at.
+GENERATION_FILE = "_generation.json"
+
+# DuckDB operators that pair every row of one input with every row of the other; rejected
+# when both inputs are estimated at more than one row (the DuckDB form of check_plan).
+UNKEYED_JOINS = {"CROSS_PRODUCT", "NESTED_LOOP_JOIN", "BLOCKWISE_NL_JOIN", "PIECEWISE_MERGE_JOIN", "IE_JOIN"}
+
+# Single-quoted SQL string literals (with '' escapes), left untouched by sqlite_compatible.
+_LITERAL = re.compile(r"('(?:[^']|'')*')")
+
+
+# --- Parquet export of the SQLite database ---
+
+def parquet_export_path(database_file: str) -> str:
+    """The export directory that sits next to a database (foo.db -> foo.parquet/)."""
+    return os.path.splitext(database_file)[0] + ".parquet"
+
+
+def has_fresh_export(database_file: str, directory: Optional[str] = None) -> bool:
+    """True if the export was taken from the database as it is now."""
+    marker = os.path.join(directory or parquet_export_path(database_file), GENERATION_FILE)
+    try:
+        with open(marker) as f:
+            return tuple(json.load(f)) == database_generation(database_file)
+    except (FileNotFoundError, ValueError):
+        return False
+
+
+def _schema(conn: sqlite3.Connection):
+    """([table, ...], [(view, CREATE VIEW sql), ...]) in creation order."""
+    rows = conn.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE type IN ('table', 'view') "
+        "AND name NOT LIKE 'sqlite_%' ORDER BY rowid"
+    ).fetchall()
+    return ([name for kind, name, _ in rows if kind == 'table'],
+            [(name, sql) for kind, name, sql in rows if kind == 'view'])
+
+
+def export_parquet(database_file: str, directory: Optional[str] = None) -> str:
+    """Writes every table of the database as <table>.parquet; the new export is swapped in once complete."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    directory = directory or parquet_export_path(database_file)
+    staging = tempfile.mkdtemp(prefix=os.path.basename(directory) + ".", dir=os.path.dirname(os.path.abspath(directory)))
+    conn = sqlite3.connect(f'file:{database_file}?mode=ro', uri=True)
+    try:
+        tables, _ = _schema(conn)
+        # Stamped once connected: opening a WAL database creates its (empty) -wal file.
+        generation = database_generation(database_file)
+        for table in tables:
+            df = pd.read_sql_query(f'SELECT * FROM "{table}"', conn)
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), os.path.join(staging, f"{table}.parquet"))
+    finally:
+        conn.close()
+    with open(os.path.join(staging, GENERATION_FILE), "w") as f:
+        json.dump(list(generation), f)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(staging, directory)
+    return directory
+
+
+def sqlite_compatible(sql_query: str) -> str:
+    """SQLite's LIKE ignores ASCII case and DuckDB's does not: LIKE -> ILIKE outside string literals."""
+    parts = _LITERAL.split(sql_query)
+    return ''.join(
+        part if i % 2 else re.sub(r'\bLIKE\b', 'ILIKE', part, flags=re.I)
+        for i, part in enumerate(parts)
+    )
+
+
+# --- Backends ---
+
+class SQLiteBackend:
+    """The pooled, guarded read-only SQLite connections."""
+
+    name = "sqlite"
+    errors = (sqlite3.Error,)
+
+    def __init__(self, database_file: str, pool: Optional[ConnectionPool] = None):
+        self.database_file = database_file
+        self.pool = pool or ConnectionPool(database_file)
+
+    @property
+    def stats(self) -> dict:
+        return self.pool.stats
+
+    def check(self, sql_query: str) -> None:
+        """Raises QueryRejected or sqlite3.Error if the query is not one SELECT SQLite can compile."""
+        sql_query = check_single_select(sql_query)
+        with self.pool.connection() as conn:
+            conn.execute(f'EXPLAIN {sql_query}')
+
+    def read_sql(self, sql_query: str) -> pd.DataFrame:
+        return self.pool.read_sql(sql_query, reader=run_guarded)
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class DuckDBBackend:
+    """An embedded DuckDB database over the tables of a SQLite file (see the notes above)."""
+
+    name = "duckdb"
+
+    def __init__(self, database_file: str, source: Optional[str] = None, threads: Optional[int] = None,
+                 timeout: float = TIMEOUT_SECONDS, max_rows: int = MAX_ROWS):
+        import duckdb
+
+        self.errors = (duckdb.Error, sqlite3.Error)
+        self.database_file = database_file
+        self.source = source or os.getenv(DUCKDB_SOURCE_ENV, DUCKDB_SOURCES[0])
+        if self.source not in DUCKDB_SOURCES:
+            raise ValueError(f"Unknown DuckDB source {self.source!r}; expected one of {', '.join(DUCKDB_SOURCES)}")
+        self.threads = threads or int(os.getenv(DUCKDB_THREADS_ENV, "0")) or None
+        self.timeout = timeout
+        self.max_rows = max_rows
+        self.stats = {'opens': 0, 'exports': 0, 'queries': 0, 'query_ms_total': 0.0, 'query_ms_max': 0.0}
+
+        self._conn = None
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        import duckdb
+
+        conn = duckdb.connect(":memory:")
+        conn.execute("SET GLOBAL integer_division = true")  # cursors are new sessions
+        if self.threads:
+            conn.execute(f"SET threads = {int(self.threads)}")
+        meta = sqlite3.connect(f'file:{self.database_file}?mode=ro', uri=True)
+        try:
+            tables, views = _schema(meta)
+            generation = database_generation(self.database_file)  # see export_parquet
+        finally:
+            meta.close()
+
+        if self.source == "sqlite":
+            allowed = ("allowed_paths", os.path.abspath(self.database_file))
+            conn.execute("INSTALL sqlite")
+            conn.execute("LOAD sqlite")
+            conn.execute(f"ATTACH {sql_literal(allowed[1])} AS src (TYPE sqlite, READ_ONLY)")
+            for table in tables:
+                conn.execute(f'CREATE VIEW "{table}" AS SELECT * FROM src."{table}"')
+        else:
+            directory = parquet_export_path(self.database_file)
+            if not has_fresh_export(self.database_file, directory):
+                export_parquet(self.database_file, directory)
+                self.stats['exports'] += 1
+            allowed = ("allowed_directories", os.path.abspath(directory))
+            for table in tables:
+                path = sql_literal(os.path.join(allowed[1], f"{table}.parquet"))
+                conn.execute(f'CREATE VIEW "{table}" AS SELECT * FROM read_parquet({path})')
+        for _, create_view in views:
+            conn.execute(create_view)
+
+        # From here on, queries can only read the data above: no other files, no settings.
+        setting, path = allowed
+        conn.execute(f"SET {setting} = [{sql_literal(path)}]")
+        conn.execute("SET enable_external_access = false")
+        conn.execute("SET lock_configuration = true")
+        return conn, generation
+
+    def _database(self):
+        """The DuckDB database, (re)built on first use and, for Parquet, after the SQLite file changes."""
+        with self._lock:
+            stale = self.source == "parquet" and database_generation(self.database_file) != self._generation
+            if self._conn is None or stale:
+                # Queries still running keep the previous database alive through their cursors.
+                self._conn, self._generation = self._open()
+                self.stats['opens'] += 1
+            return self._conn
+
+    def check_plan(self, cursor, sql_query: str) -> None:
+        """Rejects plans that pair every row of one multi-row input with every row of another."""
+        plan = json.loads(cursor.execute(f"EXPLAIN (FORMAT json) {sql_query}").fetchall()[0][1])
+        nodes = list(plan)
+        while nodes:
+            node = nodes.pop()
+            children = node.get("children", [])
+            nodes.extend(children)
+            if node.get("name") in UNKEYED_JOINS and len(children) == 2:
+                estimates = [child.get("extra_info", {}).get("Estimated Cardinality") for child in children]
+                if all(estimate is None or int(estimate) > 1 for estimate in estimates):
+                    raise QueryRejected("The query joins full table scans; add a join condition or filter.")
+
+    def check(self, sql_query: str) -> None:
+        """Raises QueryRejected or duckdb.Error if the query is not one SELECT DuckDB can plan."""
+        sql_query = sqlite_compatible(check_single_select(sql_query))
+        cursor = self._database().cursor()
+        try:
+            cursor.execute(f"EXPLAIN {sql_query}")
+        finally:
+            cursor.close()
+
+    def read_sql(self, sql_query: str) -> pd.DataFrame:
+        import duckdb
+        import pyarrow as pa
+
+        sql_query = sqlite_compatible(check_single_select(sql_query))
+        cursor = self._database().cursor()
+        start = time.perf_counter()
+        try:
+            self.check_plan(cursor, sql_query)
+            timer = threading.Timer(self.timeout, cursor.interrupt)
+            timer.start()
+            try:
+                reader = cursor.execute(sql_query).to_arrow_reader(FETCH_BATCH)
+                batches, rows = [], 0
+                for batch in reader:
+                    batches.append(batch)
+                    rows += batch.num_rows
+                    if rows > self.max_rows:
+                        break
+            except duckdb.InterruptException:
+                raise QueryRejected(f"The query exceeded the {self.timeout:g}s time limit.") from None
+            finally:
+                timer.cancel()
+        finally:
+            cursor.close()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.stats['queries'] += 1
+                self.stats['query_ms_total'] += elapsed_ms
+                self.stats['query_ms_max'] = max(self.stats['query_ms_max'], elapsed_ms)
+
+        table = pa.Table.from_batches(batches, schema=reader.schema)
+        columns = [column.cast(pa.float64()) if pa.types.is_decimal(column.type) else column
+                   for column in table.columns]
+        table = pa.table(columns, names=table.column_names).slice(0, self.max_rows)
+        result_df = table.to_pandas(types_mapper=pd.ArrowDtype)
+        result_df.attrs['truncated'] = rows > self.max_rows
+        return result_df
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def open_backend(name: Optional[str], database_file: str, pool: Optional[ConnectionPool] = None):
+    """The backend called `name` (default: $SAMARTH_SQL_BACKEND, else sqlite) for `database_file`."""
+    name = name or os.getenv(BACKEND_ENV, DEFAULT_BACKEND)
+    if name == "sqlite":
+        return SQLiteBackend(database_file, pool)
+    if name == "duckdb":
+        return DuckDBBackend(database_file)
+    raise ValueError(f"Unknown SQL backend {name!r}; expected one of {', '.join(BACKENDS)}")
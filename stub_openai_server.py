@@ -0,0 +1,106 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Minimal OpenAI-compatible stub server (for local testing and benchmarks) ---
+# Implements POST /v1/chat/completions, plain and streamed (SSE). JSON-mode requests get
+# {"sql_query": ...}; everything else gets a fixed summary sentence. Latency and a rate of
+# transient 503s can be injected to exercise the client's streaming and retry paths.
+#
+# Usage: python stub_openai_server.py --port 8765
+#        OPENAI_API_KEY=stub OPENAI_BASE_URL=http://127.0.0.1:8765/v1 streamlit run Home.py
+
+DEFAULT_SQL = (
+    "SELECT year, SUM(production_tonnes) AS Production, AVG(annual_rainfall_mm) AS Annual_Rainfall "
+    "FROM integrated_data WHERE state_canonical = 'punjab' AND crop LIKE '%Wheat%' "
+    "GROUP BY year ORDER BY year"
+)
+DEFAULT_ANSWER = "Production rose steadily over the period while rainfall stayed broadly flat."
+
+
+def make_handler(sql_query: str = DEFAULT_SQL, answer: str = DEFAULT_ANSWER,
+                 latency: float = 0.0, token_delay: float = 0.0, fail_rate: float = 0.0):
+    """Builds a request handler class with the given canned responses and fault injection."""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        calls = 0
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status: int, payload: dict) -> None:
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            StubHandler.calls += 1
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(latency)
+            if random.random() < fail_rate:
+                self._send_json(503, {"error": {"message": "stub: transient failure", "type": "server_error"}})
+                return
+
+            if request.get("response_format", {}).get("type") == "json_object":
+                content = json.dumps({"sql_query": sql_query})
+            else:
+                content = answer
+            prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(content.split()),
+                     "total_tokens": prompt_tokens + len(content.split())}
+            base = {"id": "stub", "created": int(time.time()), "model": request.get("model", "stub")}
+
+            if not request.get("stream"):
+                self._send_json(200, {
+                    **base, "object": "chat.completion", "usage": usage,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            words = content.split(" ")
+            for i, word in enumerate(words):
+                delta = word if i == len(words) - 1 else word + " "
+                chunk = {**base, "object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+
+    return StubHandler
+
+
+def serve(port: int = 0, **handler_options) -> ThreadingHTTPServer:
+    """Starts the stub in a background thread (port 0 = any free port) and returns the server."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(**handler_options))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a stub OpenAI chat completions API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--sql", default=DEFAULT_SQL, help="SQL returned for JSON-mode requests")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each response")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed tokens")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(
+        args.sql, latency=args.latency, token_delay=args.token_delay, fail_rate=args.fail_rate))
+    print(f"Stub OpenAI API listening on http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+import difflib
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import sqlite3
+
+# --- Local, deterministic Text-to-SQL for the common question shapes ---
+# An EntityIndex is built once from the dataset's distinct states, districts, crops and
+# seasons. parse_question() resolves entities (exact n-gram lookups, then fuzzy matching)
+# and a year window, and classifies the question as COMPARE, TOP_K, TREND or CORRELATION.
+# compile_sql() turns that into a single SELECT over integrated_data (or, for state-level
+# rainfall questions, over the state x year state_rainfall view when the database has one).
+# Anything that does not fit a template returns None and the caller falls back to the LLM:
+# a wrong local answer is worse than an LLM call, so parse_question() gives up on any word
+# or number it cannot account for, on two metrics or two shapes in one question, and on
+# groupings or metrics no template covers (crops, seasons, monsoon/jjas rainfall, area).
+# 'Last N years' means N years including the latest: year > MAX(year) - N, as in the LLM
+# prompt's rule 3 (prompt_builder.py).
+#
+# Entity values placed in the SQL always come from the index (never from the user's text)
+# and are quoted with sql_literal().
+
+TABLE_NAME = 'integrated_data'
+FACT_TABLE = 'crop_fact'
+STATE_RAINFALL_VIEW = 'state_rainfall'
+
+# Words that describe the question rather than name an entity; never fuzzy-matched.
+KEYWORDS = {
+    'compare', 'comparison', 'versus', 'rainfall', 'rain', 'production', 'produce', 'produced', 'yield',
+    'district', 'districts', 'state', 'states', 'highest', 'lowest', 'top', 'bottom', 'most', 'least',
+    'trend', 'trends', 'correlate', 'correlation', 'relationship', 'between', 'average', 'total',
+    'years', 'year', 'last', 'recent', 'latest', 'since', 'from', 'during', 'analyze', 'analyse',
+    'climate', 'annual', 'which', 'what', 'where', 'show', 'list', 'crop', 'crops',
+    'season', 'seasons', 'with', 'over', 'time', 'decade', 'identify', 'their', 'those', 'these',
+}
+
+# Words that carry no meaning for the templates. A question may only consist of these,
+# KEYWORDS, numbers and resolved entities; anything else is a clause the templates ignore.
+FILLER = {
+    'a', 'an', 'the', 'of', 'in', 'on', 'at', 'for', 'and', 'to', 'by', 'is', 'are', 'was', 'were',
+    'has', 'have', 'had', 'did', 'do', 'does', 'how', 'much', 'me', 'give', 'tell', 'please', 'per',
+    'vs', 'v', 'its', 'been', 'be', 'get', 'find', 'data', 'figures', 'wise', 'available', 'past',
+    'across', 'within', 'period', 'same', 'mm', 'tonnes', 'ha', 'hectare', 'all',
+}
+
+# Metrics and groupings no template answers (seasonal rainfall columns, cultivated area).
+UNSUPPORTED = {
+    'monsoon', 'jjas', 'jf', 'mam', 'ond', 'winter', 'summer', 'seasonal', 'monthly', 'month', 'months',
+    'area', 'acreage', 'cultivated',
+}
+
+# Which metric each word asks for.
+METRIC_WORDS = {
+    'rainfall': 'rainfall', 'rain': 'rainfall',
+    'production': 'production', 'produce': 'production', 'produced': 'production',
+    'yield': 'yield',
+}
+
+METRICS = {
+    'rainfall': ('annual_rainfall_mm', 'AVG', 'Avg_Rainfall_mm'),
+    'production': ('production_tonnes', 'SUM', 'Total_Production_tonnes'),
+    'yield': ('yield_t_per_ha', 'AVG', 'Avg_Yield_t_per_ha'),
+}
+
+_NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7,
+    'eight': 8, 'nine': 9, 'ten': 10, 'fifteen': 15, 'twenty': 20,
+}
+
+# Rows a ranking of 'states'/'districts' returns when the question gives no number
+# (as in the LLM's Top-K and State Rainfall templates).
+DEFAULT_PLURAL_K = 5
+
+_COUNT = r'(\d+|' + '|'.join(_NUMBER_WORDS) + r')'
+_NUMBER = re.compile(r'\b(?:\d+|' + '|'.join(_NUMBER_WORDS) + r')\b')
+_YEAR = re.compile(r'\b(1[89]\d\d|20\d\d)\b')
+# 'last 5 years', 'past 5 available years', '5 most recent years', 'three latest years'.
+_LAST_N_YEARS = re.compile(r'\b(?:last|past)\s+' + _COUNT + r'\s*(?:available\s+)?years?\b|\b'
+                           + _COUNT + r'\s+(?:most\s+recent|latest)\s+(?:available\s+)?years?\b')
+# 'top 5', 'bottom three', 'which 3 states', 'the 10 districts'.
+_TOP_K = re.compile(r'\b(?:top|bottom)\s+' + _COUNT + r'\b|\b' + _COUNT + r'\s+(?:states|districts)\b')
+# 'most' as a ranking word, not in 'most recent'.
+_MOST = r'\bmost\b(?!\s+recent)'
+
+
+def _count(word: str) -> int:
+    return int(word) if word.isdigit() else _NUMBER_WORDS[word]
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase words only: 'Andaman & Nicobar' -> 'andaman and nicobar', 'Cotton(lint)' -> 'cotton lint'."""
+    name = str(name).lower().replace('&', ' and ')
+    return ' '.join(re.findall(r'[a-z0-9]+', name))
+
+
+def sql_literal(value) -> str:
+    """A SQL literal for an indexed entity value."""
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def has_table(conn: sqlite3.Connection, name: str) -> bool:
+    """True if the database has a table or view called `name`."""
+    return conn.execute('SELECT 1 FROM sqlite_master WHERE name = ?', (name,)).fetchone() is not None
+
+
+class EntityIndex:
+    """Distinct entity values of the dataset, keyed by their normalised names (and simple aliases)."""
+
+    KINDS = ('state', 'crop', 'season', 'district')  # precedence when one phrase matches several kinds
+
+    def __init__(self, states: Iterable[str], districts: Iterable[str], crops: Iterable[str],
+                 seasons: Iterable[str], min_year: Optional[int] = None, max_year: Optional[int] = None):
+        self.min_year = min_year
+        self.max_year = max_year
+        self.lookup: Dict[str, Dict[str, str]] = {kind: {} for kind in self.KINDS}
+        for kind, values in (('state', states), ('district', districts), ('crop', crops), ('season', seasons)):
+            for value in values:
+                if value is None or str(value).strip() == '':
+                    continue
+                self._add(kind, normalize_name(value), value)
+                if kind == 'crop' and '(' in str(value):
+                    self._add(kind, normalize_name(str(value).split('(')[0]), value)  # 'Moong(Green Gram)' -> 'moong'
+        self.max_words = max(
+            (len(name.split()) for names in self.lookup.values() for name in names), default=1
+        )
+        self._vocab = {name: kind for kind in reversed(self.KINDS) for name in self.lookup[kind]}
+
+    def _add(self, kind: str, name: str, value: str) -> None:
+        if name:
+            self.lookup[kind].setdefault(name, value)
+
+    @classmethod
+    def from_sqlite(cls, conn: sqlite3.Connection, table: str = TABLE_NAME) -> 'EntityIndex':
+        """
+        Builds the index from the distinct values in the chatbot database
+        (read from the crop fact table when the database has the star schema).
+        """
+        if table == TABLE_NAME and has_table(conn, FACT_TABLE):
+            table = FACT_TABLE
+
+        def distinct(column):
+            return [row[0] for row in conn.execute(f'SELECT DISTINCT {column} FROM {table}')]
+        min_year, max_year = conn.execute(f'SELECT MIN(year), MAX(year) FROM {table}').fetchone()
+        return cls(distinct('state_canonical'), distinct('district'), distinct('crop'),
+                   [s.strip() for s in distinct('season') if s], min_year, max_year)
+
+    def resolve(self, text: str, unmatched: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """
+        Finds entity mentions in `text`, longest phrase first, in order of appearance.
+        Words with no exact match are fuzzy-matched (difflib ratio >= 0.85) against the vocabulary.
+        Words that are not part of any entity are appended to `unmatched`, if given.
+        """
+        words = normalize_name(text).split()
+        found: Dict[str, List[str]] = {kind: [] for kind in self.KINDS}
+        i = 0
+        while i < len(words):
+            for n in range(min(self.max_words, len(words) - i), 0, -1):
+                phrase = ' '.join(words[i:i + n])
+                kind = self._vocab.get(phrase)
+                if kind is None and n == 1 and len(phrase) >= 5 and phrase not in KEYWORDS:
+                    close = difflib.get_close_matches(phrase, self._vocab.keys(), n=1, cutoff=0.85)
+                    if close:
+                        phrase, kind = close[0], self._vocab[close[0]]
+                if kind is not None and not (n == 1 and phrase in KEYWORDS):
+                    value = self.lookup[kind][phrase]
+                    if value not in found[kind]:
+                        found[kind].append(value)
+                    i += n
+                    break
+            else:
+                if unmatched is not None:
+                    unmatched.append(words[i])
+                i += 1
+        return found
+
+
+def parse_years(text: str) -> Dict[str, object]:
+    """
+    Extracts a year window: 'last 5 years' / '5 most recent years' -> {'last_n': 5}, 'between 2000 and 2010' /
+    'from 2000 to 2010' -> {'start': 2000, 'end': 2010}, 'since 2005' -> {'start': 2005},
+    'in 2005' -> {'start': 2005, 'end': 2005}, 'latest/most recent year' -> {'last_n': 1}.
+    """
+    text = text.lower()
+    match = _LAST_N_YEARS.search(text)
+    if match:
+        return {'last_n': _count(match.group(1) or match.group(2))}
+    if re.search(r'last\s+decade|past\s+decade', text):
+        return {'last_n': 10}
+    years = [int(y) for y in _YEAR.findall(text)]
+    if len(years) >= 2:
+        return {'start': min(years[:2]), 'end': max(years[:2])}
+    if len(years) == 1:
+        if re.search(r'\b(since|after|from)\s+' + str(years[0]), text):
+            return {'start': years[0]}
+        return {'start': years[0], 'end': years[0]}
+    if re.search(r'most recent|latest|last available|current', text):
+        return {'last_n': 1}
+    return {}
+
+
+def classify(text: str) -> Optional[str]:
+    """The question shape, or None if it is not one the local engine handles."""
+    text = text.lower()
+    if re.search(r'correlat|\brelat|impact of rain|effect of rain', text):
+        return 'CORRELATION'
+    if re.search(r'\btrend|over (the )?(years|time|decade)|year[- ]wise|yearly|each year', text):
+        return 'TREND'
+    if re.search(r'\bcompare|\bcomparison|\bversus\b|\bvs\.?\b', text):
+        return 'COMPARE'
+    if re.search(r'\btop\b|\bbottom\b|highest|lowest|' + _MOST + r'|\bleast\b|\bbest\b|\bworst\b|\brank', text):
+        return 'TOP_K'
+    return None
+
+
+def _unparsed(words: List[str], entities: Dict[str, List[str]]) -> bool:
+    """True if the question asks for something the templates would silently drop."""
+    if any(word in UNSUPPORTED for word in words):
+        return True
+    # Groupings: only a named crop or season can be filtered on, not ranked or broken down by.
+    if 'crops' in words or 'seasons' in words:
+        return True
+    if ('crop' in words and not entities['crop']) or ('season' in words and not entities['season']):
+        return True
+    return any(not (word in KEYWORDS or word in FILLER or word in _NUMBER_WORDS or word.isdigit())
+               for word in words)
+
+
+def _unused_number(text: str, years: dict, k_match: Optional[re.Match] = None) -> bool:
+    """True if the question has a number that neither the year window nor the ranking size took."""
+    if k_match is not None:
+        text = text[:k_match.start()] + ' ' + text[k_match.end():]
+    if 'last_n' in years:
+        text = _LAST_N_YEARS.sub(' ', text, count=1)
+    else:
+        text = _YEAR.sub(' ', text, count=2)
+    return _NUMBER.search(text) is not None
+
+
+def parse_question(question: str, index: EntityIndex) -> Tuple[Optional[str], dict]:
+    """Resolves a question into (intent, params); intent is None when no template applies."""
+    text = question.lower()
+    intent = classify(text)
+    unmatched: List[str] = []
+    entities = index.resolve(question, unmatched)
+    metrics = list(dict.fromkeys(METRIC_WORDS[word] for word in normalize_name(text).split() if word in METRIC_WORDS))
+    metric = metrics[0] if metrics else 'production'
+
+    params = {
+        'metric': metric,
+        'states': entities['state'],
+        'districts': entities['district'],
+        'crops': entities['crop'],
+        'seasons': entities['season'],
+        'years': parse_years(text),
+    }
+    k_match = None
+    if intent == 'TOP_K':
+        k_match = _TOP_K.search(text)
+        if k_match:
+            params['k'] = _count(k_match.group(1) or k_match.group(2))
+        else:
+            params['k'] = DEFAULT_PLURAL_K if re.search(r'\b(?:states|districts)\b', text) else 1
+        params['ascending'] = bool(re.search(r'lowest|\bleast\b|\bbottom\b|\bworst\b', text))
+        params['group_by'] = 'district' if ('district' in text or entities['state']) else 'state_canonical'
+
+    if intent is None or _unparsed(unmatched, entities):
+        return None, params
+    # 'for 3 years', 'the 2 lowest': a number the templates would ignore.
+    if _unused_number(text, params['years'], k_match):
+        return None, params
+    # COMPARE and TOP_K answer one metric; TREND and CORRELATION return all three per year.
+    if intent in ('COMPARE', 'TOP_K') and len(metrics) > 1:
+        return None, params
+    # 'the district with the highest ... compare that with the lowest ...' mixes shapes.
+    highest = re.search(r'\btop\b|highest|' + _MOST + r'|\bbest\b|largest', text)
+    lowest = re.search(r'\bbottom\b|lowest|\bleast\b|\bworst\b|smallest', text)
+    if (intent == 'COMPARE' and (highest or lowest)) or (intent == 'TOP_K' and highest and lowest):
+        return None, params
+    # Every template needs something to filter or group on.
+    if intent == 'COMPARE' and len(entities['state']) + len(entities['district']) < 2:
+        return None, params
+    if intent in ('TREND', 'CORRELATION') and not (entities['state'] or entities['district'] or entities['crop']):
+        return None, params
+    return intent, params
+
+
+def _year_condition(years: dict, table: str = TABLE_NAME, scope: str = '') -> Optional[str]:
+    """`scope` (a WHERE clause) limits the latest year to the rows the query filters on."""
+    if years.get('last_n') == 1:
+        return f"year = (SELECT MAX(year) FROM {table}{scope})"
+    if 'last_n' in years:
+        return f"year > (SELECT MAX(year) FROM {table}{scope}) - {int(years['last_n'])}"
+    conditions = []
+    if 'start' in years:
+        conditions.append(f"year >= {int(years['start'])}")
+    if 'end' in years:
+        conditions.append(f"year <= {int(years['end'])}")
+    return ' AND '.join(conditions) or None
+
+
+def _in(column: str, values: List[str]) -> str:
+    if len(values) == 1:
+        return f'{column} = {sql_literal(values[0])}'
+    return f"{column} IN ({', '.join(sql_literal(v) for v in values)})"
+
+
+def _where(params: dict, include_states: bool = True, include_districts: bool = True,
+           table: str = TABLE_NAME) -> str:
+    conditions = []
+    if include_states and params['states']:
+        conditions.append(_in('state_canonical', params['states']))
+    if include_districts and params['districts']:
+        conditions.append(_in('district', params['districts']))
+    if params['crops']:
+        conditions.append(_in('crop', params['crops']))
+    if params['seasons']:
+        conditions.append(_in('TRIM(season)', params['seasons']))
+    # 'latest year' means the latest year with data for these states/crops, not the table's.
+    scope = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+    year_condition = _year_condition(params['years'], table, scope)
+    if year_condition:
+        conditions.append(year_condition)
+    return ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+
+
+def compile_sql(intent: str, params: dict, rainfall_table: Optional[str] = None) -> str:
+    """
+    Compiles a parsed question into one SELECT statement over the integrated table.
+    With `rainfall_table` (a state x year rainfall view), rainfall comparisons and rankings
+    of states that do not filter on crops, districts or seasons read that instead.
+    """
+    column, agg, label = METRICS[params['metric']]
+    table = TABLE_NAME
+    if (rainfall_table and params['metric'] == 'rainfall'
+            and not (params['districts'] or params['crops'] or params['seasons'])):
+        table = rainfall_table
+
+    if intent == 'COMPARE':
+        region = 'district' if len(params['districts']) >= 2 else 'state_canonical'
+        where = _where(params, include_states=region == 'state_canonical' or not params['districts'],
+                       include_districts=region == 'district', table=table)
+        return (f'SELECT {region} AS Region, ROUND({agg}({column}), 2) AS {label} '
+                f'FROM {table}{where} GROUP BY {region} ORDER BY {label} DESC')
+
+    if intent == 'TOP_K':
+        group_by = params['group_by']
+        if group_by != 'state_canonical':
+            table = TABLE_NAME
+        # No period means the latest year; a one-year ranking returns that year, so the answer names it.
+        years = params['years'] or {'last_n': 1}
+        where = _where({**params, 'years': years}, table=table)
+        one_year = years.get('last_n') == 1 or ('start' in years and years.get('end') == years['start'])
+        keys = f'{group_by}, year' if one_year else group_by
+        order = 'ASC' if params['ascending'] else 'DESC'
+        return (f'SELECT {keys}, ROUND({agg}({column}), 2) AS {label} FROM {table}{where} '
+                f'GROUP BY {keys} ORDER BY {label} {order} LIMIT {int(params["k"])}')
+
+    # TREND / CORRELATION: a year series of production, rainfall and yield.
+    where = _where(params)
+    return ('SELECT year, SUM(production_tonnes) AS Production, AVG(annual_rainfall_mm) AS Annual_Rainfall, '
+            f'AVG(yield_t_per_ha) AS Average_Yield FROM {TABLE_NAME}{where} GROUP BY year ORDER BY year')
+
+
+class LocalTranslator:
+    """Question -> SQL for the template shapes, with hit/miss counters."""
+
+    def __init__(self, index: EntityIndex, rainfall_table: Optional[str] = None):
+        self.index = index
+        self.rainfall_table = rainfall_table
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def translate(self, question: str) -> Optional[str]:
+        intent, params = parse_question(question, self.index)
+        if intent is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return compile_sql(intent, params, self.rainfall_table)
@@ -0,0 +1,179 @@
+import contextvars
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import List, Optional
+
+# --- Lightweight tracing ---
+# span("name", attr=...) times a block and nests under the span that is open in the
+# same thread/context. When a top-level span closes, the finished tree is
+#   - appended to RECENT (the last RECENT_TRACES traces of the process),
+#   - handed to the active collector, if any (see collect(); the debug panel uses this),
+#   - written as one JSON line to $SAMARTH_TRACE_LOG when that variable is set.
+# Spans cost a couple of perf_counter() calls, so they stay on in production.
+
+RECENT_TRACES = 100
+TRACE_LOG_ENV = "SAMARTH_TRACE_LOG"
+
+RECENT = deque(maxlen=RECENT_TRACES)
+_recent_lock = threading.Lock()
+
+_current = contextvars.ContextVar("samarth_span", default=None)
+_collector = contextvars.ContextVar("samarth_trace_collector", default=None)
+
+logger = logging.getLogger("samarth.trace")
+logger.propagate = False
+if os.getenv(TRACE_LOG_ENV):
+    _handler = logging.FileHandler(os.environ[TRACE_LOG_ENV])
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+
+class Span:
+    """One timed operation with attributes and child spans."""
+
+    __slots__ = ("name", "attributes", "children", "start", "duration_ms", "error")
+
+    def __init__(self, name: str, attributes: dict):
+        self.name = name
+        self.attributes = attributes
+        self.children: List["Span"] = []
+        self.start = time.time()
+        self.duration_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attributes) -> None:
+        """Adds or overwrites attributes (e.g. rows returned, cache hit)."""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        record = {"name": self.name, "start": self.start, "duration_ms": self.duration_ms,
+                  "attributes": self.attributes}
+        if self.error:
+            record["error"] = self.error
+        if self.children:
+            record["children"] = [child.to_dict() for child in self.children]
+        return record
+
+    def walk(self, depth: int = 0):
+        """Yields (depth, span) for this span and its descendants, depth first."""
+        yield depth, self
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+
+def _finish(root: Span) -> None:
+    with _recent_lock:
+        RECENT.append(root)
+    collected = _collector.get()
+    if collected is not None:
+        collected.append(root)
+    if logger.handlers:
+        logger.info(json.dumps(root.to_dict(), default=str))
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Times the enclosed block as a span (a child of the current one, if any)."""
+    parent = _current.get()
+    current = Span(name, attributes)
+    if parent is not None:
+        parent.children.append(current)
+    token = _current.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.duration_ms = (time.perf_counter() - start) * 1000
+        _current.reset(token)
+        if parent is None:
+            _finish(current)
+
+
+def record(name: str, duration_ms: float, **attributes) -> Span:
+    """Adds an already measured span (e.g. one that began before any span could be opened)."""
+    parent = _current.get()
+    finished = Span(name, attributes)
+    finished.start -= duration_ms / 1000
+    finished.duration_ms = duration_ms
+    if parent is not None:
+        parent.children.append(finished)
+    else:
+        _finish(finished)
+    return finished
+
+
+def current_span() -> Optional[Span]:
+    """The innermost open span of this context, if any."""
+    return _current.get()
+
+
+def set_attributes(**attributes) -> None:
+    """Sets attributes on the current span; a no-op outside of one."""
+    current = _current.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+def start_collecting() -> list:
+    """From now on, finished traces of this context are also appended to the returned list."""
+    collected = []
+    _collector.set(collected)
+    return collected
+
+
+@contextmanager
+def collect():
+    """Collects the traces finished inside the block into the yielded list."""
+    collected = []
+    token = _collector.set(collected)
+    try:
+        yield collected
+    finally:
+        _collector.reset(token)
+
+
+class Profiler:
+    """
+    Profiles the calling thread with pyinstrument when it is installed, else cProfile.
+    start()/stop(); report() returns the text output.
+    """
+
+    def __init__(self):
+        try:
+            from pyinstrument import Profiler as InstrumentProfiler
+            self._profiler = InstrumentProfiler()
+            self.kind = "pyinstrument"
+        except ImportError:
+            self._profiler = cProfile.Profile()
+            self.kind = "cProfile"
+
+    def start(self) -> None:
+        if self.kind == "pyinstrument":
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        if self.kind == "pyinstrument":
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def report(self, limit: int = 30) -> str:
+        if self.kind == "pyinstrument":
+            return self._profiler.output_text(unicode=True, color=False)
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
@@ -0,0 +1,138 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# --- Two-level cache for prompt -> SQL translations ---
+# Tier 1: an in-process LRU (dict lookups, lost on restart).
+# Tier 2: a small SQLite file shared by every worker, with a size cap.
+# Both tiers expire a translation TTL_SECONDS after it was first stored.
+# Keys combine the normalised prompt with a fingerprint of the system prompt and the
+# database schema, so changing either one invalidates every cached translation.
+
+CACHE_FILE = 'samarth_sql_cache.db'
+MEMORY_ENTRIES = 512
+DISK_ENTRIES = 50_000
+TTL_SECONDS = 7 * 24 * 3600
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercases, collapses whitespace and drops trailing punctuation ('Top rice state?' == 'top rice state')."""
+    prompt = re.sub(r'\s+', ' ', prompt.strip().lower())
+    return prompt.rstrip(' ?.!')
+
+
+def schema_fingerprint(database_file: str) -> str:
+    """Hash of the CREATE statements in a SQLite database ('' if the file does not exist)."""
+    if not os.path.exists(database_file):
+        return ''
+    conn = sqlite3.connect(f'file:{database_file}?mode=ro', uri=True)
+    try:
+        ddl = conn.execute('SELECT group_concat(sql, ";") FROM (SELECT sql FROM sqlite_master ORDER BY name)').fetchone()[0]
+    finally:
+        conn.close()
+    return hashlib.sha256((ddl or '').encode()).hexdigest()
+
+
+class TranslationCache:
+    """
+    Memory + disk cache of SQL translations, thread-safe.
+    `context` is anything that changes the translation for the same prompt
+    (system prompt text, prompt version, schema fingerprint).
+    """
+
+    def __init__(self, context: str, cache_file: str = CACHE_FILE,
+                 memory_entries: int = MEMORY_ENTRIES, disk_entries: int = DISK_ENTRIES,
+                 ttl_seconds: float = TTL_SECONDS):
+        self.context_hash = hashlib.sha256(context.encode()).hexdigest()
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+        self._memory = OrderedDict()  # key -> (sql_query, created_at)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS translations ('
+            'key TEXT PRIMARY KEY, prompt TEXT NOT NULL, sql_query TEXT NOT NULL, '
+            'created_at REAL NOT NULL, last_used REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_last_used ON translations (last_used)')
+
+    def key(self, prompt: str) -> str:
+        return hashlib.sha256(f'{self.context_hash}|{normalize_prompt(prompt)}'.encode()).hexdigest()
+
+    def get(self, prompt: str) -> Optional[str]:
+        """The cached SQL for `prompt`, or None. Disk hits are promoted into memory."""
+        key = self.key(prompt)
+        now = time.time()
+        with self._lock:
+            if key in self._memory:
+                sql_query, created_at = self._memory[key]
+                if created_at > now - self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return sql_query
+                del self._memory[key]
+
+            row = self._conn.execute(
+                'SELECT sql_query, created_at FROM translations WHERE key = ? AND created_at > ?',
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+
+            self._conn.execute('UPDATE translations SET last_used = ? WHERE key = ?', (now, key))
+            self.stats['disk_hits'] += 1
+            self._remember(key, *row)
+            return row[0]
+
+    def put(self, prompt: str, sql_query: str) -> None:
+        """Stores a translation in both tiers, evicting the least recently used disk rows past the cap."""
+        key = self.key(prompt)
+        now = time.time()
+        with self._lock:
+            self._remember(key, sql_query, now)
+            self._conn.execute(
+                'INSERT OR REPLACE INTO translations (key, prompt, sql_query, created_at, last_used) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, normalize_prompt(prompt), sql_query, now, now),
+            )
+            self._evict_disk(now)
+
+    def discard(self, prompt: str) -> None:
+        """Drops a translation from both tiers (e.g. because its SQL failed to execute)."""
+        key = self.key(prompt)
+        with self._lock:
+            self._memory.pop(key, None)
+            self._conn.execute('DELETE FROM translations WHERE key = ?', (key,))
+
+    def _remember(self, key: str, sql_query: str, created_at: float) -> None:
+        self._memory[key] = (sql_query, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _evict_disk(self, now: float) -> None:
+        expired = self._conn.execute(
+            'DELETE FROM translations WHERE created_at <= ?', (now - self.ttl_seconds,)
+        ).rowcount
+        overflow = self._conn.execute(
+            'DELETE FROM translations WHERE key IN ('
+            'SELECT key FROM translations ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+            (self.disk_entries,),
+        ).rowcount
+        self.stats['evictions'] += expired + overflow
+
+    def hit_rate(self) -> float:
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        total = hits + self.stats['misses']
+        return hits / total if total else 0.0
@@ -0,0 +1,161 @@
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from tracing import span
+
+# --- Cold-start warmup ---
+# A fresh replica pays for its heavy imports (pandas, pyarrow, plotly, openai) and for
+# parsing the datasets on the first run of each page. Pages therefore draw their title
+# before importing anything heavy, and debug_panel.page_start() calls start_background(),
+# which runs the steps below once per process on a daemon thread while the user reads
+# the first page:
+#   1. "imports": the heavy modules, so later pages find them in sys.modules;
+#   2. "data":    the shared data layer (integrated data, rollups, the Q&A projection and the
+#                 monthly rainfall store), so the first page that needs them reads its caches.
+# The warmup thread and the page threads share the per-process caches; whichever gets
+# there first does the work.
+#
+# The same steps can be run in the foreground at container start, to build the on-disk
+# artefacts (Parquet snapshot, rainfall store) and warm the OS file cache before the server
+# takes traffic:
+#   python warmup.py --snapshot && streamlit run Home.py
+# and --import-profile reports what every app module costs to import:
+#   python warmup.py --import-profile
+
+HEAVY_MODULES = ("numpy", "pandas", "pyarrow.parquet", "plotly.express", "openai")
+
+# Modules the pages import, profiled by --import-profile.
+APP_MODULES = (
+    "tracing", "debug_panel", "warmup", "data_loader", "rollups", "rainfall_store", "chart_data",
+    "qa_system", "chat_pipeline", "answer_synthesis", "prompt_builder", "llm_client",
+)
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def import_heavy_modules() -> None:
+    for module in HEAVY_MODULES:
+        importlib.import_module(module)
+
+
+def warm_data_layer() -> None:
+    from data_loader import load_integrated_data, read_table
+    from qa_system import DATA_FILE, SamarthQASystem
+    from rainfall_store import load_monthly_rainfall
+    from rollups import load_rollups
+
+    load_integrated_data()
+    load_rollups()
+    if os.path.exists(DATA_FILE):
+        read_table(DATA_FILE, columns=SamarthQASystem.COLUMNS)
+    try:
+        load_monthly_rainfall()
+    except FileNotFoundError:
+        pass
+
+
+STEPS = (
+    ("imports", import_heavy_modules),
+    ("data", warm_data_layer),
+)
+
+
+def warm(steps=STEPS) -> list:
+    """Runs the warmup steps; returns (step, milliseconds, error or None) per step."""
+    timings = []
+    with span("warmup"):
+        for name, step in steps:
+            start = time.perf_counter()
+            error = None
+            with span(f"warmup.{name}") as current:
+                try:
+                    step()
+                except Exception as e:
+                    # A missing dataset must not stop the rest; the page reports it properly.
+                    error = f"{type(e).__name__}: {e}"
+                    current.set(error=error)
+            timings.append((name, (time.perf_counter() - start) * 1000, error))
+    return timings
+
+
+def start_background() -> bool:
+    """Starts warm() on a daemon thread the first time it is called in this process."""
+    global _started
+    with _start_lock:
+        if _started:
+            return False
+        _started = True
+    threading.Thread(target=warm, name="samarth-warmup", daemon=True).start()
+    return True
+
+
+# --- Import-time profile ---
+
+def _parse_importtime(stderr: str, after: str) -> list:
+    """(depth, name, cumulative ms) for the -X importtime lines printed after module `after` finished."""
+    entries, seen = [], False
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        name = name.strip()
+        if seen:
+            entries.append((depth, name, int(cumulative) / 1000))
+        elif depth == 0 and name == after:
+            seen = True
+    return entries
+
+
+def import_profile(modules=APP_MODULES, top: int = 3) -> list:
+    """
+    Imports each module in a fresh interpreter that has already imported streamlit (as the
+    server has) and returns (module, ms, [(heaviest direct imports, ms), ...]) per module.
+    """
+    profile = []
+    for module in modules:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import streamlit; import {module}"],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        entries = _parse_importtime(result.stderr, "streamlit")
+        total = sum(ms for depth, _, ms in entries if depth == 0)
+        children = sorted(((name, ms) for depth, name, ms in entries if depth == 1 and ms >= 1),
+                          key=lambda item: -item[1])
+        profile.append((module, total, children[:top]))
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm the data layer before serving, or profile imports.")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="rebuild the Parquet snapshots and the rainfall store first (build_snapshot.py)")
+    parser.add_argument("--import-profile", action="store_true",
+                        help="print the import time of every app module instead of warming")
+    parser.add_argument("--top", type=int, default=3, help="heaviest imports listed per module")
+    args = parser.parse_args()
+
+    if args.import_profile:
+        print("Import time per module, after streamlit (fresh interpreter each):")
+        for module, total, children in import_profile(top=args.top):
+            heaviest = ", ".join(f"{name} {ms:,.0f} ms" for name, ms in children)
+            print(f"  {module:<18} {total:>7,.0f} ms" + (f"   ({heaviest})" if heaviest else ""))
+        return
+
+    if args.snapshot:
+        import build_snapshot
+
+        build_snapshot.main()
+
+    for name, ms, error in warm():
+        print(f"  {name:<8} {ms:>7,.0f} ms" + (f"   {error}" if error else ""))
+
+
+if __name__ == "__main__":
+    main()